@@ -0,0 +1,102 @@
+"""
+Compares resolving relationships through the relationship index against the original
+per-lookup extraction, on a synthetic vault of hubs and the links between them.
+
+    cd src && python -m benchmarks.bench_relationships --entities 10000
+"""
+
+import argparse
+import gc
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks import synthetic
+from dbtvault_generator.constants import types
+from dbtvault_generator.parsers import params, relationships
+
+
+def timed(operation: Callable[[], Any], repeats: int) -> float:
+    # As timeit does, keep collector pauses out of the comparison
+    best = float("inf")
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            operation()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+
+def build_models(entities: int) -> List[Tuple[str, types.DBTVGBaseModelParams]]:
+    options = types.DBTVGConfig().dict()
+    models: List[Tuple[str, types.DBTVGBaseModelParams]] = []
+    for index in range(entities):
+        for item in [synthetic.hub_model(index), synthetic.link_model(index)]:
+            model = params.model_param_factory(
+                item["model_type"], {**item, "location": ".", "options": options}
+            )
+            models.append((item["name"], model))
+    return models
+
+
+def build_catalog(
+    models: List[Tuple[str, types.DBTVGBaseModelParams]],
+) -> Dict[str, types.CatalogModel]:
+    catalog: Dict[str, types.CatalogModel] = {}
+    for name, model in models:
+        arguments = getattr(model, "dbtvault_arguments")
+        columns = [arguments.src_pk, *getattr(arguments, "src_fk", [])]
+        columns += ["LOAD_DATETIME", "RECORD_SOURCE"]
+        catalog[name] = types.CatalogModel(
+            name=name,
+            columns={
+                item: types.CatalogModelColumn(name=item, dtype="VARCHAR")
+                for item in columns
+            },
+        )
+    return catalog
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entities", type=int, default=10000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    models = build_models(args.entities)
+    print(f"models: {args.entities} hubs, {args.entities} links")
+
+    baseline = timed(lambda: params.find_model_relationships(models), args.repeats)
+    indexed = timed(lambda: relationships.RelationshipIndex(models), args.repeats)
+    print(
+        f"resolve: per lookup {baseline:.3f}s, indexed {indexed:.3f}s "
+        f"({baseline / indexed:.1f}x)"
+    )
+
+    # What `docs` does with the result: one schema entry per model
+    catalog = build_catalog(models)
+
+    def per_lookup() -> None:
+        relationship_data = params.find_model_relationships(models)
+        for name, model in models:
+            params.build_relationship_entry(
+                model, catalog[name], relationship_data[name]
+            )
+
+    def index() -> None:
+        relationship_index = relationships.RelationshipIndex(models)
+        for name, _ in models:
+            relationship_index.build_schema_entry(name, catalog[name])
+
+    baseline = timed(per_lookup, args.repeats)
+    indexed = timed(index, args.repeats)
+    print(
+        f"   docs: per lookup {baseline:.3f}s, indexed {indexed:.3f}s "
+        f"({baseline / indexed:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
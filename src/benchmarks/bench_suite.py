@@ -0,0 +1,190 @@
+"""
+Times each stage of `sql` and `docs` generation, and both commands end to end, on
+synthetic dbt projects of increasing size. Results are printed as a table and written
+as json, so runs can be compared across changes.
+
+    cd src && python -m benchmarks.bench_suite --sizes 100 1000 10000 50000
+    cd src && python -m benchmarks.bench_suite --sizes 1000 --baseline results.json
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks import synthetic
+from dbtvault_generator.constants import types, version
+from dbtvault_generator.files import file_io
+from dbtvault_generator.generator import readers, runners, subprocess
+from dbtvault_generator.parsers import (
+    columns,
+    fmt_string,
+    params,
+    relationships,
+    templaters,
+)
+
+Stage = Tuple[str, Callable[[], Any]]
+
+
+def timed(operation: Callable[[], Any], repeats: int) -> List[float]:
+    # As timeit does, keep collector pauses out of the timings
+    timings: List[float] = []
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            operation()
+            timings.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return timings
+
+
+def peak_memory(operation: Callable[[], Any]) -> float:
+    """Peak Python heap allocated during the operation, in MB"""
+    tracemalloc.start()
+    try:
+        operation()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1e6
+
+
+def build_stages(project_dir: Path) -> List[Stage]:
+    project_config = params.get_dbt_project_config(project_dir, None)
+    target_dir = project_dir / project_config.target_dir
+    config_reader = readers.ConfigReader(file_io.read_yml_file)
+
+    def read_configs() -> Dict[str, types.Mapping]:
+        # Included fragments are cached per process, so start each pass cold
+        file_io.clear_include_cache()
+        return config_reader.readin_dbtvg_configs(
+            project_dir, project_config.model_dirs, [project_config.target_dir]
+        )
+
+    configs = read_configs()
+    models = params.process_config_collection(configs)
+    namepairs = [(fmt_string.format_name(item), item) for item in models]
+
+    def run_sql() -> None:
+        runners.SqlGenerator(
+            params.get_dbt_project_config,
+            config_reader.readin_dbtvg_configs,
+            file_io.write_text,
+        ).run(project_dir, overwrite=True)
+
+    def run_docs() -> None:
+        schema_merger = readers.SchemaMerger(
+            file_io.read_yml_file, file_io.write_yaml_file
+        )
+        runners.DocsGenerator(
+            params.get_dbt_project_config,
+            config_reader.readin_dbtvg_configs,
+            subprocess.run_shell_operation,
+            schema_merger.merge_schemas,
+            file_io.stream_catalog,
+        ).run(project_dir, overwrite=True)
+
+    return [
+        ("read_configs", read_configs),
+        ("process_configs", lambda: params.process_config_collection(configs)),
+        ("render_templates", lambda: templaters.render_templates(models)),
+        ("load_catalog", lambda: file_io.load_catalog(target_dir)),
+        ("stream_catalog", lambda: file_io.stream_catalog(target_dir)),
+        ("relationships", lambda: relationships.RelationshipIndex(namepairs)),
+        (
+            "infer_columns",
+            lambda: [
+                columns.ColumnInference(namepairs).columns(n) for n, _ in namepairs
+            ],
+        ),
+        ("sql_run", run_sql),
+        ("docs_run", run_docs),
+    ]
+
+
+def run_size(
+    size: int, directories: int, repeats: int, memory: bool
+) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        project_dir = synthetic.build_project(Path(tmp_dir), size, directories)
+        for name, operation in build_stages(project_dir):
+            timings = timed(operation, repeats)
+            result = {
+                "best_s": min(timings),
+                "median_s": statistics.median(timings),
+            }
+            if memory:
+                # Tracing slows everything down, so it gets a pass of its own
+                result["peak_mb"] = peak_memory(operation)
+            results[name] = result
+            print(f"{size:>7} {name:>17}: {_describe(result)}", flush=True)
+    return results
+
+
+def _describe(result: Dict[str, float]) -> str:
+    description = f"best {result['best_s']:.3f}s, median {result['median_s']:.3f}s"
+    if "peak_mb" in result:
+        description += f", peak {result['peak_mb']:.1f} MB"
+    return description
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Prints how the best time of each stage moved against an earlier run"""
+    for size, stages in results["sizes"].items():
+        previous: Optional[Dict[str, Any]] = baseline["sizes"].get(size)
+        if previous is None:
+            continue
+        for name, result in stages.items():
+            if name not in previous:
+                continue
+            ratio = result["best_s"] / max(previous[name]["best_s"], 1e-9)
+            print(f"{size:>7} {name:>17}: {ratio:.2f}x baseline")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--directories", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"))
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument(
+        "--no-memory", action="store_true", help="Skip the peak memory passes"
+    )
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {
+        "metadata": {
+            "dbtvault_generator": version.GENERATOR_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "generated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "directories": args.directories,
+            "repeats": args.repeats,
+        },
+        "sizes": {},
+    }
+    for size in args.sizes:
+        results["sizes"][str(size)] = run_size(
+            size, args.directories, args.repeats, not args.no_memory
+        )
+
+    args.output.write_text(json.dumps(results, indent=2))
+    print(f"results written to {args.output}")
+    if args.baseline is not None:
+        compare(results, json.loads(args.baseline.read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Times the compiled templaters, with and without their rendered macro calls reused,
+when rendering a synthetic set of models.
+
+    cd src && python -m benchmarks.bench_templates --models 50000
+"""
+
+import argparse
+import time
+from typing import Any, Callable, List
+
+from benchmarks import synthetic
+from dbtvault_generator.constants import types
+from dbtvault_generator.parsers import params, templaters
+
+
+def timed(operation: Callable[[], Any], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        operation()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def build_models(count: int) -> List[Any]:
+    options = types.DBTVGConfig().dict()
+    entities = synthetic.vault_models(0, count // 3 + 1)[:count]
+    return [
+        params.model_param_factory(
+            item["model_type"], {**item, "location": ".", "options": options}
+        )
+        for item in entities
+    ]
+
+
+def uncached_macros(models: List[Any]) -> List[str]:
+    rendered: List[str] = []
+    for model in models:
+        templater = templaters.templater_factory(model.model_type)
+        macro = model.options.custom_macros.get(
+            model.model_type, templater.default_macro
+        )
+        template = templaters.CompiledTemplate(templater.template.arguments)
+        rendered.append(template.render(model.dbtvault_arguments, macro))
+    return rendered
+
+
+def compiled_macros(models: List[Any]) -> List[str]:
+    rendered: List[str] = []
+    for model in models:
+        templater = templaters.templater_factory(model.model_type)
+        macro = model.options.custom_macros.get(
+            model.model_type, templater.default_macro
+        )
+        rendered.append(templater.template.render(model.dbtvault_arguments, macro))
+    return rendered
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--models", type=int, default=50000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    models = build_models(args.models)
+    assert uncached_macros(models) == compiled_macros(models)
+    print(f"models: {len(models)}")
+
+    baseline = timed(lambda: uncached_macros(models), args.repeats)
+    compiled = timed(lambda: compiled_macros(models), args.repeats)
+    print(
+        f"  macro call: laid out per model {baseline:.3f}s, reused {compiled:.3f}s "
+        f"({baseline / compiled:.1f}x)"
+    )
+
+    # The yaml metadata block dominates a full render
+    full = timed(lambda: templaters.render_templates(models), 1)
+    print(f"full render: {full:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
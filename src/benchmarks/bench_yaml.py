@@ -0,0 +1,88 @@
+"""
+Compares yaml load and dump throughput of the libyaml and pure Python backends on a
+synthetic corpus of `dbtvault.yml` files.
+
+    cd src && python -m benchmarks.bench_yaml --files 200 --entities 20
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, List, Tuple
+
+import yaml
+
+from benchmarks import synthetic
+from dbtvault_generator.files import file_io
+
+
+def timed(operation: Callable[[], Any], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        operation()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def build_corpus(root: Path, files: int, entities: int) -> List[Path]:
+    paths: List[Path] = []
+    for index in range(files):
+        folder = root / f"dir_{index}"
+        folder.mkdir()
+        config = synthetic.dbtvault_config(
+            synthetic.vault_models(index * entities, entities)
+        )
+        path = folder / "dbtvault.yml"
+        file_io.write_yaml_file(path, config)
+        paths.append(path)
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--entities", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    backends: List[Tuple[str, Any, Any]] = [
+        ("python", yaml.SafeLoader, yaml.SafeDumper)
+    ]
+    if yaml.__with_libyaml__:
+        backends.append(("libyaml", yaml.CSafeLoader, yaml.CSafeDumper))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = build_corpus(Path(tmp_dir), args.files, args.entities)
+        texts = [item.read_text() for item in paths]
+        megabytes = sum(len(item) for item in texts) / 1e6
+        documents = [yaml.load(item, file_io.YamlLoader) for item in texts]
+        models = args.files * args.entities * 3
+        print(f"corpus: {args.files} files, {models} models, {megabytes:.1f} MB")
+
+        for name, loader, dumper in backends:
+            load_time = timed(
+                lambda: [yaml.load(t, loader) for t in texts], args.repeats
+            )
+            dump_time = timed(
+                lambda: [
+                    yaml.dump(d, Dumper=dumper, sort_keys=False) for d in documents
+                ],
+                args.repeats,
+            )
+            print(
+                f"{name:>8}: load {load_time:.3f}s ({megabytes / load_time:.1f} MB/s), "
+                f"dump {dump_time:.3f}s ({megabytes / dump_time:.1f} MB/s)"
+            )
+
+        # What the generator actually uses, with `!include` support on top
+        read_time = timed(
+            lambda: [file_io.read_yml_file(p, ValueError, "") for p in paths],
+            args.repeats,
+        )
+        print(f" file_io: load {read_time:.3f}s ({megabytes / read_time:.1f} MB/s)")
+
+
+if __name__ == "__main__":
+    main()
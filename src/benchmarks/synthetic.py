@@ -0,0 +1,243 @@
+"""Deterministic synthetic `dbtvault.yml` content and dbt projects for benchmarking"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from dbtvault_generator.constants import literals, types
+from dbtvault_generator.files import file_io
+from dbtvault_generator.parsers import columns, fmt_string, params
+
+
+def hub_model(index: int) -> types.Mapping:
+    return {
+        "name": f"entity_{index}",
+        "model_type": "hub",
+        "dbtvault_arguments": {
+            "src_pk": f"ENTITY_{index}_HK",
+            "src_nk": f"ENTITY_{index}_ID",
+            "src_extra_columns": None,
+            "src_ldts": "LOAD_DATETIME",
+            "src_source": "RECORD_SOURCE",
+            "source_model": f"stg_entity_{index}",
+        },
+    }
+
+
+def link_model(index: int) -> types.Mapping:
+    return {
+        "name": f"entity_{index}_{index + 1}",
+        "model_type": "link",
+        "dbtvault_arguments": {
+            "src_pk": f"ENTITY_{index}_{index + 1}_HK",
+            "src_fk": [f"ENTITY_{index}_HK", f"ENTITY_{index + 1}_HK"],
+            "src_extra_columns": None,
+            "src_ldts": "LOAD_DATETIME",
+            "src_source": "RECORD_SOURCE",
+            "source_model": f"stg_entity_{index}",
+        },
+    }
+
+
+def sat_model(index: int, payload_size: int = 8) -> types.Mapping:
+    return {
+        "name": f"entity_{index}_details",
+        "model_type": "sat",
+        "dbtvault_arguments": {
+            "src_pk": f"ENTITY_{index}_HK",
+            "src_hashdiff": f"ENTITY_{index}_HASHDIFF",
+            "src_payload": [f"ATTRIBUTE_{i}" for i in range(payload_size)],
+            "src_extra_columns": None,
+            "src_eff": None,
+            "src_ldts": "LOAD_DATETIME",
+            "src_source": "RECORD_SOURCE",
+            "source_model": f"stg_entity_{index}",
+        },
+    }
+
+
+def pit_model(index: int) -> types.Mapping:
+    return {
+        "name": f"entity_{index}_timeline",
+        "model_type": "pit",
+        "dbtvault_arguments": {
+            "src_pk": f"ENTITY_{index}_HK",
+            "as_of_dates_table": "as_of_date",
+            "satellites": {
+                f"SAT_ENTITY_{index}_DETAILS": {
+                    "pk": {"PK": f"ENTITY_{index}_HK"},
+                    "ldts": {"LDTS": "LOAD_DATETIME"},
+                }
+            },
+            "stage_tables_ldts": {f"stg_entity_{index}": "LOAD_DATETIME"},
+            "src_ldts": "LOAD_DATETIME",
+            "source_model": f"hub_entity_{index}",
+        },
+    }
+
+
+def bridge_model(index: int) -> types.Mapping:
+    return {
+        "name": f"entity_{index}_network",
+        "model_type": "bridge",
+        "dbtvault_arguments": {
+            "source_model": f"hub_entity_{index}",
+            "src_pk": f"ENTITY_{index}_HK",
+            "src_ldts": "LOAD_DATETIME",
+            "bridge_walk": {
+                f"ENTITY_{index}_{index + 1}": {
+                    "bridge_link_pk": f"LINK_ENTITY_{index}_{index + 1}_HK",
+                    "bridge_end_date": "EFF_SAT_END_DATE",
+                    "bridge_load_date": "EFF_SAT_LOAD_DATE",
+                    "link_table": f"lnk_entity_{index}_{index + 1}",
+                    "link_pk": f"ENTITY_{index}_{index + 1}_HK",
+                    "link_fk1": f"ENTITY_{index}_HK",
+                    "link_fk2": f"ENTITY_{index + 1}_HK",
+                }
+            },
+            "as_of_dates_table": "as_of_date",
+            "stage_tables_ldts": {f"stg_entity_{index}": "LOAD_DATETIME"},
+        },
+    }
+
+
+def vault_models(start: int, count: int) -> List[types.Mapping]:
+    """A hub, link and satellite per entity in [start, start + count)"""
+    models: List[types.Mapping] = []
+    for index in range(start, start + count):
+        models.extend([hub_model(index), link_model(index), sat_model(index)])
+    return models
+
+
+def dbtvault_config(models: List[types.Mapping]) -> types.Mapping:
+    return {"version": 2, "dbtvault": {"models": models}}
+
+
+def entity_models(index: int) -> List[types.Mapping]:
+    """A hub, link and satellite per entity, with a PIT and bridge on every tenth"""
+    models = [hub_model(index), link_model(index), sat_model(index)]
+    if index % 10 == 0:
+        models.extend([pit_model(index), bridge_model(index)])
+    return models
+
+
+def project_models(count: int, directories: int) -> Dict[str, List[types.Mapping]]:
+    """Exactly `count` models, keeping each entity's models in the same folder"""
+    folders: Dict[str, List[types.Mapping]] = {}
+    remaining = count
+    index = 0
+    while remaining > 0:
+        models = entity_models(index)[:remaining]
+        folder = f"models/domain_{index % directories}/vault"
+        folders.setdefault(folder, []).extend(models)
+        remaining -= len(models)
+        index += 1
+    return folders
+
+
+def _catalog_node(project_name: str, name: str, columns: List[str]) -> types.Mapping:
+    return {
+        "metadata": {
+            "type": "VIEW",
+            "schema": "dbt_vault",
+            "name": name,
+            "database": "dev",
+            "comment": None,
+            "owner": "dev",
+        },
+        "columns": {
+            column: {"type": "TEXT", "index": position, "name": column, "comment": None}
+            for position, column in enumerate(columns, start=1)
+        },
+        "stats": {
+            "has_stats": {
+                "id": "has_stats",
+                "label": "Has Stats?",
+                "value": False,
+                "include": False,
+                "description": "Indicates whether there are statistics for this table",
+            }
+        },
+        "unique_id": f"model.{project_name}.{name}",
+    }
+
+
+def write_catalog(
+    target_dir: Path,
+    project_name: str,
+    models: List[Tuple[str, types.DBTVGBaseModelParams]],
+) -> None:
+    """A `catalog.json` holding the columns each model would have once built"""
+    column_inference = columns.ColumnInference(models)
+    catalog = {
+        "metadata": {
+            "dbt_schema_version": "https://schemas.getdbt.com/dbt/catalog/v1.json",
+            "dbt_version": "1.4.5",
+            "generated_at": "2023-03-20T00:00:00.000000Z",
+            "invocation_id": "00000000-0000-0000-0000-000000000000",
+            "env": {},
+        },
+        "nodes": {
+            f"model.{project_name}.{name}": _catalog_node(
+                project_name, name, column_inference.columns(name)
+            )
+            for name, _ in models
+        },
+        "sources": {},
+        "errors": None,
+    }
+    target_dir.mkdir(parents=True, exist_ok=True)
+    with open(target_dir / literals.DEFAULT_NAME_CATALOG, "w") as stream:
+        json.dump(catalog, stream)
+
+
+def build_project(root: Path, count: int, directories: int) -> Path:
+    """
+    Writes a dbt project of `count` models spread over `directories` folders. Each
+    satellite's arguments live in an `!include`d fragment, and `target` holds a
+    matching `catalog.json`.
+    """
+    project_name = "synthetic_project"
+    root.mkdir(parents=True, exist_ok=True)
+    file_io.write_yaml_file(
+        root / "dbt_project.yml",
+        {
+            "name": project_name,
+            "version": "1.0.0",
+            "profile": "default",
+            "model-paths": ["models"],
+            "target-path": "target",
+        },
+    )
+    file_io.write_yaml_file(
+        root / literals.DBTVG_YAML_NAME,
+        {"version": 2, "dbtvault": {"defaults": {"use_prefix": True}}},
+    )
+
+    folders = project_models(count, directories)
+    configs: Dict[str, types.Mapping] = {}
+    for folder, folder_models in folders.items():
+        (root / folder / "fragments").mkdir(parents=True)
+        written: List[types.Mapping] = []
+        for model in folder_models:
+            if model["model_type"] != "sat":
+                written.append(model)
+                continue
+            fragment = f"fragments/{model['name']}.yml"
+            file_io.write_yaml_file(
+                root / folder / fragment, {"version": 2, **model["dbtvault_arguments"]}
+            )
+            written.append({**model, "dbtvault_arguments": f"!include {fragment}"})
+        payload = file_io.yaml.dump(
+            dbtvault_config(written), Dumper=file_io.YamlDumper, sort_keys=False
+        )
+        # The dumper quotes tags written as strings, so put them back by hand
+        payload = payload.replace("'!include ", "!include ").replace(".yml'", ".yml")
+        (root / folder / literals.DBTVG_YAML_NAME).write_text(payload)
+        configs[f"./{folder}"] = {"models": [dict(item) for item in folder_models]}
+
+    configs["."] = {"defaults": {"use_prefix": True}}
+    processed = params.process_config_collection(configs)
+    namepairs = [(fmt_string.format_name(item), item) for item in processed]
+    write_catalog(root / "target", project_name, namepairs)
+    return root
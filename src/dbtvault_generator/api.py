@@ -0,0 +1,96 @@
+from collections import defaultdict
+from pathlib import PurePosixPath
+from typing import DefaultDict, Dict, Iterator, List, Optional, Set, Tuple
+
+from dbtvault_generator.constants import literals, types
+from dbtvault_generator.files import file_io
+from dbtvault_generator.generator import runners
+from dbtvault_generator.parsers import fmt_string, params, templaters
+
+"""
+DEVNOTE:
+
+Generation without the filesystem, for services that hold their configs in memory.
+Configs are passed either as the `dbtvault` section of each `dbtvault.yml`, keyed by
+folder the same way the CLI keys them (".", "./models/raw_vault", ...), or as a
+virtual file tree of yaml text keyed by path, which is read with `!include` support.
+
+The `iter_*` functions yield one artefact at a time, so the caller decides what to
+keep. The models themselves are always held, as keys and relationships span the whole
+project.
+"""
+
+ModelPairs = List[Tuple[str, types.DBTVGBaseModelParams]]
+
+
+def _config_key(path: PurePosixPath) -> str:
+    return "." if str(path.parent) == "." else f"./{path.parent.as_posix()}"
+
+
+def configs_from_files(files: Dict[str, str]) -> Dict[str, types.Mapping]:
+    """Reads every `dbtvault.yml` in a virtual file tree into configs keyed by folder"""
+    configs: Dict[str, types.Mapping] = {}
+    files = file_io.normalise_virtual_files(files)
+    for path in sorted(files):
+        filepath = PurePosixPath(path)
+        if filepath.name != literals.DBTVG_YAML_NAME:
+            continue
+        config = file_io.read_virtual_yml(files, path)
+        if literals.DBTVG_CONFIG_KEY in config:
+            configs[_config_key(filepath)] = config[literals.DBTVG_CONFIG_KEY]
+    return configs
+
+
+def load_models(configs: Dict[str, types.Mapping]) -> ModelPairs:
+    """Validates every model in the configs, paired with its generated name"""
+    models = params.process_config_collection(configs)
+    return [(fmt_string.format_name(item), item) for item in models]
+
+
+def iter_sql(configs: Dict[str, types.Mapping]) -> Iterator[Tuple[str, str]]:
+    """Yields the name and rendered sql of each model in turn"""
+    for name, model in load_models(configs):
+        yield name, templaters.templater_factory(model.model_type)(model)
+
+
+def generate_sql(configs: Dict[str, types.Mapping]) -> Dict[str, str]:
+    return dict(iter_sql(configs))
+
+
+def _schema_path(target_path: str) -> str:
+    folder = PurePosixPath(target_path)
+    return (folder / literals.DEFAULT_NAME_SCHEMA_YAML).as_posix()
+
+
+def iter_docs(
+    configs: Dict[str, types.Mapping],
+    catalog_models: Optional[Dict[str, types.CatalogModel]] = None,
+    model_names: Optional[Set[str]] = None,
+) -> Iterator[Tuple[str, types.Mapping]]:
+    """
+    Yields the `schema.yml` path and entry of each model in turn. The catalog, if
+    given, adds data types; `model_names` restricts which models are documented
+    """
+    all_namepairs = load_models(configs)
+    model_namepairs = [
+        (name, model)
+        for name, model in all_namepairs
+        if model_names is None or model.name in model_names
+    ]
+    entries = runners.schema_entries(
+        model_namepairs, all_namepairs, catalog_models or {}
+    )
+    for target_path, entry in entries:
+        yield _schema_path(target_path), entry
+
+
+def generate_docs(
+    configs: Dict[str, types.Mapping],
+    catalog_models: Optional[Dict[str, types.CatalogModel]] = None,
+    model_names: Optional[Set[str]] = None,
+) -> Dict[str, types.Mapping]:
+    """Each `schema.yml` payload, as `dbtv-gen docs --overwrite` would write it"""
+    schemas: DefaultDict[str, List[types.Mapping]] = defaultdict(list)
+    for path, entry in iter_docs(configs, catalog_models, model_names):
+        schemas[path].append(entry)
+    return {path: {"version": 2, "models": models} for path, models in schemas.items()}
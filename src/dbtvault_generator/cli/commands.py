@@ -1,11 +1,22 @@
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional
 
 import typer
 
-from dbtvault_generator.files import file_io
-from dbtvault_generator.generator import readers, runners, subprocess
-from dbtvault_generator.parsers import params
+from dbtvault_generator.constants import literals
+
+if TYPE_CHECKING:
+    from dbtvault_generator.constants import types
+    from dbtvault_generator.generator import profiling, sharding
+
+"""
+DEVNOTE:
+
+The CLI runs from pre-commit hooks, often many times a minute, so this module only
+imports what building the commands needs. Each command imports the modules it uses
+when it runs; `--help` never builds a pydantic model or touches the dbt artifacts.
+"""
 
 dbtvgen = typer.Typer(pretty_exceptions_show_locals=False)
 
@@ -33,24 +44,232 @@ param_args_overwrite: bool = typer.Option(  # type: ignore
     help=("Specifies whether to overwrite any existing files"),
 )
 
+param_no_cache: bool = typer.Option(  # type: ignore
+    False,
+    "--no-cache",
+    help="Re-parse every `dbtvault.yml` rather than using the cache in target",
+)
+
+param_ignore_dirs: Optional[List[str]] = typer.Option(  # type: ignore
+    None,
+    "--ignore-dir",
+    help=(
+        "A directory name or glob pattern to skip when searching for `dbtvault.yml` "
+        "files. Can be passed multiple times"
+    ),
+)
+
+param_jobs: int = typer.Option(  # type: ignore
+    1,
+    "--jobs",
+    "-j",
+    min=1,
+    help="The number of processes used to render and write models",
+)
+
+param_incremental: bool = typer.Option(  # type: ignore
+    False,
+    "--incremental",
+    help=(
+        "Only rebuild models from `dbtvault.yml` files that changed since the last "
+        "incremental run"
+    ),
+)
+
+param_no_catalog: bool = typer.Option(  # type: ignore
+    False,
+    "--no-catalog",
+    help=(
+        "Document columns purely from `dbtvault.yml`, without reading data types "
+        "from the DBT catalog"
+    ),
+)
+
+param_from_dbt: bool = typer.Option(  # type: ignore
+    False,
+    "--from-dbt",
+    help=(
+        "Without a catalog, read columns and data types by running dbt-codegen's "
+        "`generate_model_yaml` against the warehouse"
+    ),
+)
+
+param_state: Optional[Path] = typer.Option(  # type: ignore
+    None,
+    "--state",
+    help=(
+        "A folder holding the `manifest.json` and `catalog.json` of a previous run. "
+        "Only models that changed since then are documented"
+    ),
+)
+
+param_poll_interval: float = typer.Option(  # type: ignore
+    0.5,
+    "--poll-interval",
+    min=0.05,
+    help="Seconds between checks when native file notifications are unavailable",
+)
+
+param_profile: bool = typer.Option(  # type: ignore
+    False,
+    "--profile",
+    help="Print the time spent in each phase of the run, and what it processed",
+)
+
+param_profile_json: Optional[Path] = typer.Option(  # type: ignore
+    None,
+    "--profile-json",
+    help="Write the same profile as `--profile` to a json file",
+)
+
+param_socket: Optional[Path] = typer.Option(  # type: ignore
+    None,
+    "--socket",
+    help="Listen on this Unix domain socket instead of a localhost port",
+)
+
+param_port: int = typer.Option(  # type: ignore
+    8765,
+    "--port",
+    min=0,
+    max=65535,
+    help=(
+        "The localhost port to listen on when no socket is given. Anyone on the "
+        "machine can connect to it, so prefer `--socket` on shared machines"
+    ),
+)
+
+
+param_shard: Optional[str] = typer.Option(  # type: ignore
+    None,
+    "--shard",
+    help=(
+        "Only generate the models of shard i of N, given as i/N, to split a run "
+        "across CI workers"
+    ),
+)
+
+param_balance: Optional[Path] = typer.Option(  # type: ignore
+    None,
+    "--balance",
+    help=(
+        "Timings from a previous sharded run, as written by `merge-shards`, to "
+        "balance the shards by. `sql` shards also skip unchanged files they don't need"
+    ),
+)
+
+param_shards_dir: Optional[Path] = typer.Option(  # type: ignore
+    None,
+    "--shards-dir",
+    help="The folder holding every shard's output, by default `dbtvg_shards` in target",
+)
+
+
+param_cache_dir: Optional[Path] = typer.Option(  # type: ignore
+    None,
+    "--cache-dir",
+    envvar="DBTVG_CACHE_DIR",
+    help=(
+        "A folder to keep rendered sql in, keyed by model content, so it can be "
+        "shared between checkouts and branches"
+    ),
+)
+
+param_cache_size: int = typer.Option(  # type: ignore
+    literals.RENDER_CACHE_MAX_BYTES // (1024 * 1024),
+    "--cache-size",
+    min=1,
+    help="The size in MB `--cache-dir` is kept under, evicting the least recently used",
+)
+
+
+@contextmanager
+def profiled(
+    profile: bool, profile_json: Optional[Path]
+) -> Iterator["profiling.Profiler"]:
+    """Reports the run's profile once it finishes, even if it fails"""
+    from dbtvault_generator.generator import profiling
+
+    enabled = profile or profile_json is not None
+    profiler = profiling.Profiler(profiling.load_hooks() if enabled else None)
+    try:
+        yield profiler
+    finally:
+        if profile:
+            typer.echo(profiler.report(), err=True)
+        if profile_json is not None:
+            profiler.write_json(profile_json)
+
+
+def shard_plan(
+    shard: Optional[str], balance: Optional[Path]
+) -> Optional["sharding.ShardPlan"]:
+    from dbtvault_generator.generator import sharding
+
+    if shard is None:
+        return None
+    index, count = sharding.parse_shard(shard)
+    timings = None if balance is None else sharding.read_timings(balance)
+    return sharding.ShardPlan(index, count, timings)
+
+
+def yml_reader(
+    project_path: Path, target_folder: Optional[str], no_cache: bool
+) -> "types.ReaderFunction":
+    from dbtvault_generator.files import cache, file_io
+    from dbtvault_generator.parsers import params
+
+    if no_cache:
+        return file_io.read_yml_file
+    project_config = params.get_dbt_project_config(project_path, target_folder)
+    cache_dir = project_path / project_config.target_dir / literals.DBTVG_CACHE_NAME
+    return cache.ParseCache(cache_dir).read_yml_file
+
 
 @dbtvgen.command()
 def sql(
     ctx: typer.Context,
     project_path: Path = param_project_dir,
     overwrite: bool = param_args_overwrite,
+    incremental: bool = param_incremental,
+    jobs: int = param_jobs,
+    no_cache: bool = param_no_cache,
+    ignore_dirs: Optional[List[str]] = param_ignore_dirs,
+    profile: bool = param_profile,
+    profile_json: Optional[Path] = param_profile_json,
+    shard: Optional[str] = param_shard,
+    balance: Optional[Path] = param_balance,
+    cache_dir: Optional[Path] = param_cache_dir,
+    cache_size: int = param_cache_size,
 ) -> None:
     """
     Run the generation from `dbtvault.yml` to sql, per model directory
     """
-    config_file_reader = readers.ConfigReader(file_io.read_yml_file)
+    from dbtvault_generator.files import cache, file_io
+    from dbtvault_generator.generator import readers, runners, state
+    from dbtvault_generator.parsers import params
 
-    job_runner = runners.SqlGenerator(
-        params.get_dbt_project_config,
-        config_file_reader.readin_dbtvg_configs,
-        file_io.write_text,
-    )
-    job_runner.run(project_path, overwrite)
+    if incremental and shard is not None:
+        raise typer.BadParameter("--incremental can't be combined with --shard")
+
+    with profiled(profile, profile_json) as profiler:
+        reader_fn = yml_reader(project_path, None, no_cache)
+        config_file_reader = readers.ConfigReader(reader_fn, ignore_dirs, profiler)
+
+        job_runner = runners.SqlGenerator(
+            params.get_dbt_project_config,
+            config_file_reader.readin_dbtvg_configs,
+            file_io.write_text,
+            state.BuildState() if incremental else None,
+            profiler,
+            shard_plan(shard, balance),
+            (
+                None
+                if cache_dir is None
+                else cache.RenderCache(cache_dir, cache_size * 1024 * 1024)
+            ),
+        )
+        job_runner.run(project_path, overwrite, jobs)
 
 
 @dbtvgen.command()
@@ -60,26 +279,198 @@ def docs(
     target_folder: Optional[str] = param_target_folder,
     args: Optional[str] = param_args_yaml,
     overwrite: bool = param_args_overwrite,
+    no_catalog: bool = param_no_catalog,
+    from_dbt: bool = param_from_dbt,
+    state_path: Optional[Path] = param_state,
+    no_cache: bool = param_no_cache,
+    ignore_dirs: Optional[List[str]] = param_ignore_dirs,
+    profile: bool = param_profile,
+    profile_json: Optional[Path] = param_profile_json,
+    shard: Optional[str] = param_shard,
+    balance: Optional[Path] = param_balance,
 ) -> None:
     """
     Scan for all available metadata to augment any existing documentation
     """
-    # # Check for install first
-    # readers.ExecEnvReader(subprocess.run_shell_operation).check_dbt_install()
+    from dbtvault_generator.files import file_io
+    from dbtvault_generator.generator import (
+        backends,
+        readers,
+        runners,
+        state,
+        subprocess,
+    )
+    from dbtvault_generator.parsers import params
+
+    with profiled(profile, profile_json) as profiler:
+        # Configure job runner
+        reader_fn = yml_reader(project_path, target_folder, no_cache)
+        config_file_reader = readers.ConfigReader(reader_fn, ignore_dirs, profiler)
+        schema_merge_file = readers.SchemaMerger(
+            file_io.read_yml_file, file_io.write_yaml_file
+        )
+        catalog_loader_fn = None if no_catalog else file_io.stream_catalog
+        # dbt runs in this process if it's installed alongside, and is only looked
+        # for once a run needs it
+        docgen_catalog_fn = (
+            backends.DocgenCatalogLoader(["--project-dir", str(project_path)])
+            if from_dbt
+            else None
+        )
+        docs_state = (
+            None
+            if state_path is None
+            else state.DocsState(state_path, file_io.load_manifest, catalog_loader_fn)
+        )
+        job_runner = runners.DocsGenerator(
+            params.get_dbt_project_config,
+            config_file_reader.readin_dbtvg_configs,
+            subprocess.run_shell_operation,
+            schema_merge_file.merge_schemas,
+            catalog_loader_fn,
+            docs_state,
+            profiler,
+            shard_plan(shard, balance),
+            docgen_catalog_fn,
+        )
+        job_runner.run(project_path, target_folder, args, overwrite)
+
 
-    # Configure job runner
-    config_file_reader = readers.ConfigReader(file_io.read_yml_file)
+@dbtvgen.command("merge-shards")
+def merge_shards(
+    ctx: typer.Context,
+    project_path: Path = param_project_dir,
+    target_folder: Optional[str] = param_target_folder,
+    shards_dir: Optional[Path] = param_shards_dir,
+    overwrite: bool = param_args_overwrite,
+) -> None:
+    """
+    Write the `schema.yml` files from every `docs --shard` run, and combine the
+    timings of every `sql --shard` run for `--balance`
+    """
+    from dbtvault_generator.files import file_io
+    from dbtvault_generator.generator import readers, sharding
+    from dbtvault_generator.parsers import params
+
+    if shards_dir is None:
+        project_config = params.get_dbt_project_config(project_path, target_folder)
+        target_dir = project_path / project_config.target_dir
+        shards_dir = target_dir / literals.DBTVG_SHARDS_NAME
     schema_merge_file = readers.SchemaMerger(
         file_io.read_yml_file, file_io.write_yaml_file
     )
-    job_runner = runners.DocsGenerator(
+    written, skipped = sharding.merge_shards(
+        shards_dir, project_path, schema_merge_file.merge_schemas, overwrite
+    )
+    typer.echo(f"Wrote {written} schema file(s), {skipped} already up to date")
+
+
+@dbtvgen.command("watch")
+def watch_project(
+    ctx: typer.Context,
+    project_path: Path = param_project_dir,
+    overwrite: bool = param_args_overwrite,
+    poll_interval: float = param_poll_interval,
+    ignore_dirs: Optional[List[str]] = param_ignore_dirs,
+) -> None:
+    """
+    Generate sql, then keep regenerating the models affected by each saved edit.
+    Edited models are always rewritten; `--overwrite` only applies to the first run
+    """
+    from dbtvault_generator.constants import types
+    from dbtvault_generator.files import file_io, watch
+    from dbtvault_generator.generator import readers, runners, workspace
+    from dbtvault_generator.parsers import params
+
+    config_file_reader = readers.ConfigReader(file_io.read_yml_file, ignore_dirs)
+    project = workspace.Workspace(
+        params.get_dbt_project_config,
+        config_file_reader,
+        file_io.read_yml_file_with_dependencies,
+    )
+
+    def render(models: List[types.DBTVGBaseModelParams], replace: bool) -> None:
+        written = runners.render_models(
+            models, project.project_path, replace, file_io.write_text
+        )
+        typer.echo(f"Generated {len(written)} of {len(models)} model(s)")
+
+    def on_change(models: List[types.DBTVGBaseModelParams]) -> None:
+        # The files exist from the first run, and the edit is why we're here
+        render(models, True)
+
+    def on_error(e: Exception) -> None:
+        typer.echo(f"Skipping update: {e}", err=True)
+
+    render(project.load(project_path), overwrite)
+    typer.echo("Watching for changes, press Ctrl+C to stop")
+    try:
+        workspace.watch(
+            project, watch.watcher_factory(poll_interval), on_change, on_error
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+@dbtvgen.command()
+def serve(
+    ctx: typer.Context,
+    project_path: Path = param_project_dir,
+    socket_path: Optional[Path] = param_socket,
+    port: int = param_port,
+    poll_interval: float = param_poll_interval,
+    ignore_dirs: Optional[List[str]] = param_ignore_dirs,
+) -> None:
+    """
+    Keep the project loaded and answer JSON-RPC requests about it, e.g. from the GUI
+    """
+    import signal
+    import threading
+
+    from dbtvault_generator.files import file_io, watch
+    from dbtvault_generator.generator import readers, server, workspace
+    from dbtvault_generator.parsers import params
+
+    config_file_reader = readers.ConfigReader(file_io.read_yml_file, ignore_dirs)
+    project = workspace.Workspace(
         params.get_dbt_project_config,
-        config_file_reader.readin_dbtvg_configs,
-        subprocess.run_shell_operation,
-        schema_merge_file.merge_schemas,
-        file_io.load_catalog,
+        config_file_reader,
+        file_io.read_yml_file_with_dependencies,
+    )
+    service = server.ProjectService(project, file_io.write_text)
+    service.load(project_path)
+
+    address: server.Address = (
+        ("127.0.0.1", port) if socket_path is None else str(socket_path)
+    )
+    stop = threading.Event()
+    watcher = threading.Thread(
+        target=service.watch,
+        args=(watch.watcher_factory(poll_interval), stop),
+        daemon=True,
     )
-    job_runner.run(project_path, target_folder, args, overwrite)
+    # Stop as cleanly when asked to by a process manager as on Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    with server.create_server(service, address) as listener:
+        watcher.start()
+        # The port is only known once bound, when it was left to the OS
+        bound: Any = listener.server_address
+        location = bound if isinstance(bound, str) else f"{bound[0]}:{bound[1]}"
+        typer.echo(f"Serving {len(project.all_models)} model(s) on {location}")
+        if socket_path is None:
+            typer.echo(
+                "Warning: the port is unauthenticated, any local user can write "
+                "models through it. Pass --socket to restrict access",
+                err=True,
+            )
+        try:
+            listener.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop.set()
+            if socket_path is not None:
+                socket_path.unlink(missing_ok=True)
 
 
 @dbtvgen.command()
@@ -10,6 +10,10 @@ class DBTVaultConfigInvalidError(ValueError):
     pass
 
 
+class IncludeCycleError(DBTVaultConfigInvalidError):
+    pass
+
+
 class NoDbtInstallError(ImportError):
     pass
 
@@ -24,3 +28,19 @@ class SubprocessFailed(ValueError):
 
 class DbtArtifactError(TypeError):
     pass
+
+
+class CatalogNotFoundError(DbtArtifactError):
+    pass
+
+
+class ModelGenerationError(ValueError):
+    pass
+
+
+class ShardMergeError(ValueError):
+    pass
+
+
+class SocketInUseError(OSError):
+    pass
@@ -10,9 +10,36 @@ DBTVG_NAME_KEY = "name"
 
 DEFAULT_MODELS = ["models"]
 DEFAULT_TARGET = "target"  # this is subject to change in 1.5
+# Directory names that never hold project configs, pruned wherever they turn up
+DEFAULT_IGNORE_DIRS = [
+    ".git",
+    "__pycache__",
+    ".venv",
+    "venv",
+    ".tox",
+    ".nox",
+    "node_modules",
+    ".mypy_cache",
+    ".pytest_cache",
+]
+# Folders dbt fills at the project root, pruned there alongside the target folder
+DEFAULT_PROJECT_IGNORE_DIRS = ["dbt_packages", "dbt_modules", "logs"]
 DEFAULT_NAME_MANIFEST = "manifest.json"
 DEFAULT_NAME_CATALOG = "catalog.json"
 DEFAULT_NAME_SCHEMA_YAML = "schema.yml"
+DBTVG_STATE_NAME = ".dbtvg_state.json"
+DBTVG_CACHE_NAME = ".dbtvg_cache"
+DBTVG_SHARDS_NAME = "dbtvg_shards"
+DBTVG_SHARD_TIMINGS_NAME = "timings.json"
+RENDER_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Evictions go down to this fraction of the limit
+RENDER_CACHE_PRUNE_TO = 0.8
+PROFILE_HOOK_ENTRY_POINT = "dbtvault_generator.profile_hooks"
+# Windows caps a command line at 32767 characters, the tightest of the platforms
+DBT_COMMAND_LIMIT = 32_000
+DBT_OPERATION_JOBS = 4
+# Where dbt 1.5+ keeps its programmatic runner, `dbtRunner`
+DBT_RUNNER_MODULE = "dbt.cli.main"
 
 
 # this seems dumb, but I may need to generate into fake file file types and let
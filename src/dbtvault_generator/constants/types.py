@@ -1,5 +1,18 @@
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Literal, Optional, Tuple, Type, Union
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
 import pydantic
 
@@ -58,7 +71,8 @@ class DBTVaultSatellite(pydantic.BaseModel):
 
 class StageParams(pydantic.BaseModel):
     include_source_columns: bool = True
-    source_model: Mapping
+    # A mapping selects a dbt source, a string another model
+    source_model: Union[Mapping, str]
     derived_columns: Optional[Mapping] = None
     null_columns: Optional[Mapping] = None
     hashed_columns: Optional[Mapping] = None
@@ -218,9 +232,20 @@ class DbtCatalog(pydantic.BaseModel):
     models: Dict[str, CatalogModel]
 
 
+class ManifestModel(pydantic.BaseModel):
+    name: str
+    checksum: str
+    config: Mapping
+
+
+class DbtManifest(pydantic.BaseModel):
+    models: Dict[str, ManifestModel]
+
+
 class RelationshipExtract(pydantic.BaseModel):
     primary_key: Optional[str] = None
     foreign_keys: List[str] = []
+    key_columns: List[str] = []
 
 
 class DocgenForeignKey(pydantic.BaseModel):
@@ -248,10 +273,21 @@ class DocgenModels(pydantic.BaseModel):
 
 PipeOutput = Tuple[str, str, bool]
 ShellOperationFn = Callable[[List[str]], str]
+ShellStreamFn = Callable[[List[str], Optional[float]], Iterator[str]]
 GetProjectConfigFn = Callable[[Path, Optional[str]], ProjectConfig]
-FindDbtvaultGenConfig = Callable[[Path, str, bool], Dict[str, Mapping]]
+ConfigFileFilter = Callable[[str, Path], Optional[Mapping]]
+FindDbtvaultGenConfig = Callable[
+    [Path, List[str], List[str], Optional[ConfigFileFilter]], Dict[str, Mapping]
+]
 ReaderFunction = Callable[[Path, Type[Exception], str], Mapping]
-DictWriterFunction = Callable[[Path, Mapping], None]
-StringWriterFunction = Callable[[Path, str], None]
-SchemaMergeFn = Callable[[Path, Mapping, bool], None]
-CatalogLoadFn = Callable[[Path], DbtCatalog]
+DependencyReaderFunction = Callable[
+    [Path, Type[Exception], str], Tuple[Mapping, List[Path]]
+]
+DictWriterFunction = Callable[[Path, Mapping], bool]
+StringWriterFunction = Callable[[Path, str], bool]
+SchemaMergeFn = Callable[[Path, Mapping, bool], bool]
+CatalogLoadFn = Callable[[Path, Optional[Set[str]]], DbtCatalog]
+DocgenCatalogFn = Callable[[List[str]], DbtCatalog]
+ManifestLoadFn = Callable[[Path], DbtManifest]
+SpanFn = Callable[[str], ContextManager[Any]]
+RenderFn = Callable[[DBTVGBaseModelParams], str]
@@ -0,0 +1,7 @@
+from importlib import metadata
+
+try:
+    GENERATOR_VERSION: str = metadata.version("dbtvault-generator")
+except metadata.PackageNotFoundError:
+    # Running from a source checkout that was never installed
+    GENERATOR_VERSION = "0.0.0+unknown"
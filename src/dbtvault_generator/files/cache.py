@@ -0,0 +1,280 @@
+import os
+import sys
+import hashlib
+import importlib
+import marshal
+import tempfile
+import time
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Type, Union
+
+from dbtvault_generator.constants import literals, types
+from dbtvault_generator.constants.version import GENERATOR_VERSION
+from dbtvault_generator.files import file_io
+
+# marshal output is only stable within a Python version
+CACHE_VERSION = f"{GENERATOR_VERSION}-py{sys.version_info[0]}.{sys.version_info[1]}"
+
+FileStamp = Tuple[int, int, str]
+
+
+def _digest(filepath: Path) -> str:
+    return hashlib.sha256(filepath.read_bytes()).hexdigest()
+
+
+def _stamp(filepath: Path) -> FileStamp:
+    stat = filepath.stat()
+    return stat.st_mtime_ns, stat.st_size, _digest(filepath)
+
+
+class ParseCache:
+    """
+    Keeps parsed yaml files on disk so unchanged files skip the yaml parser. Entries are
+    checked against the path, mtime, size and content hash of the file and of every
+    file it `!include`s.
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+
+    def _entry_path(self, filepath: Path) -> Path:
+        key = hashlib.sha256(str(filepath.absolute()).encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.marshal"
+
+    def _load(self, entry_path: Path) -> Optional[types.Mapping]:
+        try:
+            with open(entry_path, "rb") as stream:
+                entry = marshal.load(stream)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(entry, dict) or entry.get("version") != CACHE_VERSION:
+            return None
+        return entry
+
+    def _refresh(self, stamps: Dict[str, FileStamp]) -> Optional[Dict[str, FileStamp]]:
+        """
+        The stamps brought up to date if every file still holds what was parsed, so a
+        touched but unchanged file is only hashed once; None if any file changed
+        """
+        current: Dict[str, FileStamp] = {}
+        for filename, (mtime, size, digest) in stamps.items():
+            filepath = Path(filename)
+            try:
+                stat = filepath.stat()
+            except OSError:
+                return None
+            if stat.st_size != size:
+                return None
+            # Only pay for the hash when something has touched the file
+            if stat.st_mtime_ns != mtime and _digest(filepath) != digest:
+                return None
+            current[filename] = (stat.st_mtime_ns, size, digest)
+        return current
+
+    def _store(self, entry_path: Path, entry: types.Mapping) -> None:
+        try:
+            payload = marshal.dumps(entry)
+        except ValueError:
+            # Some yaml types (e.g. timestamps) can't be marshalled; just don't cache
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        handle, temp_name = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as stream:
+                stream.write(payload)
+            os.replace(temp_name, entry_path)
+        except OSError:
+            Path(temp_name).unlink(missing_ok=True)
+
+    def read_yml_file(
+        self,
+        filepath: Union[Path, str],
+        excepion: Type[Exception],
+        message: str,
+    ) -> types.Mapping:
+        filepath = Path(filepath)
+        entry_path = self._entry_path(filepath)
+        entry = self._load(entry_path)
+        if entry is not None:
+            stamps = self._refresh(entry["files"])
+            if stamps is not None:
+                if stamps != entry["files"]:
+                    self._store(entry_path, {**entry, "files": stamps})
+                return entry["data"]
+
+        # Stamp before parsing, so an edit made mid-read invalidates the entry
+        stamps = {str(filepath): _stamp(filepath)}
+        data, includes = file_io.read_yml_file_with_dependencies(
+            filepath, excepion, message
+        )
+        for item in includes:
+            stamps[str(item)] = _stamp(item)
+        self._store(
+            entry_path, {"version": CACHE_VERSION, "files": stamps, "data": data}
+        )
+        return data
+
+
+"""
+DEVNOTE:
+
+Rendering is a pure function of a model's validated params and the rendering code,
+so rendered sql can be shared by every checkout, worktree and branch on a machine.
+Entries are named by a hash of both, so they never need invalidating, and only ever
+written whole through a rename, so any number of processes can read and write at once;
+two writers of one entry are writing the same text.
+
+The store is kept to size by evicting the least recently used entries, going by mtime,
+which hits refresh. Rather than walk the store after every run, each write appends its
+size to a journal, and the walk only happens once the total might be over the limit.
+Concurrent prunes may evict a little more than needed, which only costs re-renders.
+"""
+
+# The modules whose code decides what sql a model renders to
+RENDER_MODULES = (
+    "dbtvault_generator.parsers.templaters",
+    "dbtvault_generator.constants.types",
+    "dbtvault_generator.files.file_io",
+)
+
+
+@lru_cache(maxsize=None)
+def render_fingerprint() -> str:
+    """
+    The generator version along with a hash of the rendering code. Source checkouts
+    that were never installed all share a placeholder version, so the code itself is
+    what keeps branches with different templates from sharing entries
+    """
+    digest = hashlib.sha256(GENERATOR_VERSION.encode("utf-8"))
+    for name in RENDER_MODULES:
+        module_file = importlib.import_module(name).__file__
+        assert module_file is not None
+        digest.update(Path(module_file).read_bytes())
+    return digest.hexdigest()
+
+
+_JOURNAL_NAME = "journal"
+_TOTAL_NAME = "total"
+# Hits only refresh an entry's mtime when it's older than this, to save on writes
+_TOUCH_AFTER_SECONDS = 3600
+
+
+def _write_atomic(directory: Path, filepath: Path, payload: bytes) -> None:
+    handle, temp_name = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as stream:
+            stream.write(payload)
+        os.replace(temp_name, filepath)
+    except OSError:
+        Path(temp_name).unlink(missing_ok=True)
+
+
+class RenderCache:
+    """Rendered sql on disk, keyed by the content of the model that was rendered"""
+
+    def __init__(
+        self, cache_dir: Path, max_bytes: int = literals.RENDER_CACHE_MAX_BYTES
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(model: types.DBTVGBaseModelParams) -> str:
+        # Field order is fixed by the param classes, so the json is canonical for a
+        # given version of the code. pydantic 1 only has `.json`
+        dump = getattr(model, "model_dump_json", None) or model.json
+        payload = f"{render_fingerprint()}\n{dump()}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        # Fanned out, so no one folder grows too large to list
+        return self.cache_dir / key[:2] / f"{key}.sql"
+
+    def get(self, key: str) -> Optional[str]:
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "rb") as stream:
+                mtime = os.fstat(stream.fileno()).st_mtime
+                content = stream.read()
+        except OSError:
+            return None
+        if time.time() - mtime > _TOUCH_AFTER_SECONDS:
+            try:
+                os.utime(entry_path)
+            except OSError:
+                pass
+        return content.decode("utf-8")
+
+    def put(self, key: str, sql: str) -> None:
+        entry_path = self._entry_path(key)
+        payload = sql.encode("utf-8")
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+        except OSError:
+            return
+        _write_atomic(entry_path.parent, entry_path, payload)
+        try:
+            # Small appends are atomic, so writers never garble each other's lines
+            with open(self.cache_dir / _JOURNAL_NAME, "a") as stream:
+                stream.write(f"{len(payload)}\n")
+        except OSError:
+            pass
+
+    def render(
+        self, render_fn: types.RenderFn, model: types.DBTVGBaseModelParams
+    ) -> str:
+        key = self.key(model)
+        sql = self.get(key)
+        if sql is None:
+            sql = render_fn(model)
+            self.put(key, sql)
+        return sql
+
+    def cached(self, render_fn: types.RenderFn) -> types.RenderFn:
+        """Wraps `render_fn` in the cache. The result pickles, for process pools"""
+        return partial(self.render, render_fn)
+
+    def _read_int(self, name: str) -> int:
+        try:
+            lines = (self.cache_dir / name).read_text().split()
+            return sum(int(item) for item in lines)
+        except (OSError, ValueError):
+            return 0
+
+    def prune(self) -> int:
+        """Evicts least recently used entries once over size, returning how many"""
+        estimate = self._read_int(_TOTAL_NAME) + self._read_int(_JOURNAL_NAME)
+        if estimate <= self.max_bytes:
+            return 0
+        # Counted from here by the walk
+        (self.cache_dir / _JOURNAL_NAME).unlink(missing_ok=True)
+
+        entries: List[Tuple[float, int, str]] = []
+        for folder in os.scandir(self.cache_dir):
+            if not folder.is_dir():
+                continue
+            for item in os.scandir(folder.path):
+                if not item.name.endswith(".sql"):
+                    continue
+                try:
+                    stat = item.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, item.path))
+
+        total = sum(size for _, size, _ in entries)
+        # Go well under the limit, so the next few runs don't have to walk again
+        target = int(self.max_bytes * literals.RENDER_CACHE_PRUNE_TO)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        _write_atomic(self.cache_dir, self.cache_dir / _TOTAL_NAME, str(total).encode())
+        return removed
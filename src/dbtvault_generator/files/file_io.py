@@ -1,16 +1,62 @@
+import os
 import json
+import posixpath
+import secrets
+import stat
+from copy import deepcopy
 from io import TextIOWrapper
 from pathlib import Path
-from typing import Dict, Type, Union
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
 import yaml
-from dbt_artifacts_parser import parser as dbta_parser  # type: ignore
 from yaml.parser import ParserError
 
 from dbtvault_generator.constants import exceptions, literals, types
 
+# Prefer the libyaml bindings, which are several times faster than pure Python
+try:
+    from yaml import CSafeDumper as YamlDumper
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:  # PyYAML was built without libyaml
+    from yaml import SafeDumper as YamlDumper  # type: ignore
+    from yaml import SafeLoader as YamlLoader  # type: ignore
 
-class Loader(yaml.SafeLoader):
+FileStamp = Tuple[int, int]
+# The stamps of a target and everything it includes, its data and its dependencies
+IncludeEntry = Tuple[Dict[Path, FileStamp], types.Mapping, List[Path]]
+# Parsed `!include` targets, shared by every file that includes them
+_include_cache: Dict[Path, IncludeEntry] = {}
+
+
+def clear_include_cache() -> None:
+    _include_cache.clear()
+
+
+def _stamp(filepath: Path) -> FileStamp:
+    stat = filepath.stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _is_current(entry: IncludeEntry) -> bool:
+    """An entry only holds while neither its file nor any nested include changed"""
+    try:
+        return all(_stamp(path) == stamp for path, stamp in entry[0].items())
+    except OSError:
+        return False
+
+
+class Loader(YamlLoader):
     """
     Full credit to: https://stackoverflow.com/questions/
         528281/how-can-i-include-a-yaml-file-inside-another
@@ -18,42 +64,195 @@ class Loader(yaml.SafeLoader):
 
     def __init__(self, stream: TextIOWrapper):
         self._root = Path(stream.name).parent
+        # The files currently being loaded, outermost first, to catch include cycles
+        self._chain: Tuple[Path, ...] = (Path(stream.name).resolve(),)
+        # Every file pulled in through `!include`, so callers can track them
+        self.dependencies: List[Path] = []
+        # The stamps of those files, as they were when they were read
+        self.stamps: Dict[Path, FileStamp] = {}
 
         super(Loader, self).__init__(stream)
 
-    def include(self, node: yaml.ScalarNode) -> types.Mapping:
-        filename = self._root / str(self.construct_scalar(node))
+    def _check_cycle(self, filename: Path, dependencies: List[Path]) -> None:
+        cycle = filename in self._chain or any(
+            item in self._chain for item in dependencies
+        )
+        if cycle:
+            chain = " -> ".join(str(item) for item in self._chain + (filename,))
+            raise exceptions.IncludeCycleError(f"Circular !include detected: {chain}")
+
+    def _load_include(self, filename: Path) -> IncludeEntry:
+        cached = _include_cache.get(filename)
+        if cached is not None and _is_current(cached):
+            return cached
+
+        # Taken before reading, so an edit made mid-read is caught next time
+        stamp = _stamp(filename)
+
         with open(filename, "r") as stream:
-            data: types.Mapping = yaml.load(stream, Loader)
-            data.pop("version", None)
-            return data
+            loader = Loader(stream)
+            loader._chain = self._chain + (filename,)
+            try:
+                data: types.Mapping = loader.get_single_data()
+            finally:
+                loader.dispose()
+        data.pop("version", None)
+        stamps = {filename: stamp, **loader.stamps}
+        _include_cache[filename] = (stamps, data, loader.dependencies)
+        return _include_cache[filename]
+
+    def include(self, node: yaml.ScalarNode) -> types.Mapping:
+        filename = (self._root / str(self.construct_scalar(node))).resolve()
+        self._check_cycle(filename, [])
+        stamps, data, dependencies = self._load_include(filename)
+        # A cached target may already contain one of our parents further down
+        self._check_cycle(filename, dependencies)
+        self.dependencies.append(filename)
+        self.dependencies.extend(dependencies)
+        self.stamps.update(stamps)
+        # Callers are free to mutate what they get back, so never hand out the cache
+        return deepcopy(data)
 
 
 Loader.add_constructor("!include", Loader.include)
 
 
-def read_yml_file(
+class VirtualLoader(YamlLoader):
+    """
+    Reads a yaml document out of an in-memory file tree, keyed by posix path, with
+    `!include` resolved against that tree rather than the disk
+    """
+
+    def __init__(self, files: Dict[str, str], path: str, chain: Tuple[str, ...] = ()):
+        self.files = files
+        self._path = posixpath.normpath(path)
+        self._chain = chain + (self._path,)
+        if self._path not in files:
+            raise exceptions.DBTVaultConfigInvalidError(
+                f"{self._path} does not exist in the file tree"
+            )
+        super(VirtualLoader, self).__init__(files[self._path])
+
+    def include(self, node: yaml.ScalarNode) -> types.Mapping:
+        folder = posixpath.dirname(self._path)
+        target = posixpath.normpath(
+            posixpath.join(folder, str(self.construct_scalar(node)))
+        )
+        if target in self._chain:
+            chain = " -> ".join(self._chain + (target,))
+            raise exceptions.IncludeCycleError(f"Circular !include detected: {chain}")
+        if target not in self.files:
+            raise exceptions.DBTVaultConfigInvalidError(
+                f"{self._path} includes {target}, which does not exist"
+            )
+        loader = VirtualLoader(self.files, target, self._chain)
+        try:
+            data: types.Mapping = loader.get_single_data()
+        finally:
+            loader.dispose()
+        data.pop("version", None)
+        return data
+
+
+VirtualLoader.add_constructor("!include", VirtualLoader.include)
+
+
+def normalise_virtual_files(files: Dict[str, str]) -> Dict[str, str]:
+    """Re-keys a virtual file tree by normalised path, as `!include` looks them up"""
+    normalised: Dict[str, str] = {}
+    for path, text in files.items():
+        key = posixpath.normpath(path)
+        if key in normalised:
+            raise exceptions.DBTVaultConfigInvalidError(
+                f"{path} is given more than once in the file tree"
+            )
+        normalised[key] = text
+    return normalised
+
+
+def read_virtual_yml(files: Dict[str, str], path: str) -> types.Mapping:
+    """Reads `path` out of a file tree keyed as `normalise_virtual_files` leaves it"""
+    loader = VirtualLoader(files, path)
+    try:
+        try:
+            return loader.get_single_data()
+        finally:
+            loader.dispose()
+    except ParserError:
+        raise exceptions.DBTVaultConfigInvalidError(f"Error reading in file {path}")
+
+
+def read_yml_file_with_dependencies(
     filepath: Union[Path, str], excepion: Type[Exception], message: str
-) -> types.Mapping:
+) -> Tuple[types.Mapping, List[Path]]:
     try:
         with open(filepath, "r") as stream:
-            output: types.Mapping = yaml.load(stream, Loader)
+            loader = Loader(stream)
+            try:
+                output: types.Mapping = loader.get_single_data()
+            finally:
+                loader.dispose()
     except ParserError:
         raise excepion(message)
-    return output
+    return output, loader.dependencies
+
+
+def read_yml_file(
+    filepath: Union[Path, str], excepion: Type[Exception], message: str
+) -> types.Mapping:
+    return read_yml_file_with_dependencies(filepath, excepion, message)[0]
+
+
+def _is_unchanged(filepath: Path, content: bytes) -> bool:
+    try:
+        # A size check rules out almost every real edit without reading the file
+        if filepath.stat().st_size != len(content):
+            return False
+        return filepath.read_bytes() == content
+    except OSError:
+        return False
+
+
+def write_bytes(filepath: Union[Path, str], content: bytes) -> bool:
+    """
+    Writes the file only if its content would change, returning whether it did. An
+    untouched file keeps its mtime, so dbt's partial parsing can still trust it. The
+    new content is written beside the file and swapped in, so readers never see a
+    half-written file.
+    """
+    filepath = Path(filepath)
+    if _is_unchanged(filepath, content):
+        return False
+
+    try:
+        mode: Optional[int] = stat.S_IMODE(filepath.stat().st_mode)
+    except OSError:
+        mode = None
+    temp_path = filepath.parent / f".{filepath.name}.{secrets.token_hex(8)}.tmp"
+    # A plain exclusive create, so a new file gets the permissions the umask allows
+    stream = open(temp_path, "xb")
+    try:
+        with stream:
+            stream.write(content)
+        if mode is not None:
+            os.chmod(temp_path, mode)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return True
 
 
 def write_yaml_file(
     filepath: Union[Path, str],
     data: types.Mapping,
-) -> None:
-    with open(filepath, "w") as stream:
-        yaml.dump(data, stream, sort_keys=False)
+) -> bool:
+    payload = yaml.dump(data, Dumper=YamlDumper, sort_keys=False)
+    return write_bytes(filepath, payload.encode("utf-8"))
 
 
-def write_text(filepath: Union[Path, str], payload: str):
-    with open(filepath, "w") as buffer:
-        buffer.write(payload)
+def write_text(filepath: Union[Path, str], payload: str) -> bool:
+    return write_bytes(filepath, payload.encode("utf-8"))
 
 
 """
@@ -67,26 +266,42 @@ object.
 """
 
 
-def load_catalog(target_path: Path) -> types.DbtCatalog:
+def _catalog_path(target_path: Path) -> Path:
     catalog_path = target_path / literals.DEFAULT_NAME_CATALOG
     if not catalog_path.is_file():
-        raise exceptions.DbtArtifactError(
+        raise exceptions.CatalogNotFoundError(
             f"Catalog file {literals.DEFAULT_NAME_CATALOG} does not exist. Run "
             "`docs generate` to create file"
         )
+    return catalog_path
+
+
+def _catalog_parse_error() -> exceptions.DbtArtifactError:
+    return exceptions.DbtArtifactError(
+        f"Catalog file {literals.DEFAULT_NAME_CATALOG} could not be loaded due "
+        "to parsing error. Rebuild it as it likely contains errors"
+    )
+
+
+def load_catalog(
+    target_path: Path, model_names: Optional[Set[str]] = None
+) -> types.DbtCatalog:
+    # Builds thousands of artifact classes on import, so only pay for it when used
+    from dbt_artifacts_parser import parser as dbta_parser  # type: ignore
+
+    catalog_path = _catalog_path(target_path)
     try:
         with open(catalog_path, "r") as stream:
             data = json.load(stream)
     except json.JSONDecodeError:
-        raise exceptions.DbtArtifactError(
-            f"Catalog file {literals.DEFAULT_NAME_CATALOG} could not be loaded due "
-            "to parsing error. Rebuild it as it likely contains errors"
-        )
+        raise _catalog_parse_error()
     catalog = dbta_parser.parse_catalog(data)  # type: ignore
     models: Dict[str, types.CatalogModel] = {}
     for key, value in catalog.nodes.items():
         if not key.startswith("model"):
             continue
+        if model_names is not None and value.metadata.name not in model_names:
+            continue
         columns: Dict[str, types.CatalogModelColumn] = {
             name: types.CatalogModelColumn(name=name, dtype=metadata.type)
             for name, metadata in value.columns.items()
@@ -94,3 +309,181 @@ def load_catalog(target_path: Path) -> types.DbtCatalog:
         model = types.CatalogModel(name=value.metadata.name, columns=columns)
         models[model.name] = model
     return types.DbtCatalog(models=models)
+
+
+"""
+DEVNOTE:
+
+A full `catalog.json` can run to hundreds of MB, most of it sources, seeds and stats
+we never look at. `stream_catalog` walks the raw parse events instead, so only the
+model nodes that were asked for are ever built. `ijson` is an optional extra; without
+it we fall back to a plain json load, which still skips the typed artifact parse.
+"""
+
+
+class CatalogEventReader:
+    def __init__(
+        self, events: Iterable[Tuple[str, Any]], model_names: Optional[Set[str]]
+    ):
+        self.events = iter(events)
+        self.model_names = model_names
+
+    def skip(self, event: str) -> None:
+        """Consumes the value opened by `event` without building it"""
+        if event not in ("start_map", "start_array"):
+            return
+        depth = 1
+        for event, _ in self.events:
+            if event in ("start_map", "start_array"):
+                depth += 1
+            elif event in ("end_map", "end_array"):
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def items(self) -> Iterator[Tuple[str, str, Any]]:
+        """Walks the current map, yielding each key with the event opening its value"""
+        for event, key in self.events:
+            if event == "end_map":
+                return
+            event, value = next(self.events)
+            yield key, event, value
+
+    def read_columns(self) -> Dict[str, types.CatalogModelColumn]:
+        columns: Dict[str, types.CatalogModelColumn] = {}
+        for name, event, _ in self.items():
+            dtype: Optional[str] = None
+            if event != "start_map":
+                self.skip(event)
+                continue
+            for key, event, value in self.items():
+                if key == "type":
+                    dtype = value
+                self.skip(event)
+            columns[name] = types.CatalogModelColumn(name=name, dtype=dtype)
+        return columns
+
+    def read_model(self) -> Optional[types.CatalogModel]:
+        name: Optional[str] = None
+        columns: Dict[str, types.CatalogModelColumn] = {}
+        for key, event, _ in self.items():
+            if key == "metadata" and event == "start_map":
+                for meta_key, event, value in self.items():
+                    if meta_key == "name":
+                        name = value
+                    self.skip(event)
+                if self.model_names is not None and name not in self.model_names:
+                    # Drop the rest of the node without reading it
+                    self.skip("start_map")
+                    return None
+            elif key == "columns" and event == "start_map":
+                columns = self.read_columns()
+            else:
+                self.skip(event)
+        if name is None:
+            return None
+        return types.CatalogModel(name=name, columns=columns)
+
+    def read(self) -> types.DbtCatalog:
+        models: Dict[str, types.CatalogModel] = {}
+        event, _ = next(self.events)
+        if event != "start_map":
+            raise _catalog_parse_error()
+        for key, event, _ in self.items():
+            if key != "nodes" or event != "start_map":
+                self.skip(event)
+                continue
+            for unique_id, event, _ in self.items():
+                if not unique_id.startswith("model.") or event != "start_map":
+                    self.skip(event)
+                    continue
+                model = self.read_model()
+                if model is not None:
+                    models[model.name] = model
+        return types.DbtCatalog(models=models)
+
+
+def _catalog_from_nodes(
+    nodes: types.Mapping, model_names: Optional[Set[str]]
+) -> types.DbtCatalog:
+    models: Dict[str, types.CatalogModel] = {}
+    for key, value in nodes.items():
+        name = value.get("metadata", {}).get("name")
+        if not key.startswith("model.") or name is None:
+            continue
+        if model_names is not None and name not in model_names:
+            continue
+        columns: Dict[str, types.CatalogModelColumn] = {
+            column: types.CatalogModelColumn(name=column, dtype=metadata.get("type"))
+            for column, metadata in value.get("columns", {}).items()
+        }
+        models[name] = types.CatalogModel(name=name, columns=columns)
+    return types.DbtCatalog(models=models)
+
+
+def stream_catalog(
+    target_path: Path, model_names: Optional[Set[str]] = None
+) -> types.DbtCatalog:
+    catalog_path = _catalog_path(target_path)
+    try:
+        import ijson  # type: ignore
+    except ImportError:
+        try:
+            with open(catalog_path, "r") as stream:
+                data = json.load(stream)
+        except json.JSONDecodeError:
+            raise _catalog_parse_error()
+        return _catalog_from_nodes(data.get("nodes", {}), model_names)
+
+    try:
+        with open(catalog_path, "rb") as stream:
+            reader = CatalogEventReader(ijson.basic_parse(stream), model_names)
+            return reader.read()
+    except (ijson.JSONError, StopIteration):
+        raise _catalog_parse_error()
+
+
+def _manifest_model(node: types.Mapping) -> types.ManifestModel:
+    return types.ManifestModel(
+        name=node["name"],
+        checksum=node.get("checksum", {}).get("checksum", ""),
+        config=node.get("config", {}),
+    )
+
+
+def load_manifest(target_path: Path) -> types.DbtManifest:
+    """Reads the name, checksum and config of every model in `manifest.json`"""
+    manifest_path = target_path / literals.DEFAULT_NAME_MANIFEST
+    if not manifest_path.is_file():
+        raise exceptions.DbtArtifactError(
+            f"Manifest file {literals.DEFAULT_NAME_MANIFEST} does not exist in "
+            f"{str(target_path)}. Run `dbt compile` or `dbt docs generate` to create it"
+        )
+    parse_error = exceptions.DbtArtifactError(
+        f"Manifest file {literals.DEFAULT_NAME_MANIFEST} could not be loaded due to "
+        "parsing error. Rebuild it as it likely contains errors"
+    )
+
+    models: Dict[str, types.ManifestModel] = {}
+    try:
+        import ijson  # type: ignore
+    except ImportError:
+        try:
+            with open(manifest_path, "r") as stream:
+                nodes = json.load(stream).get("nodes", {})
+        except json.JSONDecodeError:
+            raise parse_error
+        for unique_id, node in nodes.items():
+            if unique_id.startswith("model."):
+                models[node["name"]] = _manifest_model(node)
+        return types.DbtManifest(models=models)
+
+    try:
+        with open(manifest_path, "rb") as stream:
+            # Nodes are built one at a time, so the whole manifest is never in memory
+            for unique_id, node in ijson.kvitems(stream, "nodes", use_float=True):
+                if unique_id.startswith("model."):
+                    models[node["name"]] = _manifest_model(node)
+    except ijson.JSONError:
+        raise parse_error
+    return types.DbtManifest(models=models)
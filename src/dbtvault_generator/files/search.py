@@ -1,11 +1,77 @@
+import os
+import fnmatch
 from pathlib import Path
-from typing import List
+from typing import Collection, Iterable, Iterator, List, Tuple
 
 
-def find_files(
-    search_dir: Path,
+def dedupe_roots(search_dirs: Iterable[Path]) -> List[Path]:
+    """Drops any search dir that sits inside another, so nothing is walked twice"""
+    roots: List[Path] = []
+    candidates = sorted(
+        {item.absolute() for item in search_dirs}, key=lambda x: x.parts
+    )
+    for candidate in candidates:
+        if not any(root == candidate or root in candidate.parents for root in roots):
+            roots.append(candidate)
+    return roots
+
+
+def _is_ignored(name: str, ignore_dirs: Collection[str]) -> bool:
+    return any(fnmatch.fnmatch(name, pattern) for pattern in ignore_dirs)
+
+
+def _walk(
+    search_dirs: Iterable[Path],
+    ignore_dirs: Collection[str],
+    prune_paths: Collection[Path],
+) -> Iterator[Tuple[Path, List[str]]]:
+    """Yields each directory under the search dirs along with the files it holds"""
+    pruned = {item.absolute() for item in prune_paths}
+    for root in dedupe_roots(search_dirs):
+        stack = [root]
+        while len(stack) > 0:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    items = sorted(entries, key=lambda x: x.name)
+            except (FileNotFoundError, NotADirectoryError, PermissionError):
+                continue
+            subdirs: List[Path] = []
+            files: List[str] = []
+            for entry in items:
+                if entry.is_dir(follow_symlinks=False):
+                    path = Path(entry.path)
+                    if path not in pruned and not _is_ignored(entry.name, ignore_dirs):
+                        subdirs.append(path)
+                else:
+                    files.append(entry.name)
+            yield current, files
+            # Reversed so that the walk comes back off the stack in name order
+            stack.extend(reversed(subdirs))
+
+
+def walk_files(
+    search_dirs: Iterable[Path],
     search_string: str,
-    recursive: bool = True,
-) -> List[Path]:
-    operation = search_dir.rglob if recursive else search_dir.glob
-    return list(operation(search_string))
+    ignore_dirs: Collection[str] = (),
+    prune_paths: Collection[Path] = (),
+) -> Iterator[Path]:
+    """
+    Lazily yields every file named `search_string` under the search dirs in a single
+    pass, pruning any directory whose name matches one of `ignore_dirs` or whose path
+    is one of `prune_paths`. A directory's own file is always yielded before anything
+    in its subdirectories.
+    """
+    for directory, files in _walk(search_dirs, ignore_dirs, prune_paths):
+        if search_string in files:
+            yield directory / search_string
+
+
+def walk_dirs(
+    search_dirs: Iterable[Path],
+    ignore_dirs: Collection[str] = (),
+    prune_paths: Collection[Path] = (),
+) -> Iterator[Path]:
+    """Lazily yields every directory `walk_files` would search"""
+    for directory, _ in _walk(search_dirs, ignore_dirs, prune_paths):
+        yield directory
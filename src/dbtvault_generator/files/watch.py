@@ -0,0 +1,190 @@
+import os
+import sys
+import abc
+import ctypes
+import ctypes.util
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Collection, Dict, Optional, Set, Tuple
+
+FileStamp = Tuple[int, int]
+
+
+class BaseWatcher(abc.ABC):
+    @abc.abstractmethod
+    def wait(
+        self,
+        files: Collection[Path],
+        dirs: Collection[Path],
+        timeout: Optional[float] = None,
+    ) -> Set[Path]:
+        """
+        Blocks until a watched file changes or a watched directory gains or loses an
+        entry, returning the paths that changed. An empty set means it timed out.
+        """
+
+
+class PollingWatcher(BaseWatcher):
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._stamps: Dict[Path, Optional[FileStamp]] = {}
+
+    @staticmethod
+    def _stamp(path: Path) -> Optional[FileStamp]:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _poll(self, paths: Collection[Path]) -> Set[Path]:
+        changed: Set[Path] = set()
+        for path in paths:
+            stamp = self._stamp(path)
+            # Paths seen for the first time are the baseline, not a change
+            if path in self._stamps and self._stamps[path] != stamp:
+                changed.add(path)
+            self._stamps[path] = stamp
+        return changed
+
+    def wait(
+        self,
+        files: Collection[Path],
+        dirs: Collection[Path],
+        timeout: Optional[float] = None,
+    ) -> Set[Path]:
+        paths = set(files) | set(dirs)
+        self._stamps = {
+            key: self._stamps.get(key) for key in paths if key in self._stamps
+        }
+        # Catch anything that changed while the caller was busy with the last batch
+        changed = self._poll(paths)
+        if len(changed) > 0:
+            return changed
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while deadline is None or time.monotonic() < deadline:
+            time.sleep(self.interval)
+            changed = self._poll(paths)
+            if len(changed) > 0:
+                return changed
+        return set()
+
+
+class InotifyWatcher(BaseWatcher):
+    """
+    Watches the directories holding the files of interest, so files replaced by
+    editors through a rename are still caught
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    WATCH_MASK = (
+        IN_MODIFY
+        | IN_ATTRIB
+        | IN_CLOSE_WRITE
+        | IN_MOVED_FROM
+        | IN_MOVED_TO
+        | IN_CREATE
+        | IN_DELETE
+        | IN_DELETE_SELF
+        | IN_MOVE_SELF
+    )
+    ENTRY_MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, debounce: float = 0.05):
+        self.debounce = debounce
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "Could not initialise inotify")
+        self._watches: Dict[int, Path] = {}
+        self._paths: Dict[Path, int] = {}
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+    def _sync_watches(self, dirs: Set[Path]) -> None:
+        for path in set(self._paths) - dirs:
+            self._libc.inotify_rm_watch(self._fd, self._paths.pop(path))
+        for path in dirs - set(self._paths):
+            wd = self._libc.inotify_add_watch(
+                self._fd, str(path).encode(), self.WATCH_MASK
+            )
+            if wd >= 0:
+                self._watches[wd] = path
+                self._paths[path] = wd
+
+    def _read_events(self, files: Set[Path], dirs: Set[Path]) -> Set[Path]:
+        changed: Set[Path] = set()
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = self.EVENT_HEADER.unpack_from(buffer, offset)
+            offset += self.EVENT_HEADER.size
+            name = buffer[offset : offset + length].rstrip(b"\0").decode()
+            offset += length
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            if mask & self.IN_IGNORED:
+                # The kernel dropped the watch, most likely as the directory went
+                self._watches.pop(wd, None)
+                self._paths.pop(directory, None)
+                changed.add(directory)
+                continue
+            path = directory / name if name else directory
+            if path in files:
+                changed.add(path)
+            if directory in dirs and mask & self.ENTRY_MASK:
+                changed.add(directory)
+            if mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF):
+                changed.add(directory)
+        return changed
+
+    def wait(
+        self,
+        files: Collection[Path],
+        dirs: Collection[Path],
+        timeout: Optional[float] = None,
+    ) -> Set[Path]:
+        file_set, dir_set = set(files), set(dirs)
+        self._sync_watches(dir_set | {item.parent for item in file_set})
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed: Set[Path] = set()
+        while len(changed) == 0:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            ready, _, _ = select.select([self._fd], [], [], remaining)
+            if len(ready) == 0:
+                break
+            changed |= self._read_events(file_set, dir_set)
+            # Saves and renames arrive as bursts of events, so gather the whole burst
+            while select.select([self._fd], [], [], self.debounce)[0]:
+                changed |= self._read_events(file_set, dir_set)
+        return changed
+
+
+def watcher_factory(poll_interval: float = 0.5) -> BaseWatcher:
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError):
+            # No inotify in this libc, or the watch limit is exhausted
+            pass
+    return PollingWatcher(poll_interval)
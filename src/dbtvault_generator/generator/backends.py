@@ -0,0 +1,213 @@
+import abc
+import importlib
+import importlib.util
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from dbtvault_generator.constants import exceptions, literals, types
+from dbtvault_generator.generator import readers, subprocess
+
+"""
+DEVNOTE:
+
+Where dbt commands run. A fresh `dbt` process re-imports dbt and re-parses the whole
+project before doing anything, which on a large project is most of the time a docs run
+takes. From dbt 1.5 the same commands can be invoked in this process through
+`dbtRunner`, which also takes an already parsed manifest, so the project is parsed
+once and every operation after that skips straight to the work.
+
+dbt keeps its event callbacks and flags in module globals, so in-process calls take
+turns. They can't be interrupted either: a timeout stops the wait, not dbt.
+
+Even looking for dbt imports its packages, so the backend is only chosen once a run
+actually needs dbt, never up front.
+"""
+
+_DONE = object()
+
+
+def _dbt_args(command: List[str], project_args: List[str]) -> List[str]:
+    args = command[1:] if command[:1] == ["dbt"] else command
+    return args + project_args
+
+
+class DbtBackend(abc.ABC):
+    def __init__(self, project_args: Optional[List[str]] = None):
+        # Added to every command, to point dbt at the project and its profile
+        self.project_args = project_args or []
+
+    @abc.abstractmethod
+    def run(self, command: List[str]) -> str:
+        """Runs a `dbt ...` command, returning what it printed"""
+
+    @abc.abstractmethod
+    def stream(
+        self, command: List[str], timeout: Optional[float] = None
+    ) -> Iterator[str]:
+        """Runs a `dbt ...` command, yielding each line it prints as it's printed"""
+
+
+class SubprocessBackend(DbtBackend):
+    def run(self, command: List[str]) -> str:
+        args = _dbt_args(command, self.project_args)
+        return subprocess.run_shell_operation(["dbt", *args])
+
+    def stream(
+        self, command: List[str], timeout: Optional[float] = None
+    ) -> Iterator[str]:
+        args = _dbt_args(command, self.project_args)
+        return subprocess.stream_shell_operation(["dbt", *args], timeout)
+
+
+def _event_lines(event: Any) -> List[str]:
+    # Laid out the way dbt prints to the console, so output parses the same either way
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    return f"{timestamp}  {event.info.msg}\n".splitlines(keepends=True)
+
+
+class InProcessBackend(DbtBackend):
+    def __init__(
+        self,
+        project_args: Optional[List[str]] = None,
+        module_name: str = literals.DBT_RUNNER_MODULE,
+    ):
+        super().__init__(project_args)
+        self.module_name = module_name
+        self.manifest: Any = None
+        self.lock = threading.Lock()
+
+    def _runner_class(self) -> Any:
+        return getattr(importlib.import_module(self.module_name), "dbtRunner")
+
+    def _parse(self, runner_class: Any) -> Any:
+        # Parsed once, then handed to every command after
+        if self.manifest is None:
+            result = runner_class().invoke(["parse", *self.project_args])
+            if not result.success:
+                raise exceptions.SubprocessFailed(
+                    f"dbt could not parse the project: {result.exception}"
+                )
+            self.manifest = result.result
+        return self.manifest
+
+    def _invoke(self, command: List[str], emit: Callable[[str], None]) -> None:
+        def callback(event: Any) -> None:
+            for line in _event_lines(event):
+                emit(line)
+
+        args = _dbt_args(command, self.project_args)
+        with self.lock:
+            runner_class = self._runner_class()
+            runner = runner_class(
+                manifest=self._parse(runner_class), callbacks=[callback]
+            )
+            result = runner.invoke(args)
+        if not result.success:
+            raise exceptions.SubprocessFailed(
+                f"Call to dbt {' '.join(args[:2])} did not succeed: {result.exception}"
+            )
+
+    def stream(
+        self, command: List[str], timeout: Optional[float] = None
+    ) -> Iterator[str]:
+        lines: "queue.Queue[Any]" = queue.Queue()
+        outcome: Dict[str, BaseException] = {}
+
+        def work() -> None:
+            try:
+                self._invoke(command, lines.put)
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                lines.put(_DONE)
+
+        threading.Thread(target=work, daemon=True).start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        recent: Deque[str] = deque(maxlen=20)
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            try:
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                line = lines.get(timeout=remaining)
+            except queue.Empty:
+                output = "".join(recent).replace("\n", "")
+                raise exceptions.SubprocessFailed(
+                    f"Call to dbt timed out after {timeout}s, text printed: {output}"
+                )
+            if line is _DONE:
+                break
+            recent.append(line)
+            yield line
+
+        error = outcome.get("error")
+        if isinstance(error, exceptions.SubprocessFailed):
+            raise error
+        elif error is not None:
+            raise exceptions.SubprocessFailed(f"Call to dbt failed: {error}")
+
+    def run(self, command: List[str]) -> str:
+        return "".join(self.stream(command))
+
+
+def load_backend(
+    project_args: Optional[List[str]] = None,
+    module_name: str = literals.DBT_RUNNER_MODULE,
+) -> DbtBackend:
+    """
+    Runs dbt in this process where it can be imported, else through the `dbt` on
+    the path. dbt itself is only imported once a command is run
+    """
+    try:
+        found = importlib.util.find_spec(module_name) is not None
+    except ModuleNotFoundError:
+        found = False
+    if found:
+        return InProcessBackend(project_args, module_name)
+    return SubprocessBackend(project_args)
+
+
+class DocgenCatalogLoader:
+    """
+    Reads columns through `generate_model_yaml` on the backend `load_backend` picks,
+    which is only chosen, and dbt only looked for, on the first call
+    """
+
+    def __init__(
+        self,
+        project_args: Optional[List[str]] = None,
+        module_name: str = literals.DBT_RUNNER_MODULE,
+        jobs: int = literals.DBT_OPERATION_JOBS,
+        timeout: Optional[float] = None,
+        limit: int = literals.DBT_COMMAND_LIMIT,
+    ):
+        self.project_args = project_args
+        self.module_name = module_name
+        self.jobs = jobs
+        self.timeout = timeout
+        self.limit = limit
+        self.backend: Optional[DbtBackend] = None
+
+    def _load(self) -> DbtBackend:
+        if self.backend is None:
+            backend = load_backend(self.project_args, self.module_name)
+            if isinstance(backend, SubprocessBackend):
+                # Fail clearly before any work, rather than on the first chunk
+                readers.ExecEnvReader(
+                    subprocess.run_shell_operation
+                ).check_dbt_install()
+            self.backend = backend
+        return self.backend
+
+    def __call__(self, model_names: List[str]) -> types.DbtCatalog:
+        backend = self._load()
+        # The backend adds the project args itself, so they come out of each chunk's
+        # share of the command line
+        limit = self.limit - sum(len(item) + 1 for item in backend.project_args)
+        return subprocess.load_docgen_catalog(
+            [], model_names, self.jobs, self.timeout, backend.stream, limit
+        )
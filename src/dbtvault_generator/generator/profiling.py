@@ -0,0 +1,103 @@
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from importlib import metadata
+from pathlib import Path
+from typing import Any, DefaultDict, Dict, Iterator, List, Optional
+
+from dbtvault_generator.constants import literals, types
+
+"""
+DEVNOTE:
+
+Spans are opened per phase of a run, never per model, so profiling is always on and
+costs next to nothing. Each span is named by its path from the outermost one, e.g.
+`sql/read_configs/parse`, which is what the summary groups on. Hooks see every span as
+it opens and closes, so they can be forwarded to an external tracer as they happen.
+"""
+
+
+class Span:
+    def __init__(self, name: str, path: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.path = path
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.duration = 0.0
+
+
+class ProfileHook:
+    """Receives every span as it opens and closes. Override either method"""
+
+    def span_started(self, span: Span) -> None:
+        pass
+
+    def span_finished(self, span: Span) -> None:
+        pass
+
+
+class Profiler:
+    def __init__(self, hooks: Optional[List[ProfileHook]] = None):
+        self.hooks = hooks or []
+        self.counters: DefaultDict[str, int] = defaultdict(int)
+        self.calls: DefaultDict[str, int] = defaultdict(int)
+        self.totals: Dict[str, float] = {}
+        self._stack: List[Span] = []
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        path = name if len(self._stack) == 0 else f"{self._stack[-1].path}/{name}"
+        span = Span(name, path, attributes)
+        # Registering paths as they open keeps every parent ahead of its children
+        self.totals.setdefault(path, 0.0)
+        self._stack.append(span)
+        for hook in self.hooks:
+            hook.span_started(span)
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - span.start
+            self._stack.pop()
+            self.calls[path] += 1
+            self.totals[path] += span.duration
+            for hook in self.hooks:
+                hook.span_finished(span)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] += amount
+
+    def summary(self) -> types.Mapping:
+        return {
+            "spans": [
+                {"path": path, "calls": self.calls[path], "seconds": self.totals[path]}
+                for path in self.totals
+            ],
+            "counters": dict(self.counters),
+        }
+
+    def report(self) -> str:
+        lines = [f"{'phase':<40}{'calls':>8}{'seconds':>12}"]
+        for path in self.totals:
+            depth = path.count("/")
+            label = "  " * depth + path.rsplit("/", 1)[-1]
+            lines.append(f"{label:<40}{self.calls[path]:>8}{self.totals[path]:>12.3f}")
+        if len(self.counters) > 0:
+            lines.append("")
+            lines.extend(f"{k:<40}{v:>20}" for k, v in sorted(self.counters.items()))
+        return "\n".join(lines)
+
+    def write_json(self, filepath: Path) -> None:
+        filepath.write_text(json.dumps(self.summary(), indent=2))
+
+
+def load_hooks() -> List[ProfileHook]:
+    """Instantiates hooks other packages register under the profile hook entry point"""
+    found: Any = metadata.entry_points()
+    group = literals.PROFILE_HOOK_ENTRY_POINT
+    # Python 3.9 hands back a dict of groups, and only 3.10 on can select from them
+    if hasattr(found, "select"):
+        entry_points = found.select(group=group)
+    else:
+        entry_points = found.get(group, [])
+    return [item.load()() for item in entry_points]
@@ -1,45 +1,90 @@
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional
 
 from dbtvault_generator.constants import exceptions, literals, types
 from dbtvault_generator.files import search
-from dbtvault_generator.parsers import params
+from dbtvault_generator.generator import profiling
+from dbtvault_generator.parsers import schemas
+
+
+def config_key(project_dir: Path, filepath: Path) -> str:
+    """Strips the leading path, leaving the folder relative to the project root"""
+    folder = filepath.parent.absolute().relative_to(project_dir.absolute())
+    return "." if folder == Path(".") else f"./{folder.as_posix()}"
 
 
 class ConfigReader:
-    def __init__(self, reader_function: types.ReaderFunction):
+    def __init__(
+        self,
+        reader_function: types.ReaderFunction,
+        ignore_dirs: Optional[List[str]] = None,
+        profiler: Optional[profiling.Profiler] = None,
+    ):
         self.reader_function = reader_function
+        self.ignore_dirs = literals.DEFAULT_IGNORE_DIRS + (ignore_dirs or [])
+        self.profiler = profiler or profiling.Profiler()
+
+    @staticmethod
+    def prune_paths(project_dir: Path, ignore_dirs: List[str]) -> List[Path]:
+        """
+        The folders dbt fills at the project root, and the given project-relative
+        ones, matched by path so model folders of the same name are still searched
+        """
+        folders = literals.DEFAULT_PROJECT_IGNORE_DIRS + ignore_dirs
+        return [(project_dir / item).absolute() for item in folders]
+
+    def find_dbtvg_configs(
+        self,
+        project_dir: Path,
+        model_folders: List[str],
+        ignore_dirs: List[str],
+    ) -> Iterator[Path]:
+        """
+        Yields the root config, then everything under the model folders. `ignore_dirs`
+        are folders relative to the project, such as the target folder
+        """
+        root_config = (project_dir / literals.DBTVG_YAML_NAME).absolute()
+        if root_config.is_file():
+            yield root_config
+        search_dirs = [project_dir / item for item in model_folders]
+        for filepath in search.walk_files(
+            search_dirs,
+            literals.DBTVG_YAML_NAME,
+            self.ignore_dirs,
+            self.prune_paths(project_dir, ignore_dirs),
+        ):
+            # Model folders may include the project root itself
+            if filepath != root_config:
+                yield filepath
 
     def readin_dbtvg_configs(
         self,
         project_dir: Path,
-        model_folder: str = "",
-        recursive: bool = False,
+        model_folders: List[str],
+        ignore_dirs: List[str],
+        file_filter: Optional[types.ConfigFileFilter] = None,
     ) -> Dict[str, types.Mapping]:
-        # Search through the specified folder for config files
-        search_path = project_dir / model_folder
-        files = search.find_files(search_path, literals.DBTVG_YAML_NAME, recursive)
-        # Strip the leading path
-        keys = [
-            "."
-            + str(item)
-            .replace(str(project_dir), "")
-            .replace(f"/{literals.DBTVG_YAML_NAME}", "")
-            for item in files
-        ]
-        configs: List[types.Mapping] = [
-            self.reader_function(
-                file,
-                exceptions.DBTVaultConfigInvalidError,
-                f"Error reading in file {str(file)}",
-            )
-            for file in files
-        ]
-        return {
-            key: config[literals.DBTVG_CONFIG_KEY]
-            for key, config in zip(keys, configs)
-            if literals.DBTVG_CONFIG_KEY in config
-        }
+        configs: Dict[str, types.Mapping] = {}
+        # Parse each file as soon as the walk turns it up
+        for file in self.find_dbtvg_configs(project_dir, model_folders, ignore_dirs):
+            key = config_key(project_dir, file)
+            self.profiler.count("files_scanned")
+            # The filter can hand back a stand-in for files that needn't be re-read
+            stand_in = None if file_filter is None else file_filter(key, file)
+            if stand_in is not None:
+                configs[key] = stand_in
+                continue
+            # Whether these bytes get parsed, or come from a cache, is up to the reader
+            self.profiler.count("bytes_read", file.stat().st_size)
+            with self.profiler.span("parse"):
+                config = self.reader_function(
+                    file,
+                    exceptions.DBTVaultConfigInvalidError,
+                    f"Error reading in file {str(file)}",
+                )
+            if literals.DBTVG_CONFIG_KEY in config:
+                configs[key] = config[literals.DBTVG_CONFIG_KEY]
+        return configs
 
 
 class ExecEnvReader:
@@ -66,16 +111,18 @@ class SchemaMerger:
 
     def merge_schemas(
         self, target_path: Path, model_payload: types.Mapping, overwrite: bool
-    ) -> None:
+    ) -> bool:
         # Save and exit, don't need to merge
         if overwrite or not target_path.is_file():
-            self.writer_function(target_path, model_payload)
-            return
+            return self.writer_function(target_path, model_payload)
 
         existing = self.reader_function(
             target_path,
             exceptions.DbtArtifactError,
             f"The existing schema at {str(target_path)} is in an invalid format",
         )
-        updated_schema = params.recursive_merge(model_payload, existing)
-        self.writer_function(target_path, updated_schema)
+        updated_schema = schemas.merge_schema(model_payload, existing)
+        if updated_schema is existing:
+            # Everything generated is already in the file
+            return False
+        return self.writer_function(target_path, updated_schema)
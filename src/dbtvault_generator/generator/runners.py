@@ -1,10 +1,15 @@
 import abc
+import time
+import warnings
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import DefaultDict, List, Optional, Tuple
+from typing import DefaultDict, Dict, Iterator, List, Optional, Tuple
 
-from dbtvault_generator.constants import literals, types
-from dbtvault_generator.parsers import fmt_string, params
+from dbtvault_generator.constants import exceptions, literals, types
+from dbtvault_generator.files import cache
+from dbtvault_generator.generator import profiling, sharding, state
+from dbtvault_generator.parsers import columns, fmt_string, params, relationships
 from dbtvault_generator.parsers.templaters import templater_factory
 
 
@@ -13,24 +18,51 @@ class BaseGenerator(abc.ABC):
         self,
         get_project_config_fn: types.GetProjectConfigFn,
         find_dbtvault_gen_config_fn: types.FindDbtvaultGenConfig,
+        profiler: Optional[profiling.Profiler] = None,
     ):
         self.get_project_config_fn = get_project_config_fn
         self.find_dbtvault_gen_config_fn = find_dbtvault_gen_config_fn
+        self.profiler = profiler or profiling.Profiler()
 
-    def process_config(self, project_path: Path, target_folder: Optional[str]):
+    def process_config(
+        self,
+        project_path: Path,
+        target_folder: Optional[str],
+        build_state: Optional[state.BuildState] = None,
+        shard_plan: Optional[sharding.ShardPlan] = None,
+    ):
         cli_args = params.cli_passthrough_arg_parser(project_path, target_folder)
         project_config = self.get_project_config_fn(project_path, target_folder)
 
-        # Load in configs, starting  with root config
-        configs = self.find_dbtvault_gen_config_fn(project_path, "", False)
-        # Next, iterate over all folders configured for models, and pull in any configs
-        # that are there
-        for model_folder in set(project_config.model_dirs):
-            configs.update(
-                self.find_dbtvault_gen_config_fn(project_path, model_folder, True)
+        file_filter = None
+        if build_state is not None:
+            build_state.begin(
+                project_path,
+                project_path / project_config.target_dir,
+                project_config.model_dirs,
+            )
+            file_filter = build_state.check_file
+        elif shard_plan is not None:
+            file_filter = shard_plan.check_file
+
+        # Load in configs, starting with root config then any in the folders configured
+        # for models. The target folder never holds configs, so skip walking it
+        with self.profiler.span("read_configs"):
+            configs = self.find_dbtvault_gen_config_fn(
+                project_path,
+                project_config.model_dirs,
+                [project_config.target_dir],
+                file_filter,
             )
         # Run through all the files and builds the sql as appropriate
-        models = params.process_config_collection(configs)
+        with self.profiler.span("process_configs"):
+            models = params.process_config_collection(configs, self.profiler.span)
+        self.profiler.count("models_validated", len(models))
+        if build_state is not None:
+            build_state.track_configs(configs)
+            build_state.check_duplicates(models)
+        if shard_plan is not None:
+            shard_plan.track_configs(configs, models)
         return types.RunnerConfig(
             project_dir=project_path,
             models=models,
@@ -39,38 +71,179 @@ class BaseGenerator(abc.ABC):
         )
 
 
+def render_sql(model_config: types.DBTVGBaseModelParams) -> str:
+    return templater_factory(model_config.model_type)(model_config)
+
+
+def render_model(
+    model_config: types.DBTVGBaseModelParams,
+    project_dir: Path,
+    overwrite: bool,
+    writer_fn: types.StringWriterFunction,
+    render_fn: types.RenderFn = render_sql,
+) -> Tuple[Path, bool]:
+    """
+    Renders a single model into its sql file, returning the file location and whether
+    it was written
+    """
+    # Build template string
+    template_string = render_fn(model_config)
+
+    # Format filename for file
+    name = f"{fmt_string.format_name(model_config)}.{literals.SQL_FILE_EXT}"
+    file_loc = project_dir / model_config.options.target_path
+
+    file_loc.mkdir(parents=True, exist_ok=True)
+    filepath = file_loc / name
+    if filepath.is_file() and not overwrite:
+        # Don't overwrite existing
+        return filepath, False
+    return filepath, bool(writer_fn(filepath, template_string))
+
+
+def _render_job(
+    job: Tuple[
+        types.DBTVGBaseModelParams,
+        Path,
+        bool,
+        types.StringWriterFunction,
+        types.RenderFn,
+    ],
+) -> Tuple[Optional[Path], bool, Optional[str], float]:
+    """Pool-safe wrapper, as not every exception survives the trip between processes"""
+    start = time.perf_counter()
+    try:
+        filepath, written = render_model(*job)
+        return filepath, written, None, time.perf_counter() - start
+    except Exception as e:
+        return None, False, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+
+def render_models(
+    models: List[types.DBTVGBaseModelParams],
+    project_dir: Path,
+    overwrite: bool,
+    writer_fn: types.StringWriterFunction,
+    jobs: int = 1,
+    profiler: Optional[profiling.Profiler] = None,
+    timings: Optional[Dict[str, float]] = None,
+    render_fn: types.RenderFn = render_sql,
+) -> List[Path]:
+    """
+    Renders every model, returning the file location of each in the same order.
+    The seconds each model took are added to `timings`, if given
+    """
+    profiler = profiler or profiling.Profiler()
+    render_jobs = [
+        (model_config, project_dir, overwrite, writer_fn, render_fn)
+        for model_config in models
+    ]
+    if jobs > 1 and len(render_jobs) > 1:
+        chunksize = max(1, len(render_jobs) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(_render_job, render_jobs, chunksize=chunksize))
+    else:
+        results = [_render_job(job) for job in render_jobs]
+
+    # Report every failing model at once rather than stopping at the first
+    errors: List[str] = []
+    filepaths: List[Path] = []
+    for model_config, (filepath, written, error, seconds) in zip(models, results):
+        if timings is not None:
+            timings[model_config.name] = seconds
+        if error is not None:
+            errors.append(f"{model_config.name} ({model_config.location}): {error}")
+        elif filepath is not None:
+            filepaths.append(filepath)
+            profiler.count("files_written" if written else "files_skipped")
+    if len(errors) > 0:
+        err_list = "\n".join(errors)
+        raise exceptions.ModelGenerationError(
+            f"{len(errors)} model(s) failed to generate:\n{err_list}"
+        )
+    return filepaths
+
+
+def schema_entries(
+    model_namepairs: List[Tuple[str, types.DBTVGBaseModelParams]],
+    all_namepairs: List[Tuple[str, types.DBTVGBaseModelParams]],
+    catalog_models: Dict[str, types.CatalogModel],
+) -> Iterator[Tuple[str, types.Mapping]]:
+    """
+    Yields the `schema.yml` entry of each selected model with its target path, keys
+    and columns worked out against every model in the project
+    """
+    # Extract out the model relationships and columns
+    relationship_index = relationships.RelationshipIndex(all_namepairs)
+    column_inference = columns.ColumnInference(all_namepairs)
+    for name, model in model_namepairs:
+        catalog_model = column_inference.build_catalog_model(
+            name, catalog_models.get(name)
+        )
+        data_entry = relationship_index.build_schema_entry(name, catalog_model)
+        yield model.options.target_path, data_entry
+
+
 class SqlGenerator(BaseGenerator):
     def __init__(
         self,
         get_project_config_fn: types.GetProjectConfigFn,
         find_dbtvault_gen_config_fn: types.FindDbtvaultGenConfig,
         writer_fn: types.StringWriterFunction,
+        build_state: Optional[state.BuildState] = None,
+        profiler: Optional[profiling.Profiler] = None,
+        shard_plan: Optional[sharding.ShardPlan] = None,
+        render_cache: Optional[cache.RenderCache] = None,
     ):
-        super().__init__(get_project_config_fn, find_dbtvault_gen_config_fn)
+        super().__init__(get_project_config_fn, find_dbtvault_gen_config_fn, profiler)
         self.writer_fn = writer_fn
+        self.build_state = build_state
+        self.shard_plan = shard_plan
+        self.render_cache = render_cache
 
     def run(
         self,
         project_path: Path,
         overwrite: bool = False,
+        jobs: int = 1,
     ) -> None:
-        # Build run config
-        runner_config = self.process_config(project_path, None)
-        for model_config in runner_config.models:
-            # Build template string
-            templater = templater_factory(model_config.model_type)
-            template_string = templater(model_config)
-
-            # Format filename for file
-            name = f"{fmt_string.format_name(model_config)}.{literals.SQL_FILE_EXT}"
-            file_loc = runner_config.project_dir / model_config.options.target_path
-
-            file_loc.mkdir(parents=True, exist_ok=True)
-            filepath = file_loc / name
-            if filepath.is_file() and not overwrite:
-                continue
-                # Don't overwrite existing
-            self.writer_fn(filepath, template_string)
+        with self.profiler.span("sql"):
+            # Build run config
+            runner_config = self.process_config(
+                project_path, None, self.build_state, self.shard_plan
+            )
+            models = runner_config.models
+            if self.shard_plan is not None:
+                models = [item for item in models if self.shard_plan.owns(item.name)]
+            timings: Dict[str, float] = {}
+            render_fn = (
+                render_sql
+                if self.render_cache is None
+                else self.render_cache.cached(render_sql)
+            )
+            with self.profiler.span("render"):
+                filepaths = render_models(
+                    models,
+                    runner_config.project_dir,
+                    overwrite,
+                    self.writer_fn,
+                    jobs,
+                    self.profiler,
+                    timings,
+                    render_fn,
+                )
+            if self.render_cache is not None:
+                with self.profiler.span("prune_cache"):
+                    self.render_cache.prune()
+            if self.build_state is not None:
+                for model_config, filepath in zip(models, filepaths):
+                    self.build_state.record_output(model_config, filepath)
+                self.build_state.save()
+            if self.shard_plan is not None:
+                for name, seconds in timings.items():
+                    self.shard_plan.record(name, seconds)
+                target_dir = runner_config.project_dir / runner_config.target_folder
+                self.shard_plan.save_timings(target_dir / literals.DBTVG_SHARDS_NAME)
 
 
 class DocsGenerator(BaseGenerator):
@@ -80,12 +253,19 @@ class DocsGenerator(BaseGenerator):
         find_dbtvault_gen_config_fn: types.FindDbtvaultGenConfig,
         subproc_runner_fn: types.ShellOperationFn,
         schema_file_merger: types.SchemaMergeFn,
-        catalog_loader_fn: types.CatalogLoadFn,
+        catalog_loader_fn: Optional[types.CatalogLoadFn] = None,
+        docs_state: Optional[state.DocsState] = None,
+        profiler: Optional[profiling.Profiler] = None,
+        shard_plan: Optional[sharding.ShardPlan] = None,
+        docgen_catalog_fn: Optional[types.DocgenCatalogFn] = None,
     ):
-        super().__init__(get_project_config_fn, find_dbtvault_gen_config_fn)
+        super().__init__(get_project_config_fn, find_dbtvault_gen_config_fn, profiler)
         self.subproc_runner_fn = subproc_runner_fn
         self.schema_file_merger = schema_file_merger
         self.catalog_loader_fn = catalog_loader_fn
+        self.docs_state = docs_state
+        self.shard_plan = shard_plan
+        self.docgen_catalog_fn = docgen_catalog_fn
 
     def run(
         self,
@@ -93,14 +273,20 @@ class DocsGenerator(BaseGenerator):
         target_folder: Optional[str] = None,
         args: Optional[str] = None,
         overwrite: bool = False,
+    ) -> None:
+        with self.profiler.span("docs"):
+            self._run(project_path, target_folder, args, overwrite)
+
+    def _run(
+        self,
+        project_path: Path,
+        target_folder: Optional[str],
+        args: Optional[str],
+        overwrite: bool,
     ) -> None:
         # Initialize config
         runner_config = self.process_config(project_path, target_folder)
 
-        # Confirm the existence of the catalog and load it in
-        target_dir = runner_config.project_dir / runner_config.target_folder
-        catalog_data = self.catalog_loader_fn(target_dir)
-
         # Parse the CLI args for arg name overrides, then build name-model pairs
         model_names = params.check_model_names(args)
         model_list = (
@@ -108,26 +294,68 @@ class DocsGenerator(BaseGenerator):
             if len(model_names) == 0
             else list(filter(lambda x: x.name in model_names, runner_config.models))
         )
+        if self.shard_plan is not None:
+            model_list = [
+                item for item in model_list if self.shard_plan.owns(item.name)
+            ]
         model_namepairs: List[Tuple[str, types.DBTVGBaseModelParams]] = [
             (fmt_string.format_name(item), item) for item in model_list
         ]
+        # Selected models can still point at keys owned by ones that weren't
+        all_namepairs = [
+            (fmt_string.format_name(item), item) for item in runner_config.models
+        ]
+
+        # The catalog is optional, and only adds data types (plus the columns stages
+        # pass through from sources) to what the configs already say
+        target_dir = runner_config.project_dir / runner_config.target_folder
+        selected = None if len(model_names) == 0 else {n for n, _ in model_namepairs}
+        catalog_models: Dict[str, types.CatalogModel] = {}
+        catalog_error: Optional[Exception] = None
+        if self.catalog_loader_fn is not None:
+            try:
+                with self.profiler.span("load_catalog"):
+                    catalog = self.catalog_loader_fn(target_dir, selected)
+                catalog_models = catalog.models
+            except exceptions.CatalogNotFoundError as e:
+                catalog_error = e
+        if self.catalog_loader_fn is None or catalog_error is not None:
+            if self.docgen_catalog_fn is not None:
+                # Without a catalog, dbt can still read the columns off the warehouse
+                with self.profiler.span("run_operations"):
+                    catalog = self.docgen_catalog_fn(
+                        [name for name, _ in model_namepairs]
+                    )
+                catalog_models = catalog.models
+            elif catalog_error is not None:
+                warnings.warn(
+                    f"{catalog_error}. Columns will be documented without data types"
+                )
 
-        # Extract out the model relationships
-        relationship_data = params.find_model_relationships(model_namepairs)
+        if self.docs_state is not None:
+            with self.profiler.span("compare_state"):
+                modified = self.docs_state.modified(
+                    target_dir, [name for name, _ in model_namepairs], catalog_models
+                )
+            model_namepairs = [item for item in model_namepairs if item[0] in modified]
 
         # Iterate over the models and find what they connect to, storing by target loc
         model_locations: DefaultDict[str, List[types.Mapping]] = defaultdict(list)
-        for name, model in model_namepairs:
-            relationship = relationship_data[name]
-            catalog_model = catalog_data.models[name]
-            data_entry = params.build_relationship_entry(
-                model, catalog_model, relationship
-            )
-            model_locations[model.options.target_path].append(data_entry)
+        with self.profiler.span("render"):
+            entries = schema_entries(model_namepairs, all_namepairs, catalog_models)
+            for target_path, data_entry in entries:
+                model_locations[target_path].append(data_entry)
 
         # Save the files where appropriate
         filename = literals.DEFAULT_NAME_SCHEMA_YAML
-        for location, models in model_locations.items():
-            model_payload = {"version": 2, "models": models}
-            target_file = runner_config.project_dir / location / filename
-            self.schema_file_merger(target_file, model_payload, overwrite)
+        with self.profiler.span("write"):
+            if self.shard_plan is not None:
+                # Shards share schema files, so `merge-shards` writes them all at once
+                shards_dir = target_dir / literals.DBTVG_SHARDS_NAME
+                self.shard_plan.save_docs(shards_dir, dict(model_locations))
+                return
+            for location, models in model_locations.items():
+                model_payload = {"version": 2, "models": models}
+                target_file = runner_config.project_dir / location / filename
+                written = self.schema_file_merger(target_file, model_payload, overwrite)
+                self.profiler.count("files_written" if written else "files_skipped")
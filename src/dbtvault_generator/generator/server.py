@@ -0,0 +1,351 @@
+import os
+import inspect
+import json
+import socket
+import socketserver
+import stat
+import threading
+from copy import deepcopy
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+import pydantic
+import yaml
+
+from dbtvault_generator.constants import exceptions, literals, types
+from dbtvault_generator.files import file_io
+from dbtvault_generator.files.watch import BaseWatcher
+from dbtvault_generator.generator import runners, workspace
+from dbtvault_generator.parsers import fmt_string, params, relationships, templaters
+
+"""
+DEVNOTE:
+
+`serve` keeps a `Workspace` warm so tools like the GUI can ask about the project
+without paying for process startup and a full parse on every request. Requests are
+JSON-RPC 2.0, one json document per line, over a Unix socket or a localhost port.
+There's no authentication: anyone who can connect can have models written out, so a
+socket, which file permissions guard, is the safer choice on shared machines.
+
+A background thread feeds file changes through `Workspace.refresh`, which only
+re-reads and re-validates the files affected. Rendered sql is cached per model and the
+relationship index per project state, and a change drops only what it invalidates.
+Every request and refresh holds the same lock, so answers never see half an update.
+"""
+
+Address = Union[str, Tuple[str, int]]
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+GENERATION_ERROR = -32000
+
+# Problems with the project itself, rather than with the request
+PROJECT_ERRORS = (
+    exceptions.DBTVaultConfigInvalidError,
+    exceptions.ModelGenerationError,
+    exceptions.NoDbtvGenConfigFound,
+    exceptions.ProjectNotConfiguredError,
+)
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class ProjectService:
+    """The requests `serve` answers, each from the warm state of a workspace"""
+
+    def __init__(
+        self,
+        project: workspace.Workspace,
+        writer_fn: types.StringWriterFunction,
+    ):
+        self.project = project
+        self.writer_fn = writer_fn
+        self.lock = threading.RLock()
+        self.methods: Dict[str, Callable[..., Any]] = {
+            "models": self.models,
+            "render": self.render,
+            "validate": self.validate,
+            "relationships": self.relationships,
+            "regenerate": self.regenerate,
+        }
+        self._by_name: Dict[str, types.DBTVGBaseModelParams] = {}
+        self._rendered: Dict[str, str] = {}
+        self._index: Optional[relationships.RelationshipIndex] = None
+        # Models changed since they were last written out
+        self._stale: Set[str] = set()
+
+    def load(self, project_path: Path) -> None:
+        with self.lock:
+            self._update(self.project.load(project_path), True)
+
+    def apply_changes(self, changed: Set[Path]) -> None:
+        with self.lock:
+            self._update(self.project.refresh(changed), False)
+
+    def _update(self, models: List[types.DBTVGBaseModelParams], reset: bool) -> None:
+        if reset:
+            self._rendered.clear()
+        for model in models:
+            self._rendered.pop(fmt_string.format_name(model), None)
+            self._stale.add(model.name)
+        self._by_name = {}
+        for model in self.project.all_models:
+            # Models can be asked for with or without their prefix
+            self._by_name[model.name] = model
+            self._by_name[fmt_string.format_name(model)] = model
+        self._stale &= {item.name for item in self.project.all_models}
+        self._index = None
+
+    def _model(self, name: str) -> types.DBTVGBaseModelParams:
+        model = self._by_name.get(name)
+        if model is None:
+            raise RpcError(INVALID_PARAMS, f"No model named {name}")
+        return model
+
+    def dispatch(self, method: str, arguments: types.Mapping) -> Any:
+        handler = self.methods.get(method)
+        if handler is None:
+            raise RpcError(METHOD_NOT_FOUND, f"Unknown method {method}")
+        try:
+            inspect.signature(handler).bind(**arguments)
+        except TypeError as e:
+            raise RpcError(INVALID_PARAMS, str(e))
+        with self.lock:
+            try:
+                return handler(**arguments)
+            except PROJECT_ERRORS as e:
+                raise RpcError(GENERATION_ERROR, str(e))
+
+    def models(self) -> List[types.Mapping]:
+        return [
+            {
+                "name": fmt_string.format_name(model),
+                "model_type": model.model_type,
+                "location": model.location,
+                "target_path": model.options.target_path,
+            }
+            for model in self.project.all_models
+        ]
+
+    def render(self, name: str) -> str:
+        model = self._model(name)
+        rendered_name = fmt_string.format_name(model)
+        if rendered_name not in self._rendered:
+            templater = templaters.templater_factory(model.model_type)
+            self._rendered[rendered_name] = templater(model)
+        return self._rendered[rendered_name]
+
+    def validate(self, text: str, location: str = ".") -> types.Mapping:
+        """
+        Checks a `dbtvault.yml` document, or one or more of its models, as though it
+        were saved at `location`, without touching the project
+        """
+        try:
+            document = yaml.load(text, file_io.YamlLoader)
+        except yaml.YAMLError as e:
+            return {"valid": False, "errors": [f"Invalid yaml: {e}"]}
+        if isinstance(document, dict) and literals.DBTVG_CONFIG_KEY in document:
+            config = document[literals.DBTVG_CONFIG_KEY] or {}
+        elif isinstance(document, list):
+            config = {literals.DBTVG_MODELS_KEY: document}
+        else:
+            config = {literals.DBTVG_MODELS_KEY: [document]}
+
+        # Only the file itself and those above it shape its defaults
+        configs = {
+            key: self.project.configs[key]
+            for key in params.config_ancestors(location)
+            if key in self.project.configs
+        }
+        configs[location] = config
+        root_config = configs.get(".", {}).get(literals.DBTVG_DEFAULTS_KEY, {})
+        errors: List[str] = []
+        try:
+            root_defaults = types.DBTVGConfig(**root_config).dict()
+            defaults = params.resolve_defaults(configs, root_defaults)[location]
+        except (pydantic.ValidationError, TypeError) as e:
+            return {"valid": False, "errors": [f"Invalid defaults: {e}"]}
+
+        names: List[str] = []
+        for item in config.get(literals.DBTVG_MODELS_KEY) or []:
+            if not isinstance(item, dict):
+                errors.append(f"Models must be mappings, not {type(item).__name__}")
+                continue
+            try:
+                model = params.parse_model_definition(
+                    deepcopy(item), defaults, location
+                )
+            except exceptions.DBTVaultConfigInvalidError as e:
+                errors.append(str(e))
+                continue
+            existing = self._by_name.get(model.name)
+            if existing is not None and existing.location != location:
+                errors.append(
+                    f"Duplicate model name {model.name}, already in {existing.location}"
+                )
+            names.append(fmt_string.format_name(model))
+        return {"valid": len(errors) == 0, "errors": errors, "models": names}
+
+    def relationships(self, name: str) -> types.Mapping:
+        model = self._model(name)
+        if self._index is None:
+            self._index = relationships.RelationshipIndex(
+                [
+                    (fmt_string.format_name(item), item)
+                    for item in self.project.all_models
+                ]
+            )
+        rendered_name = fmt_string.format_name(model)
+        return {
+            "name": rendered_name,
+            "key_columns": self._index.key_columns(rendered_name),
+            "foreign_keys": self._index.foreign_keys[rendered_name],
+            "referenced_by": sorted(
+                other
+                for other, foreign_keys in self._index.foreign_keys.items()
+                if rendered_name in foreign_keys.values()
+            ),
+        }
+
+    def regenerate(self, overwrite: bool = False, full: bool = False) -> List[str]:
+        """Writes out the models changed since they were last written, or all of them"""
+        models = [
+            model
+            for model in self.project.all_models
+            if full or model.name in self._stale
+        ]
+        written: Set[Path] = set()
+
+        def writer_fn(filepath: Path, payload: str) -> bool:
+            written.add(filepath)
+            return self.writer_fn(filepath, payload)
+
+        filepaths = runners.render_models(
+            models, self.project.project_path, overwrite, writer_fn
+        )
+        # Existing files are skipped without `overwrite`, so those models stay stale
+        self._stale -= {
+            model.name
+            for model, filepath in zip(models, filepaths)
+            if filepath in written
+        }
+        return [str(item) for item in filepaths]
+
+    def watch(self, watcher: BaseWatcher, stop: threading.Event) -> None:
+        """Applies file changes as they happen, until told to stop"""
+        while not stop.is_set():
+            with self.lock:
+                files, dirs = self.project.watched_files, set(self.project.dirs)
+            changed = watcher.wait(files, dirs, timeout=0.5)
+            if len(changed) == 0:
+                continue
+            try:
+                self.apply_changes(changed)
+            except PROJECT_ERRORS:
+                # Half-finished edits are normal, the next save will be picked up
+                pass
+
+
+def handle_request(service: ProjectService, line: bytes) -> Optional[types.Mapping]:
+    """Answers one JSON-RPC request. Notifications, without an id, get no answer"""
+    request_id = None
+    try:
+        try:
+            request = json.loads(line)
+        except ValueError:
+            raise RpcError(PARSE_ERROR, "Request is not valid json")
+        if not isinstance(request, dict) or "method" not in request:
+            raise RpcError(INVALID_REQUEST, "Request needs a method")
+        request_id = request.get("id")
+        arguments = request.get("params") or {}
+        if not isinstance(arguments, dict):
+            raise RpcError(INVALID_PARAMS, "Params must be passed by name")
+        result = service.dispatch(request["method"], arguments)
+        if request_id is None:
+            return None
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+    except RpcError as e:
+        error = {"code": e.code, "message": e.message}
+        return {"jsonrpc": "2.0", "id": request_id, "error": error}
+    except Exception as e:
+        # Anything else, e.g. a write failing, still gets an answer over the wire
+        error = {"code": INTERNAL_ERROR, "message": f"{type(e).__name__}: {e}"}
+        return {"jsonrpc": "2.0", "id": request_id, "error": error}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        service: ProjectService = getattr(self.server, "service")
+        for line in self.rfile:
+            if len(line.strip()) == 0:
+                continue
+            response = handle_request(service, line)
+            if response is not None:
+                self.wfile.write(json.dumps(response).encode() + b"\n")
+                self.wfile.flush()
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    service: ProjectService
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    service: ProjectService
+
+
+def _clear_stale_socket(address: str) -> None:
+    """Removes a socket left behind by a server that didn't shut down cleanly"""
+    try:
+        mode = os.lstat(address).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise exceptions.SocketInUseError(
+            f"{address} already exists and is not a socket, so it was left alone"
+        )
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(address)
+        except ConnectionRefusedError:
+            os.unlink(address)
+            return
+    raise exceptions.SocketInUseError(
+        f"Another server is already listening on {address}"
+    )
+
+
+def create_server(service: ProjectService, address: Address) -> socketserver.BaseServer:
+    """Listens on a Unix socket when given a path, else on a localhost port"""
+    server: Union[_TCPServer, _UnixServer]
+    if isinstance(address, str):
+        _clear_stale_socket(address)
+        server = _UnixServer(address, _RequestHandler)
+    else:
+        server = _TCPServer(address, _RequestHandler)
+    server.service = service
+    return server
+
+
+def call(address: Address, method: str, **arguments: Any) -> Any:
+    """Sends a single request to a running server, returning its result"""
+    family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+    with socket.socket(family, socket.SOCK_STREAM) as connection:
+        connection.connect(address)
+        request = {"jsonrpc": "2.0", "id": 1, "method": method, "params": arguments}
+        connection.sendall(json.dumps(request).encode() + b"\n")
+        with connection.makefile("rb") as stream:
+            response = json.loads(stream.readline())
+    if "error" in response:
+        raise RpcError(response["error"]["code"], response["error"]["message"])
+    return response["result"]
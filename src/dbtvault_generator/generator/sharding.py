@@ -0,0 +1,216 @@
+import hashlib
+import json
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import DefaultDict, Dict, List, Optional, Tuple
+
+from dbtvault_generator.constants import exceptions, literals, types
+from dbtvault_generator.constants.version import GENERATOR_VERSION
+from dbtvault_generator.generator import state
+
+"""
+DEVNOTE:
+
+`--shard i/N` splits a run across N CI workers. Every worker has to agree on who owns
+what without talking to the others, so models are assigned by a stable hash of their
+name, or, given the timings of a previous run, by a greedy longest-first balance over
+the models in those timings. Both depend only on inputs every worker shares.
+
+Timings also record each `dbtvault.yml`'s fingerprint, defaults and model names, so a
+`sql` worker can skip files that haven't changed and hold none of its models; their
+recorded defaults stand in for them, as `BuildState` does for incremental runs.
+Changed and new files are always read, as they may hold anything. `docs` still reads
+every file, as keys and columns span the project, but only documents its own models.
+
+Shards never write the same file. `sql` shards write disjoint models; `docs` shards
+leave their entries in the shards folder and `merge-shards` writes each `schema.yml`
+once, along with the combined timings for the next run to balance by.
+"""
+
+SHARD_PATTERN = re.compile(r"^\s*(\d+)\s*/\s*(\d+)\s*$")
+SHARD_FILE_PATTERN = re.compile(r"^(sql|docs)-(\d+)-of-(\d+)\.json$")
+
+
+def parse_shard(text: str) -> Tuple[int, int]:
+    """Reads `i/N`, counting shards from 1"""
+    match = SHARD_PATTERN.match(text)
+    if match is None or not 1 <= int(match.group(1)) <= int(match.group(2)):
+        raise exceptions.ArgParseError(
+            f"Shard {text} should be given as i/N, with i between 1 and N"
+        )
+    return int(match.group(1)), int(match.group(2))
+
+
+def hash_shard(name: str, count: int) -> int:
+    # Python's own hash is salted per process, so it can't be shared between workers
+    digest = hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count + 1
+
+
+def balance_shards(costs: Dict[str, float], count: int) -> Dict[str, int]:
+    """Hands out the costliest models first, each to the least loaded shard"""
+    loads = [0.0] * count
+    assignment: Dict[str, int] = {}
+    for name in sorted(costs, key=lambda item: (-costs[item], item)):
+        shard = min(range(count), key=lambda item: (loads[item], item))
+        loads[shard] += costs[name]
+        assignment[name] = shard + 1
+    return assignment
+
+
+def _shard_filename(kind: str, index: int, count: int) -> str:
+    return f"{kind}-{index}-of-{count}.json"
+
+
+def read_timings(filepath: Path) -> Optional[types.Mapping]:
+    """Timings from a previous run, if there are any a run of this version can use"""
+    try:
+        with open(filepath, "r") as stream:
+            timings: types.Mapping = json.load(stream)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return timings if timings.get("version") == GENERATOR_VERSION else None
+
+
+class ShardPlan:
+    def __init__(self, index: int, count: int, timings: Optional[types.Mapping] = None):
+        self.index = index
+        self.count = count
+        timings = timings or {}
+        self._previous_files: Dict[str, types.Mapping] = timings.get("files", {})
+        self._assignment = balance_shards(timings.get("models", {}), count)
+        self._files: Dict[str, types.Mapping] = {}
+        self._seconds: Dict[str, float] = {}
+
+    @property
+    def label(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def owns(self, name: str) -> bool:
+        shard = self._assignment.get(name)
+        if shard is None:
+            shard = hash_shard(name, self.count)
+        return shard == self.index
+
+    def check_file(self, key: str, filepath: Path) -> Optional[types.Mapping]:
+        """
+        Returns a stand-in holding only the recorded defaults for unchanged files
+        without any of this shard's models, else None to signal it must be read
+        """
+        fingerprint = state.fingerprint_file(filepath)
+        previous = self._previous_files.get(key)
+        if (
+            previous is None
+            or previous["fingerprint"] != fingerprint
+            or any(self.owns(name) for name in previous["models"])
+        ):
+            self._files[key] = {"fingerprint": fingerprint, "models": []}
+            return None
+        self._files[key] = previous
+        return {literals.DBTVG_DEFAULTS_KEY: previous["defaults"]}
+
+    def track_configs(
+        self,
+        configs: Dict[str, types.Mapping],
+        models: List[types.DBTVGBaseModelParams],
+    ) -> None:
+        """Records the defaults and models of every file that was read this run"""
+        for key, config in configs.items():
+            entry = self._files.get(key)
+            if entry is not None and "defaults" not in entry:
+                entry["defaults"] = config.get(literals.DBTVG_DEFAULTS_KEY, {})
+        for model in models:
+            entry = self._files.get(model.location)
+            if entry is not None and "defaults" in entry:
+                entry["models"].append(model.name)
+
+    def record(self, name: str, seconds: float) -> None:
+        self._seconds[name] = seconds
+
+    def save_timings(self, shards_dir: Path) -> Path:
+        shards_dir.mkdir(parents=True, exist_ok=True)
+        filepath = shards_dir / _shard_filename("sql", self.index, self.count)
+        data = {
+            "version": GENERATOR_VERSION,
+            "shard": self.label,
+            # Only files that were fully read, or skipped, are known in full
+            "files": {
+                key: entry for key, entry in self._files.items() if "defaults" in entry
+            },
+            "models": self._seconds,
+        }
+        with open(filepath, "w") as stream:
+            json.dump(data, stream, indent=2, sort_keys=True)
+        return filepath
+
+    def save_docs(
+        self, shards_dir: Path, schemas: Dict[str, List[types.Mapping]]
+    ) -> Path:
+        shards_dir.mkdir(parents=True, exist_ok=True)
+        filepath = shards_dir / _shard_filename("docs", self.index, self.count)
+        data = {"version": GENERATOR_VERSION, "shard": self.label, "schemas": schemas}
+        with open(filepath, "w") as stream:
+            json.dump(data, stream, indent=2)
+        return filepath
+
+
+def _shard_files(shards_dir: Path, kind: str) -> List[Path]:
+    """Every shard's output of one kind, checking none of the shards are missing"""
+    found: Dict[int, Dict[int, Path]] = defaultdict(dict)
+    for filepath in shards_dir.glob(f"{kind}-*-of-*.json"):
+        match = SHARD_FILE_PATTERN.match(filepath.name)
+        if match is not None:
+            found[int(match.group(3))][int(match.group(2))] = filepath
+    if len(found) == 0:
+        return []
+    if len(found) > 1:
+        raise exceptions.ShardMergeError(
+            f"{kind} shards in {shards_dir} come from runs split {sorted(found)} ways"
+        )
+    count, files = next(iter(found.items()))
+    missing = sorted(set(range(1, count + 1)) - set(files))
+    if len(missing) > 0:
+        raise exceptions.ShardMergeError(
+            f"{kind} shards {missing} of {count} are missing from {shards_dir}"
+        )
+    return [files[index] for index in range(1, count + 1)]
+
+
+def merge_shards(
+    shards_dir: Path,
+    project_dir: Path,
+    schema_merge_fn: types.SchemaMergeFn,
+    overwrite: bool,
+) -> Tuple[int, int]:
+    """
+    Writes each `schema.yml` from every docs shard's entries, and combines the sql
+    shards' timings. Returns the number of schema files written and skipped
+    """
+    schemas: DefaultDict[str, List[types.Mapping]] = defaultdict(list)
+    for filepath in _shard_files(shards_dir, "docs"):
+        with open(filepath, "r") as stream:
+            for location, entries in json.load(stream)["schemas"].items():
+                schemas[location].extend(entries)
+
+    written = skipped = 0
+    filename = literals.DEFAULT_NAME_SCHEMA_YAML
+    for location, models in schemas.items():
+        model_payload = {"version": 2, "models": models}
+        if schema_merge_fn(project_dir / location / filename, model_payload, overwrite):
+            written += 1
+        else:
+            skipped += 1
+
+    timings: types.Mapping = {"version": GENERATOR_VERSION, "files": {}, "models": {}}
+    sql_files = _shard_files(shards_dir, "sql")
+    for filepath in sql_files:
+        with open(filepath, "r") as stream:
+            shard_timings = json.load(stream)
+        # Every shard fingerprints every file, so any one of them will do
+        timings["files"].update(shard_timings["files"])
+        timings["models"].update(shard_timings["models"])
+    if len(sql_files) > 0:
+        with open(shards_dir / literals.DBTVG_SHARD_TIMINGS_NAME, "w") as stream:
+            json.dump(timings, stream, indent=2, sort_keys=True)
+    return written, skipped
@@ -0,0 +1,235 @@
+import hashlib
+import json
+import re
+import warnings
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from dbtvault_generator.constants import exceptions, literals, types
+from dbtvault_generator.constants.version import GENERATOR_VERSION
+from dbtvault_generator.generator.readers import config_key
+from dbtvault_generator.parsers import params
+
+INCLUDE_PATTERN = re.compile(r"!include\s+[\"']?([^\s\"'#]+)")
+
+
+def hash_mapping(data: types.Mapping) -> str:
+    payload = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def fingerprint_file(filepath: Path, seen: Optional[Set[Path]] = None) -> str:
+    """Hashes a file along with any files it pulls in through `!include`"""
+    seen = set() if seen is None else seen
+    seen.add(filepath)
+    try:
+        content = filepath.read_bytes()
+    except FileNotFoundError:
+        return "missing"
+    digest = hashlib.sha256(content)
+    # A regex scan is enough to find dependencies without paying for a yaml parse
+    for match in INCLUDE_PATTERN.finditer(content.decode("utf-8", "replace")):
+        include_path = filepath.parent / match.group(1)
+        if include_path in seen:
+            continue
+        digest.update(fingerprint_file(include_path, seen).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class BuildState:
+    """
+    Tracks the fingerprint of every `dbtvault.yml` consumed by an incremental `sql`
+    run, so the next run only needs to rebuild the files whose inputs changed
+    """
+
+    def __init__(self):
+        self.state_path: Optional[Path] = None
+        self.project_dir = Path(".")
+        self.full_rebuild = True
+        self._previous: Dict[str, types.Mapping] = {}
+        self._current: Dict[str, types.Mapping] = {}
+        self._fingerprints: Dict[str, str] = {}
+        self._model_roots: List[str] = []
+
+    def begin(
+        self, project_dir: Path, target_dir: Path, model_dirs: Sequence[str]
+    ) -> None:
+        self.state_path = target_dir / literals.DBTVG_STATE_NAME
+        self.project_dir = project_dir
+        self._previous = {}
+        self._current = {}
+        self._fingerprints = {}
+        # Only files under the model folders are ever read, so only they're inherited
+        self._model_roots = [
+            config_key(project_dir, project_dir / item / literals.DBTVG_YAML_NAME)
+            for item in model_dirs
+        ]
+        self.full_rebuild = True
+        if not self.state_path.is_file():
+            return
+        try:
+            with open(self.state_path, "r") as stream:
+                data: types.Mapping = json.load(stream)
+        except json.JSONDecodeError:
+            return
+        if data.get("version") != GENERATOR_VERSION:
+            return
+
+        self._previous = data.get("files", {})
+        root_config = project_dir / literals.DBTVG_YAML_NAME
+        # Losing the root config changes the defaults for every other file
+        self.full_rebuild = "." in self._previous and not root_config.is_file()
+
+    def check_file(self, key: str, filepath: Path) -> Optional[types.Mapping]:
+        """
+        Returns a stand-in config holding only the recorded defaults if the file is
+        unchanged since the last run, else None to signal it must be re-read
+        """
+        fingerprint = self._fingerprints[key] = fingerprint_file(filepath)
+        previous = self._previous.get(key)
+        changed = previous is None or previous["fingerprint"] != fingerprint
+        # Defaults are inherited from every file above, so their edits matter too
+        changed = changed or self._ancestors_changed(key)
+        if key == "." and changed:
+            # Root defaults feed every model, so nothing can be trusted
+            self.full_rebuild = True
+        if self.full_rebuild or changed:
+            self._current[key] = {"fingerprint": fingerprint, "models": {}}
+            return None
+        assert previous is not None
+        if not all(Path(item).is_file() for item in previous["models"].values()):
+            # Somebody removed generated output, so rebuild it
+            self._current[key] = {"fingerprint": fingerprint, "models": {}}
+            return None
+
+        self._current[key] = previous
+        return {literals.DBTVG_DEFAULTS_KEY: previous.get("defaults", {})}
+
+    def _fingerprint(self, key: str) -> str:
+        if key not in self._fingerprints:
+            filepath = self.project_dir / key / literals.DBTVG_YAML_NAME
+            self._fingerprints[key] = fingerprint_file(filepath)
+        return self._fingerprints[key]
+
+    def _ancestors_changed(self, key: str) -> bool:
+        for ancestor in params.config_ancestors(key):
+            inherited = any(
+                ancestor == root or ancestor.startswith(f"{root}/")
+                for root in self._model_roots
+            )
+            if ancestor == "." or not inherited:
+                # The root is covered by a full rebuild
+                continue
+            previous = self._previous.get(ancestor, {}).get("fingerprint", "missing")
+            if self._fingerprint(ancestor) != previous:
+                return True
+        return False
+
+    def track_configs(self, configs: Dict[str, types.Mapping]) -> None:
+        """
+        Records the defaults of every file that was re-read this run. Changes to the
+        defaults above a file are caught by the fingerprints of the files they're in
+        """
+        for key, config in configs.items():
+            entry = self._current.get(key)
+            if entry is None or "defaults" in entry:
+                continue
+            entry["defaults"] = config.get(literals.DBTVG_DEFAULTS_KEY, {})
+
+    def check_duplicates(self, models: List[types.DBTVGBaseModelParams]) -> None:
+        """Checks rebuilt models against the names owned by unchanged files"""
+        existing: Dict[str, str] = {}
+        for key, entry in self._current.items():
+            if entry.get("models"):
+                existing.update({name: key for name in entry["models"]})
+        duplicates = [
+            f"{item.name}: {existing[item.name]} and {item.location}"
+            for item in models
+            if item.name in existing
+        ]
+        if len(duplicates) > 0:
+            err_loc = "\n".join(duplicates)
+            raise exceptions.DBTVaultConfigInvalidError(
+                f"Duplicate model names detected: {err_loc}"
+            )
+
+    def record_output(self, model: types.DBTVGBaseModelParams, filepath: Path) -> None:
+        self._current[model.location]["models"][model.name] = str(filepath)
+
+    def save(self) -> None:
+        assert self.state_path is not None
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"version": GENERATOR_VERSION, "files": self._current}
+        with open(self.state_path, "w") as stream:
+            json.dump(data, stream, indent=2, sort_keys=True)
+
+
+class DocsState:
+    """
+    Compares the dbt artifacts of this run against those of a previous one, much like
+    dbt's `state:modified`, so `docs` only rebuilds entries for models that changed
+    """
+
+    def __init__(
+        self,
+        state_dir: Path,
+        manifest_loader_fn: types.ManifestLoadFn,
+        catalog_loader_fn: Optional[types.CatalogLoadFn] = None,
+    ):
+        self.state_dir = state_dir
+        self.manifest_loader_fn = manifest_loader_fn
+        self.catalog_loader_fn = catalog_loader_fn
+
+    @staticmethod
+    def _fingerprints(
+        manifest: types.DbtManifest, catalog_models: Dict[str, types.CatalogModel]
+    ) -> Dict[str, str]:
+        fingerprints: Dict[str, str] = {}
+        for name, model in manifest.models.items():
+            catalog_model = catalog_models.get(name)
+            columns = (
+                []
+                if catalog_model is None
+                else [[key, item.dtype] for key, item in catalog_model.columns.items()]
+            )
+            fingerprints[name] = hash_mapping(
+                {"checksum": model.checksum, "config": model.config, "columns": columns}
+            )
+        return fingerprints
+
+    def _previous_fingerprints(self) -> Optional[Dict[str, str]]:
+        try:
+            manifest = self.manifest_loader_fn(self.state_dir)
+        except exceptions.DbtArtifactError:
+            return None
+        catalog_models: Dict[str, types.CatalogModel] = {}
+        if self.catalog_loader_fn is not None:
+            try:
+                catalog_models = self.catalog_loader_fn(self.state_dir, None).models
+            except exceptions.CatalogNotFoundError:
+                pass
+        return self._fingerprints(manifest, catalog_models)
+
+    def modified(
+        self,
+        target_dir: Path,
+        names: Iterable[str],
+        catalog_models: Dict[str, types.CatalogModel],
+    ) -> Set[str]:
+        """Returns those of the given models that changed since the state run"""
+        previous = self._previous_fingerprints()
+        if previous is None:
+            # Without usable state, everything counts as modified
+            return set(names)
+        try:
+            manifest = self.manifest_loader_fn(target_dir)
+        except exceptions.DbtArtifactError as e:
+            warnings.warn(f"{e}. Documenting every model, as if there were no state")
+            return set(names)
+        current = self._fingerprints(manifest, catalog_models)
+        # Models dbt hasn't seen yet have no state to compare, so they're new
+        return {
+            name
+            for name in names
+            if name not in current or previous.get(name) != current[name]
+        }
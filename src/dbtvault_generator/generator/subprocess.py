@@ -1,17 +1,159 @@
+import os
+import signal
 import subprocess
-from typing import List
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Deque, Dict, Iterator, List, Optional
 
-from dbtvault_generator.constants import exceptions
+from dbtvault_generator.constants import exceptions, literals, types
+from dbtvault_generator.parsers import fmt_string, params
 
+"""
+DEVNOTE:
 
-def run_shell_operation(command: List[str]) -> str:
-    """This is ugly. Hurry up 1.5"""
-    pipe = subprocess.run(command, capture_output=True, text=True)
-    output = pipe.stdout
-    if not pipe.returncode != 0:
-        output = pipe.stdout.replace("\n", "")
+Every dbt invocation pays several seconds of startup and project parsing before it
+does anything, so model names are packed into as few `run-operation` calls as the
+command line will take, and those calls run side by side on a few threads (they spend
+their time waiting on dbt, not on us). Output is read line by line and parsed as it
+arrives, so only the parsed entries are held, never the whole printout.
+"""
+
+
+def _failure_message(command: List[str], detail: str, output: str) -> str:
+    output = output.replace("\n", "")
+    return f"Call to {' '.join(command[:3])} {detail}, text printed: {output}"
+
+
+def run_shell_operation(command: List[str], timeout: Optional[float] = None) -> str:
+    try:
+        pipe = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired as e:
+        output = e.stdout.decode() if isinstance(e.stdout, bytes) else e.stdout or ""
+        raise exceptions.SubprocessFailed(
+            _failure_message(command, f"timed out after {timeout}s", output)
+        )
+    if pipe.returncode != 0:
+        raise exceptions.SubprocessFailed(
+            _failure_message(command, "did not exit with code 0", pipe.stdout)
+        )
+    return pipe.stdout
+
+
+def _kill(process: subprocess.Popen) -> None:
+    if os.name == "posix":
+        # Take anything the command started with it, or the pipe stays open
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    else:
+        process.kill()
+
+
+def stream_shell_operation(
+    command: List[str], timeout: Optional[float] = None
+) -> Iterator[str]:
+    """
+    Yields each line the command prints, stderr included, as it's printed. Fails
+    once the command exits non-zero, or if it runs past `timeout` seconds
+    """
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        start_new_session=os.name == "posix",
+    )
+    timed_out = threading.Event()
+
+    def expire() -> None:
+        timed_out.set()
+        _kill(process)
+
+    timer = None if timeout is None else threading.Timer(timeout, expire)
+    # Kept to explain a failure, without holding on to the whole output
+    recent: Deque[str] = deque(maxlen=20)
+    assert process.stdout is not None
+    try:
+        if timer is not None:
+            timer.start()
+        for line in process.stdout:
+            recent.append(line)
+            yield line
+        process.wait()
+    finally:
+        if timer is not None:
+            timer.cancel()
+        if process.poll() is None:
+            # The caller stopped reading early
+            _kill(process)
+            process.wait()
+        process.stdout.close()
+
+    if timed_out.is_set():
+        detail = f"timed out after {timeout}s"
+        raise exceptions.SubprocessFailed(
+            _failure_message(command, detail, "".join(recent))
+        )
+    if process.returncode != 0:
+        detail = "did not exit with code 0"
         raise exceptions.SubprocessFailed(
-            f"Call to subprocess did not exit with code 0, text printed: {output}"
+            _failure_message(command, detail, "".join(recent))
         )
 
-    return output
+
+def run_docgen_operations(
+    cli_args: List[str],
+    model_names: List[str],
+    jobs: int = literals.DBT_OPERATION_JOBS,
+    timeout: Optional[float] = None,
+    limit: int = literals.DBT_COMMAND_LIMIT,
+    stream_fn: types.ShellStreamFn = stream_shell_operation,
+) -> Iterator[types.Mapping]:
+    """
+    Documents models through `dbt run-operation generate_model_yaml`, in as few
+    calls as fit on the command line with at most `jobs` running at once. Entries
+    are yielded a call at a time, as each finishes; `timeout` applies to each call
+    """
+    chunks = params.chunk_model_names(cli_args, model_names, limit)
+    if len(chunks) == 0:
+        return
+
+    def run_chunk(chunk: List[str]) -> List[types.Mapping]:
+        command = params.build_exec_docgen_command(cli_args, chunk)
+        return list(fmt_string.iter_generate_model_yaml(stream_fn(command, timeout)))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(chunks)))) as executor:
+        futures = [executor.submit(run_chunk, chunk) for chunk in chunks]
+        try:
+            for future in as_completed(futures):
+                yield from future.result()
+        finally:
+            # Don't start calls nobody will read, if one failed or we were abandoned
+            for future in futures:
+                future.cancel()
+
+
+def load_docgen_catalog(
+    cli_args: List[str],
+    model_names: List[str],
+    jobs: int = literals.DBT_OPERATION_JOBS,
+    timeout: Optional[float] = None,
+    stream_fn: types.ShellStreamFn = stream_shell_operation,
+    limit: int = literals.DBT_COMMAND_LIMIT,
+) -> types.DbtCatalog:
+    """Reads the models' columns through `generate_model_yaml`, for want of a catalog"""
+    models: Dict[str, types.CatalogModel] = {}
+    entries = run_docgen_operations(
+        cli_args, model_names, jobs, timeout, limit, stream_fn
+    )
+    for entry in entries:
+        columns: Dict[str, types.CatalogModelColumn] = {
+            item["name"]: types.CatalogModelColumn(
+                name=item["name"], dtype=item.get("data_type")
+            )
+            for item in entry.get("columns") or []
+        }
+        models[entry["name"]] = types.CatalogModel(name=entry["name"], columns=columns)
+    return types.DbtCatalog(models=models)
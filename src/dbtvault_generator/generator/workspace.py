@@ -0,0 +1,209 @@
+from copy import deepcopy
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+from dbtvault_generator.constants import exceptions, literals, types
+from dbtvault_generator.files import search
+from dbtvault_generator.files.watch import BaseWatcher
+from dbtvault_generator.generator import readers
+from dbtvault_generator.parsers import params
+
+
+class Workspace:
+    """
+    Holds a resolved project in memory, so an edit to one file only needs the models
+    it affects re-parsed, re-validated and re-rendered
+    """
+
+    def __init__(
+        self,
+        get_project_config_fn: types.GetProjectConfigFn,
+        config_reader: readers.ConfigReader,
+        reader_fn: types.DependencyReaderFunction,
+    ):
+        self.get_project_config_fn = get_project_config_fn
+        self.config_reader = config_reader
+        self.reader_fn = reader_fn
+        self.project_path = Path(".")
+        self.target_folder: Optional[str] = None
+        self.project_config = types.ProjectConfig(model_dirs=[], target_dir="")
+        self.paths: Dict[str, Path] = {}
+        self.configs: Dict[str, types.Mapping] = {}
+        self.dependencies: Dict[str, Set[Path]] = {}
+        self.models: Dict[str, List[types.DBTVGBaseModelParams]] = {}
+        self.dirs: Set[Path] = set()
+
+    @property
+    def project_file(self) -> Path:
+        return self.project_path / "dbt_project.yml"
+
+    @property
+    def root_config(self) -> Path:
+        return self.project_path / literals.DBTVG_YAML_NAME
+
+    @property
+    def all_models(self) -> List[types.DBTVGBaseModelParams]:
+        return [item for models in self.models.values() for item in models]
+
+    @property
+    def watched_files(self) -> Set[Path]:
+        files = {self.project_file, self.root_config, *self.paths.values()}
+        for dependencies in self.dependencies.values():
+            files |= dependencies
+        return files
+
+    def _ignore_dirs(self) -> List[str]:
+        return [self.project_config.target_dir]
+
+    def _discover(self) -> Dict[str, Path]:
+        files = self.config_reader.find_dbtvg_configs(
+            self.project_path, self.project_config.model_dirs, self._ignore_dirs()
+        )
+        return {readers.config_key(self.project_path, item): item for item in files}
+
+    def _read(self, paths: Dict[str, Path]) -> None:
+        """Reads the given files, only committing them once every one has parsed"""
+        configs: Dict[str, types.Mapping] = {}
+        dependencies: Dict[str, Set[Path]] = {}
+        for key, filepath in paths.items():
+            config, includes = self.reader_fn(
+                filepath,
+                exceptions.DBTVaultConfigInvalidError,
+                f"Error reading in file {str(filepath)}",
+            )
+            configs[key] = config.get(literals.DBTVG_CONFIG_KEY, {})
+            dependencies[key] = set(includes)
+        self.paths.update(paths)
+        self.configs.update(configs)
+        self.dependencies.update(dependencies)
+
+    def _drop(self, key: str) -> None:
+        for collection in [self.paths, self.configs, self.dependencies, self.models]:
+            collection.pop(key, None)  # type: ignore
+
+    def _build(self, keys: Set[str]) -> List[types.DBTVGBaseModelParams]:
+        """Validates the models of the given files against the defaults they inherit"""
+        # Untouched files only contribute their defaults
+        selected = {
+            key: {
+                literals.DBTVG_DEFAULTS_KEY: config.get(literals.DBTVG_DEFAULTS_KEY, {})
+            }
+            for key, config in self.configs.items()
+            if key not in keys
+        }
+        selected.update({key: deepcopy(self.configs[key]) for key in keys})
+        models = params.process_config_collection(selected) if selected else []
+
+        # Anything we didn't rebuild still owns its model names
+        existing = {
+            item.name: item.location
+            for key, key_models in self.models.items()
+            if key not in keys
+            for item in key_models
+        }
+        duplicates = [
+            f"{item.name}: {existing[item.name]} and {item.location}"
+            for item in models
+            if item.name in existing
+        ]
+        if len(duplicates) > 0:
+            err_loc = "\n".join(duplicates)
+            raise exceptions.DBTVaultConfigInvalidError(
+                f"Duplicate model names detected: {err_loc}"
+            )
+
+        for key in keys:
+            self.models[key] = [item for item in models if item.location == key]
+        return models
+
+    def load(
+        self, project_path: Path, target_folder: Optional[str] = None
+    ) -> List[types.DBTVGBaseModelParams]:
+        self.project_path = project_path.absolute()
+        self.target_folder = target_folder
+        self.project_config = self.get_project_config_fn(
+            self.project_path, target_folder
+        )
+        for key in list(self.paths):
+            self._drop(key)
+        self._read(self._discover())
+        search_dirs = [
+            self.project_path / item for item in self.project_config.model_dirs
+        ]
+        self.dirs = {self.project_path} | set(
+            search.walk_dirs(
+                search_dirs,
+                self.config_reader.ignore_dirs,
+                self.config_reader.prune_paths(self.project_path, self._ignore_dirs()),
+            )
+        )
+        return self._build(set(self.configs))
+
+    def refresh(self, changed: Set[Path]) -> List[types.DBTVGBaseModelParams]:
+        """Brings the workspace up to date, returning the models that need rendering"""
+        if self.project_file in changed or self.root_config in changed:
+            # Root defaults and model paths feed everything, so start again
+            return self.load(self.project_path, self.target_folder)
+
+        affected = {
+            key
+            for key, filepath in self.paths.items()
+            if filepath in changed or len(self.dependencies[key] & changed) > 0
+        }
+        removed: Set[str] = set()
+        if len(changed & self.dirs) > 0:
+            # Files or folders came or went, so see what the project holds now
+            current = self._discover()
+            removed = set(self.paths) - set(current)
+            for key in removed:
+                self._drop(key)
+                affected.discard(key)
+            affected |= set(current) - set(self.paths)
+            search_dirs = [
+                self.project_path / item for item in self.project_config.model_dirs
+            ]
+            self.dirs = {self.project_path} | set(
+                search.walk_dirs(
+                    search_dirs,
+                    self.config_reader.ignore_dirs,
+                    self.config_reader.prune_paths(
+                        self.project_path, self._ignore_dirs()
+                    ),
+                )
+            )
+        else:
+            current = self.paths
+        if "." in affected:
+            return self.load(self.project_path, self.target_folder)
+
+        # Anything below a changed file inherits its defaults
+        touched = affected | removed
+        affected |= {
+            key
+            for key in current
+            if any(item in touched for item in params.config_ancestors(key))
+        }
+
+        self._read({key: current[key] for key in affected})
+        return self._build(affected)
+
+
+def watch(
+    workspace: Workspace,
+    watcher: BaseWatcher,
+    on_change: Callable[[List[types.DBTVGBaseModelParams]], None],
+    on_error: Callable[[Exception], None],
+) -> None:
+    """Feeds every change seen by the watcher through the workspace until interrupted"""
+    while True:
+        changed = watcher.wait(workspace.watched_files, workspace.dirs)
+        try:
+            models = workspace.refresh(changed)
+            on_change(models)
+        except (
+            exceptions.DBTVaultConfigInvalidError,
+            exceptions.ModelGenerationError,
+            exceptions.ProjectNotConfiguredError,
+        ) as e:
+            # Half-finished edits are normal here, so report and keep watching
+            on_error(e)
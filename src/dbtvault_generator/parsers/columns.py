@@ -0,0 +1,220 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from dbtvault_generator.constants import types
+from dbtvault_generator.parsers import params
+
+"""
+DEVNOTE:
+
+The output columns of each `dbtvault` macro follow directly from its arguments, so the
+schema of most of the vault can be worked out without asking the warehouse. The one
+gap is the source columns a stage passes through, which are only known when the
+stage reads from another model generated here; otherwise the catalog fills them in.
+"""
+
+ColumnSource = Callable[[str], List[str]]
+
+
+def _columns(*values: Optional[types.YamlStringList]) -> List[str]:
+    found: List[str] = []
+    for value in values:
+        if value is not None:
+            found.extend(params.coerce_yaml_list_to_list(value))
+    return found
+
+
+def stage_columns(
+    arguments: types.StageParams, source_columns: ColumnSource
+) -> List[str]:
+    found: List[str] = []
+    if arguments.include_source_columns and isinstance(arguments.source_model, str):
+        found.extend(source_columns(arguments.source_model))
+    found.extend(arguments.derived_columns or {})
+    for group in (arguments.null_columns or {}).values():
+        # The original value is kept alongside the one with nulls replaced
+        for column in _columns(group):
+            found.extend([column, f"{column}_ORIGINAL"])
+    found.extend(arguments.hashed_columns or {})
+    found.extend(arguments.ranked_columns or {})
+    return found
+
+
+def hub_columns(arguments: types.HubParams) -> List[str]:
+    return _columns(
+        arguments.src_pk,
+        arguments.src_nk,
+        arguments.src_extra_columns,
+        arguments.src_ldts,
+        arguments.src_source,
+    )
+
+
+def link_columns(arguments: types.LinkParams) -> List[str]:
+    return _columns(
+        arguments.src_pk,
+        arguments.src_fk,
+        arguments.src_extra_columns,
+        arguments.src_ldts,
+        arguments.src_source,
+    )
+
+
+def t_link_columns(arguments: types.TLinkParams) -> List[str]:
+    return _columns(
+        arguments.src_pk,
+        arguments.src_fk,
+        arguments.src_payload,
+        arguments.src_extra_columns,
+        arguments.src_eff,
+        arguments.src_ldts,
+        arguments.src_source,
+    )
+
+
+def sat_columns(arguments: types.SatParams) -> List[str]:
+    return _columns(
+        arguments.src_pk,
+        arguments.src_hashdiff,
+        arguments.src_payload,
+        arguments.src_extra_columns,
+        arguments.src_eff,
+        arguments.src_ldts,
+        arguments.src_source,
+    )
+
+
+def eff_sat_columns(arguments: types.EffSatParams) -> List[str]:
+    return _columns(
+        arguments.src_pk,
+        arguments.src_dfk,
+        arguments.src_sfk,
+        arguments.src_start_date,
+        arguments.src_end_date,
+        arguments.src_extra_columns,
+        arguments.src_eff,
+        arguments.src_ldts,
+        arguments.src_source,
+    )
+
+
+def ma_sat_columns(arguments: types.MaSatParams) -> List[str]:
+    return _columns(
+        arguments.src_pk,
+        arguments.src_cdk,
+        arguments.src_hashdiff,
+        arguments.src_payload,
+        arguments.src_extra_columns,
+        arguments.src_eff,
+        arguments.src_ldts,
+        arguments.src_source,
+    )
+
+
+def xts_columns(arguments: types.XtsParams) -> List[str]:
+    # Every satellite is written into the same name and hashdiff columns
+    satellite_columns: List[str] = []
+    for satellite in arguments.src_satellite.values():
+        satellite_columns.extend(satellite.sat_name)
+        satellite_columns.extend(satellite.hashdiff)
+    return _columns(
+        arguments.src_pk,
+        satellite_columns,
+        arguments.src_extra_columns,
+        arguments.src_ldts,
+        arguments.src_source,
+    )
+
+
+def pit_columns(arguments: types.PitParams) -> List[str]:
+    found = _columns(arguments.src_pk, "AS_OF_DATE")
+    for name, satellite in arguments.satellites.items():
+        found.extend(f"{name}_{key}".upper() for key in satellite.pk)
+        found.extend(f"{name}_{key}".upper() for key in satellite.ldts)
+    return found
+
+
+def bridge_columns(arguments: types.BridgeParams) -> List[str]:
+    found = _columns(arguments.src_pk, "AS_OF_DATE")
+    for walk in arguments.bridge_walk.values():
+        found.extend(_columns(walk.get("bridge_link_pk")))
+    return found
+
+
+COLUMN_BUILDERS: Dict[str, Callable[[Any], List[str]]] = {
+    "hub": hub_columns,
+    "link": link_columns,
+    "t_link": t_link_columns,
+    "sat": sat_columns,
+    "eff_sat": eff_sat_columns,
+    "ma_sat": ma_sat_columns,
+    "xts": xts_columns,
+    "pit": pit_columns,
+    "bridge": bridge_columns,
+}
+
+
+def _unique(columns: Iterable[str]) -> List[str]:
+    """Drops repeated columns, which `dbtvault` collapses, ignoring case"""
+    seen: Set[str] = set()
+    found: List[str] = []
+    for column in columns:
+        if column.upper() not in seen:
+            seen.add(column.upper())
+            found.append(column)
+    return found
+
+
+class ColumnInference:
+    """
+    Works out the output columns of every model from its `dbtvault_arguments`,
+    following `source_model` from stage to stage where they're generated here too
+    """
+
+    def __init__(self, models: List[Tuple[str, types.DBTVGBaseModelParams]]):
+        self.models = dict(models)
+        self._columns: Dict[str, List[str]] = {}
+        self._resolving: Set[str] = set()
+
+    def columns(self, name: str) -> List[str]:
+        if name in self._columns:
+            return self._columns[name]
+        model = self.models.get(name)
+        if model is None or name in self._resolving:
+            # Sources, seeds and models built elsewhere are a job for the catalog
+            return []
+
+        self._resolving.add(name)
+        try:
+            arguments: Any = getattr(model, "dbtvault_arguments")
+            if model.model_type == "stage":
+                found = stage_columns(arguments, self.columns)
+            else:
+                found = COLUMN_BUILDERS[model.model_type](arguments)
+        finally:
+            self._resolving.discard(name)
+        self._columns[name] = _unique(found)
+        return self._columns[name]
+
+    def build_catalog_model(
+        self, name: str, catalog_model: Optional[types.CatalogModel] = None
+    ) -> types.CatalogModel:
+        """
+        Describes a model from its inferred columns, taking data types (and any
+        columns inference couldn't see) from the catalog when it has the model
+        """
+        catalog_columns: Dict[str, types.CatalogModelColumn] = {}
+        if catalog_model is not None:
+            catalog_columns = {
+                key.upper(): value for key, value in catalog_model.columns.items()
+            }
+
+        columns: Dict[str, types.CatalogModelColumn] = {}
+        for column in self.columns(name):
+            # Keep the warehouse's spelling where it knows the column
+            found = catalog_columns.pop(column.upper(), None)
+            if found is None:
+                found = types.CatalogModelColumn(name=column, dtype=None)
+            columns[found.name] = found
+        for found in catalog_columns.values():
+            columns[found.name] = found
+        return types.CatalogModel(name=name, columns=columns)
@@ -1,3 +1,7 @@
+from typing import Iterable, Iterator, List
+
+import yaml
+
 from dbtvault_generator.constants import exceptions, types
 
 
@@ -18,3 +22,44 @@ def clean_generate_model_yaml(macro_output: str) -> str:
         raise exceptions.SubprocessFailed(msg + str(macro_output))
     # Cut off the printout and extract the yaml component
     return target_string + macro_output.split(target_string, 1)[1]
+
+
+def _model_entry(block: List[str]) -> types.Mapping:
+    return yaml.safe_load("".join(block))[0]
+
+
+def iter_generate_model_yaml(lines: Iterable[str]) -> Iterator[types.Mapping]:
+    """
+    Parses the output of `generate_model_yaml` as it arrives, yielding each model's
+    entry once the next one starts, so the whole printout is never held at once
+    """
+    preamble: List[str] = []
+    header = None
+    block: List[str] = []
+    item_indent = None
+    for line in lines:
+        if header is None:
+            if " version:" in line:
+                header = clean_generate_model_yaml(line)
+            else:
+                # Only kept to show what came back if the yaml never does
+                preamble = preamble[-19:] + [line]
+            continue
+        if len(line.strip()) == 0 or line.startswith("models:"):
+            continue
+        if not line[0].isspace():
+            # dbt logging again, after the macro's output
+            break
+        stripped = line.lstrip()
+        indent = len(line) - len(stripped)
+        if stripped.startswith("- ") and item_indent in (None, indent):
+            item_indent = indent
+            if len(block) > 0:
+                yield _model_entry(block)
+            block = []
+        block.append(line)
+    if header is None:
+        # Raises, with the output that was seen
+        clean_generate_model_yaml("".join(preamble))
+    if len(block) > 0:
+        yield _model_entry(block)
@@ -1,8 +1,22 @@
 import abc
+import hashlib
+import json
 import warnings
+from contextlib import nullcontext
 from copy import deepcopy
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set, Tuple, Union, get_args
+from typing import (
+    Any,
+    ContextManager,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+    get_args,
+)
 
 import pydantic
 import yaml
@@ -26,7 +40,7 @@ def recursive_merge(base: types.Mapping, updated: types.Mapping) -> types.Mappin
                     base[key] = recursive_merge(base[key], updated[key])
             elif type(val) == list:
                 # Handle lists by just appending any non-duplicate items
-                base[key] += [item for item in updated[key] if key not in val]
+                base[key] += [item for item in updated[key] if item not in val]
             else:
                 base[key] = updated[key]
 
@@ -38,6 +52,55 @@ def recursive_merge(base: types.Mapping, updated: types.Mapping) -> types.Mappin
     return base
 
 
+def merge_defaults(base: types.Mapping, updated: types.Mapping) -> types.Mapping:
+    """
+    Layers `updated` over `base` like `recursive_merge`, but without copying. Only
+    the dicts along the merged keys are new; every other value is shared with the
+    inputs, so neither input (nor the result) may be mutated afterwards
+    """
+    merged = dict(base)
+    for key, value in updated.items():
+        current: Any = merged.get(key)
+        if key not in base:
+            merged[key] = value
+        elif isinstance(current, dict) and isinstance(value, dict):
+            merged[key] = merge_defaults(current, value)
+        elif isinstance(current, list):
+            # Handle lists by just appending any non-duplicate items
+            merged[key] = current + [item for item in value if item not in current]
+        else:
+            merged[key] = value
+    return merged
+
+
+def config_ancestors(config_loc: str) -> List[str]:
+    """Returns the config locations above the given one, nearest first"""
+    parts = config_loc.split("/")
+    return ["/".join(parts[:index]) for index in range(len(parts) - 1, 0, -1)]
+
+
+def resolve_defaults(
+    configs: Dict[str, types.Mapping], root_defaults: types.Mapping
+) -> Dict[str, types.Mapping]:
+    """
+    Resolves the defaults of every config location once, each layered over those of
+    its nearest ancestor. Locations without their own defaults share their parent's
+    """
+    resolved: Dict[str, types.Mapping] = {}
+    # Parents always sort before their children
+    for config_loc in sorted(configs, key=lambda item: item.count("/")):
+        parent = next(
+            (item for item in config_ancestors(config_loc) if item in resolved), None
+        )
+        base = root_defaults if parent is None else resolved[parent]
+        local_defaults = configs[config_loc].get(literals.DBTVG_DEFAULTS_KEY, {})
+        if config_loc == "." or not local_defaults:
+            resolved[config_loc] = base
+        else:
+            resolved[config_loc] = merge_defaults(base, local_defaults)
+    return resolved
+
+
 def convert_to_string(obj: Any) -> str:
     if isinstance(obj, Path):
         return obj.as_posix()
@@ -109,12 +172,15 @@ def build_model_config(
     new_config: types.Mapping,
     config_path: str,
 ) -> types.Mapping:
-    defaults = deepcopy(defaults)
     if new_config.get(literals.DBTVG_TARGET_PATH_KEY, "") == "":
         # If emtpy, we get rid of overwrite and let base key be default
-        defaults.pop(literals.DBTVG_TARGET_PATH_KEY, None)
-    # Merge cleaned config
-    new_config = recursive_merge(defaults, new_config)
+        defaults = {
+            key: value
+            for key, value in defaults.items()
+            if key != literals.DBTVG_TARGET_PATH_KEY
+        }
+    # Merge cleaned config, which always hands back a dict of our own
+    new_config = merge_defaults(defaults, new_config)
 
     if new_config.get(literals.DBTVG_TARGET_PATH_KEY, "") == "":
         # If there's still no valid path, we add one based on the config loc
@@ -122,68 +188,199 @@ def build_model_config(
     return new_config
 
 
+MODEL_PARAMS: Dict[str, Type[types.DBTVGBaseModelParams]] = {
+    "stage": types.ModelStageParams,
+    "hub": types.ModelHubParams,
+    "link": types.ModelLinkParams,
+    "t_link": types.ModelTLinkParams,
+    "sat": types.ModelSatParams,
+    "eff_sat": types.ModelEffSatParams,
+    "ma_sat": types.ModelMaSatParams,
+    "xts": types.ModelXtsParams,
+    "pit": types.ModelPitParams,
+    "bridge": types.ModelBridgeParams,
+}
+
+
 def model_param_factory(
     model_type: types.DBTVaultModel, params: types.Mapping
 ) -> types.DBTVGBaseModelParams:
-    if model_type == "stage":
-        return types.ModelStageParams(**params)
-    elif model_type == "hub":
-        return types.ModelHubParams(**params)
-    elif model_type == "link":
-        return types.ModelLinkParams(**params)
-    elif model_type == "t_link":
-        return types.ModelTLinkParams(**params)
-    elif model_type == "sat":
-        return types.ModelSatParams(**params)
-    elif model_type == "eff_sat":
-        return types.ModelEffSatParams(**params)
-    elif model_type == "ma_sat":
-        return types.ModelMaSatParams(**params)
-    elif model_type == "xts":
-        return types.ModelXtsParams(**params)
-    elif model_type == "pit":
-        return types.ModelPitParams(**params)
-    elif model_type == "bridge":
-        return types.ModelBridgeParams(**params)
+    model_class = MODEL_PARAMS.get(model_type)
+    if model_class is not None:
+        return model_class(**params)
     elif model_type not in get_args(types.DBTVaultModel):
         raise ValueError(f"Model_type {model_type} made it into model_param_factory")
     raise ValueError(f"Model type {model_type} not currently supported")
 
 
-def parse_model_definition(
+def _error_prefix(model_dict: types.Mapping, config_path: str) -> str:
+    name = model_dict.get(literals.DBTVG_NAME_KEY, "--NAME MISSING--")
+    return f"The param object at location {config_path} with name {name} has"
+
+
+def prepare_model_definition(
     model_dict: types.Mapping,
     defaults: types.Mapping,
     config_path: str,
-) -> types.DBTVGBaseModelParams:
-    # Get the options for the group
+) -> types.Mapping:
+    """Resolves a model's options and location, ready to be validated"""
+    # Get the options for the group. Work on a copy, so configs held in memory can be
+    # processed more than once
     options = model_dict.get(literals.DBTVG_OPTIONS_KEY, {})
-    model_dict[literals.DBTVG_OPTIONS_KEY] = build_model_config(
-        defaults, options, config_path
-    )
-    # Update default location - this is where it is found, not where it's going
-    model_dict[literals.DBTVG_LOCATION_KEY] = config_path
-
-    name = model_dict.get(literals.DBTVG_NAME_KEY, "--NAME MISSING--")
-    error_prefix = f"The param object at location {config_path} with name {name} has"
+    model_dict = {
+        **model_dict,
+        literals.DBTVG_OPTIONS_KEY: build_model_config(defaults, options, config_path),
+        # Update default location - this is where it is found, not where it's going
+        literals.DBTVG_LOCATION_KEY: config_path,
+    }
 
     model_type = model_dict.get(literals.DBTVG_MODEL_TYPE_KEY, None)
     if model_type not in get_args(types.DBTVaultModel) or model_type is None:
         raise exceptions.DBTVaultConfigInvalidError(
-            f"{error_prefix} has invalid type {str(model_type)}"
+            f"{_error_prefix(model_dict, config_path)} has invalid type "
+            f"{str(model_type)}"
         )
+    return model_dict
+
+
+def _validation_error(
+    model_dict: types.Mapping, ve: pydantic.ValidationError
+) -> exceptions.DBTVaultConfigInvalidError:
+    # If validation fails, pass up a truncated error message to the cli
+    errors = [item.get("loc") for item in ve.errors()]
+    prefix = _error_prefix(model_dict, model_dict[literals.DBTVG_LOCATION_KEY])
+    return exceptions.DBTVaultConfigInvalidError(
+        f"{prefix} raised validation errors on the following fields:{str(errors)}"
+    )
+
+
+def parse_model_definition(
+    model_dict: types.Mapping,
+    defaults: types.Mapping,
+    config_path: str,
+) -> types.DBTVGBaseModelParams:
+    model_dict = prepare_model_definition(model_dict, defaults, config_path)
     try:
-        return model_param_factory(model_type, model_dict)
+        return model_param_factory(
+            model_dict[literals.DBTVG_MODEL_TYPE_KEY], model_dict
+        )
     except pydantic.ValidationError as ve:
-        # If validation fails, pass up a truncated error message to the cli
+        raise _validation_error(model_dict, ve)
+
+
+"""
+DEVNOTE:
+
+Validation is the biggest cost after yaml parsing on large projects, so models are
+validated a model type at a time through a single list validator, which pydantic 2
+compiles once (pydantic 1 falls back to one model at a time). Validated models are
+also kept, keyed by a digest of the raw model and the defaults it resolved against,
+so re-processing an unchanged model in a long-lived workspace is a dict lookup.
+Cached models are shared between runs, so nothing may mutate them.
+"""
+
+_VALIDATION_CACHE_LIMIT = 100_000
+_validated: Dict[str, types.DBTVGBaseModelParams] = {}
+_list_validators: Dict[str, Any] = {}
+
+
+def clear_validation_cache() -> None:
+    _validated.clear()
+
+
+def _digest(*values: Any) -> str:
+    # Safe-loaded yaml only holds builtin types, whose repr captures them exactly.
+    # Keys are compared in order, so reordering a model only costs a cache miss
+    return hashlib.blake2b(repr(values).encode(), digest_size=16).hexdigest()
+
 
-        errors = [item.get("loc") for item in ve.errors()]
+def _list_validator(model_type: str) -> Any:
+    if model_type not in _list_validators:
+        adapter = getattr(pydantic, "TypeAdapter", None)
+        model_class = MODEL_PARAMS[model_type]
+        _list_validators[model_type] = (
+            None if adapter is None else adapter(List[model_class])  # type: ignore
+        )
+    return _list_validators[model_type]
+
+
+def _validate_group(
+    model_type: str, model_dicts: List[types.Mapping]
+) -> List[Union[types.DBTVGBaseModelParams, exceptions.DBTVaultConfigInvalidError]]:
+    list_validator = _list_validator(model_type)
+    if list_validator is not None:
+        try:
+            return list_validator.validate_python(model_dicts)
+        except pydantic.ValidationError:
+            # Go again one at a time, to pin each error to its model
+            pass
+    results: List[
+        Union[types.DBTVGBaseModelParams, exceptions.DBTVaultConfigInvalidError]
+    ] = []
+    for model_dict in model_dicts:
+        try:
+            results.append(model_param_factory(model_type, model_dict))  # type: ignore
+        except pydantic.ValidationError as ve:
+            results.append(_validation_error(model_dict, ve))
+    return results
+
+
+def validate_model_definitions(
+    model_definitions: List[Tuple[types.Mapping, types.Mapping, str]],
+) -> List[types.DBTVGBaseModelParams]:
+    """
+    Validates models given as (model, defaults, config location), keeping their
+    order. Every invalid model is reported together, rather than just the first
+    """
+    results: List[Optional[types.DBTVGBaseModelParams]] = [None] * len(
+        model_definitions
+    )
+    errors: List[str] = []
+    groups: Dict[str, List[Tuple[int, str, types.Mapping]]] = {}
+    defaults_digests: Dict[int, str] = {}
+    for position, (model_dict, defaults, config_path) in enumerate(model_definitions):
+        # Files share one defaults mapping between all of their models
+        if id(defaults) not in defaults_digests:
+            defaults_digests[id(defaults)] = _digest(defaults)
+        key = _digest(defaults_digests[id(defaults)], config_path, model_dict)
+        cached = _validated.get(key)
+        if cached is not None:
+            results[position] = cached
+            continue
+        try:
+            prepared = prepare_model_definition(model_dict, defaults, config_path)
+        except exceptions.DBTVaultConfigInvalidError as e:
+            errors.append(str(e))
+            continue
+        model_type = prepared[literals.DBTVG_MODEL_TYPE_KEY]
+        groups.setdefault(model_type, []).append((position, key, prepared))
+
+    for model_type, group in groups.items():
+        validated = _validate_group(model_type, [item for _, _, item in group])
+        for (position, key, _), result in zip(group, validated):
+            if isinstance(result, exceptions.DBTVaultConfigInvalidError):
+                errors.append(str(result))
+                continue
+            results[position] = result
+            if len(_validated) >= _VALIDATION_CACHE_LIMIT:
+                del _validated[next(iter(_validated))]
+            _validated[key] = result
+
+    if len(errors) > 0:
+        err_list = "\n".join(errors)
         raise exceptions.DBTVaultConfigInvalidError(
-            f"{error_prefix} raised validation errors on the following fields:"
-            f"{str(errors)}"
+            f"{len(errors)} model(s) failed validation:\n{err_list}"
         )
+    return [item for item in results if item is not None]
 
 
-def process_config_collection(configs: Dict[str, types.Mapping]):
+def _no_span(name: str) -> ContextManager[None]:
+    return nullcontext()
+
+
+def process_config_collection(
+    configs: Dict[str, types.Mapping], span_fn: types.SpanFn = _no_span
+):
     # Use root config defaults to update all child defaults,
     # else use global defaults
     if len(configs) == 0:
@@ -194,22 +391,21 @@ def process_config_collection(configs: Dict[str, types.Mapping]):
     cfg: types.Mapping = (
         configs["."].get(literals.DBTVG_DEFAULTS_KEY, {}) if "." in configs else {}
     )
-    root_defaults = types.DBTVGConfig(**cfg).dict()
-
-    models: List[types.DBTVGBaseModelParams] = []
-    for config_loc, local_config in configs.items():
-        # Always update the keys - we want to propagate the default values out
-        default_config = recursive_merge(
-            root_defaults, local_config.get(literals.DBTVG_DEFAULTS_KEY, {})
+    with span_fn("defaults"):
+        root_defaults = types.DBTVGConfig(**cfg).dict()
+        # Each file's defaults build on those of the nearest file above it
+        defaults = resolve_defaults(configs, root_defaults)
+
+    with span_fn("validate"):
+        # Pair each model with the defaults of its file. Validation moves the model
+        # configs into their configured form - each is now independent of defaults
+        models = validate_model_definitions(
+            [
+                (item, defaults[config_loc], config_loc)
+                for config_loc, local_config in configs.items()
+                for item in local_config.get(literals.DBTVG_MODELS_KEY, [])
+            ]
         )
-        # Iterate over each of the files, update the config and append to the
-        # dict that will construct the config object. This moves the model configs
-        # into their configured form - each is now independent of default configs
-        model_configs = [
-            parse_model_definition(item, default_config, config_loc)
-            for item in local_config.get(literals.DBTVG_MODELS_KEY, [])
-        ]
-        models.extend(model_configs)
 
     # Check for duplicate model names
     duplicates = [""]
@@ -262,6 +458,35 @@ def build_exec_docgen_command(cli_args: List[str], model_names: List[str]) -> Li
     return base_commands + cli_args + args
 
 
+def chunk_model_names(
+    cli_args: List[str], model_names: List[str], limit: int
+) -> List[List[str]]:
+    """
+    Packs the model names, in order, into as few `generate_model_yaml` commands as
+    fit within `limit` characters each
+    """
+    base_length = sum(len(item) + 1 for item in build_exec_docgen_command(cli_args, []))
+    chunks: List[List[str]] = []
+    chunk: List[str] = []
+    length = base_length
+    for name in model_names:
+        # Json strings are valid yaml, and never shorter than how yaml writes them,
+        # so this bounds the cost of a name and its separator without dumping
+        cost = len(json.dumps(name)) + 2
+        if base_length + cost > limit:
+            raise exceptions.SubprocessFailed(
+                f"Model name {name} is too long to pass to dbt on the command line"
+            )
+        if len(chunk) > 0 and length + cost > limit:
+            chunks.append(chunk)
+            chunk, length = [], base_length
+        chunk.append(name)
+        length += cost
+    if len(chunk) > 0:
+        chunks.append(chunk)
+    return chunks
+
+
 def coerce_yaml_list_to_str(yaml_list: types.YamlStringList) -> str:
     if isinstance(yaml_list, str):
         return yaml_list
@@ -277,6 +502,11 @@ def coerce_yaml_list_to_list(yaml_list: types.YamlStringList) -> List[str]:
     return yaml_list
 
 
+def single_key_column(key_columns: List[str]) -> Optional[str]:
+    """Composite keys have no single primary key column"""
+    return key_columns[0] if len(key_columns) == 1 else None
+
+
 class BaseModelRelationshipBuild(abc.ABC):
     @abc.abstractmethod
     def __call__(self, config: Any) -> types.RelationshipExtract:
@@ -285,16 +515,20 @@ class BaseModelRelationshipBuild(abc.ABC):
 
 class HubModelRelationBuild(BaseModelRelationshipBuild):
     def __call__(self, config: types.ModelHubParams) -> types.RelationshipExtract:
+        key_columns = coerce_yaml_list_to_list(config.dbtvault_arguments.src_pk)
         relationships = types.RelationshipExtract(
-            primary_key=coerce_yaml_list_to_str(config.dbtvault_arguments.src_pk),
+            primary_key=single_key_column(key_columns),
+            key_columns=key_columns,
         )
         return relationships
 
 
 class LinkModelRelationBuild(BaseModelRelationshipBuild):
     def __call__(self, config: types.ModelLinkParams) -> types.RelationshipExtract:
+        key_columns = coerce_yaml_list_to_list(config.dbtvault_arguments.src_pk)
         relationships = types.RelationshipExtract(
-            primary_key=coerce_yaml_list_to_str(config.dbtvault_arguments.src_pk),
+            primary_key=single_key_column(key_columns),
+            key_columns=key_columns,
             foreign_keys=config.dbtvault_arguments.src_fk,
         )
         return relationships
@@ -302,8 +536,10 @@ class LinkModelRelationBuild(BaseModelRelationshipBuild):
 
 class TLinkModelRelationBuild(BaseModelRelationshipBuild):
     def __call__(self, config: types.ModelTLinkParams) -> types.RelationshipExtract:
+        key_columns = coerce_yaml_list_to_list(config.dbtvault_arguments.src_pk)
         relationships = types.RelationshipExtract(
-            primary_key=coerce_yaml_list_to_str(config.dbtvault_arguments.src_pk),
+            primary_key=single_key_column(key_columns),
+            key_columns=key_columns,
             foreign_keys=config.dbtvault_arguments.src_fk,
         )
         return relationships
@@ -393,7 +629,7 @@ def model_relations_factory(
 
 
 def build_primary_keys(
-    models: List[Tuple[str, types.DBTVGBaseModelParams]]
+    models: List[Tuple[str, types.DBTVGBaseModelParams]],
 ) -> Dict[str, str]:
     """Extract all hub primary keys as the foundation of relationship matching"""
     primary_keys: Dict[str, str] = {}
@@ -426,13 +662,13 @@ def match_foreign_keys(
         for item in relation_extract(model).foreign_keys:
             if item in primary_key_dict:
                 # Current table, shared key denoting rel'p, primary table
-                foreign_key_match[name] = {item: primary_key_dict[item]}
+                foreign_key_match[name][item] = primary_key_dict[item]
 
     return foreign_key_match
 
 
 def find_model_relationships(
-    models: List[Tuple[str, types.DBTVGBaseModelParams]]
+    models: List[Tuple[str, types.DBTVGBaseModelParams]],
 ) -> Dict[str, Dict[str, str]]:
     """Use greedy matching to find relationships between primary or foreign keys"""
     primary_keys = build_primary_keys(models)
@@ -0,0 +1,106 @@
+import warnings
+from collections import defaultdict
+from typing import DefaultDict, Dict, List, Tuple, Union
+
+from dbtvault_generator.constants import types
+from dbtvault_generator.parsers import params
+
+KeyColumns = Tuple[str, ...]
+
+# Only these own keys that other models can point at
+KEY_OWNER_TYPES = ["hub", "link", "t_link"]
+
+
+def extract_relations(model: types.DBTVGBaseModelParams) -> types.RelationshipExtract:
+    if model.model_type == "stage":
+        # Stages only feed the vault, nothing refers to them by key
+        return types.RelationshipExtract()
+    return params.model_relations_factory(model.model_type)(model)
+
+
+class RelationshipIndex:
+    """
+    Extracts the keys of every model once, indexes the primary keys of the hubs and
+    links by their columns and resolves every foreign key in a single pass
+    """
+
+    def __init__(self, models: List[Tuple[str, types.DBTVGBaseModelParams]]):
+        self.extracts: Dict[str, types.RelationshipExtract] = {}
+        self.primary_keys: Dict[KeyColumns, str] = {}
+        self._single_keys: Dict[str, str] = {}
+        # Composite keys are found through their first column, then checked in full
+        self._composite_keys: DefaultDict[str, List[KeyColumns]] = defaultdict(list)
+        for name, model in models:
+            extract = extract_relations(model)
+            self.extracts[name] = extract
+            if model.model_type in KEY_OWNER_TYPES and len(extract.key_columns) > 0:
+                self._add_primary_key(tuple(extract.key_columns), name)
+        self.foreign_keys = {
+            name: self._match(extract.foreign_keys)
+            for name, extract in self.extracts.items()
+        }
+
+    def _add_primary_key(self, key: KeyColumns, name: str) -> None:
+        if key in self.primary_keys:
+            warnings.warn(
+                f"Duplicate hub primary key name {', '.join(key)} found, "
+                "automatic generation will be inconsistent"
+            )
+            return
+        self.primary_keys[key] = name
+        if len(key) == 1:
+            self._single_keys[key[0]] = name
+        else:
+            self._composite_keys[key[0]].append(key)
+
+    def _match(self, foreign_keys: List[str]) -> Dict[str, str]:
+        """Maps every foreign key column of a model to the model owning that key"""
+        matches: Dict[str, str] = {}
+        for column in foreign_keys:
+            owner = self._single_keys.get(column)
+            if owner is not None:
+                matches.setdefault(column, owner)
+            for key in self._composite_keys.get(column, ()):
+                if all(item in foreign_keys for item in key):
+                    for item in key:
+                        matches.setdefault(item, self.primary_keys[key])
+        return matches
+
+    def key_columns(self, name: str) -> List[str]:
+        extract = self.extracts[name]
+        if len(extract.key_columns) > 0:
+            return extract.key_columns
+        return [] if extract.primary_key is None else [extract.primary_key]
+
+    def build_schema_entry(
+        self, name: str, catalog_model: types.CatalogModel
+    ) -> types.Mapping:
+        """The schema.yml entry for a model, with tests marking its keys"""
+        key_columns = self.key_columns(name)
+        foreign_keys = self.foreign_keys[name]
+        column_holder: List[types.Mapping] = []
+        for column_name, item in catalog_model.columns.items():
+            test_holder: List[Union[types.Mapping, str]] = []
+            column: types.Mapping = {"name": column_name, "description": ""}
+            if item.dtype is not None:
+                # Inferred columns only have a type once the catalog supplies one
+                column["data_type"] = item.dtype
+            if column_name in key_columns:
+                # Only the whole of a composite key is unique
+                if len(key_columns) == 1:
+                    test_holder.extend(params.primary_key_test())
+                else:
+                    test_holder.append("not_null")
+            elif column_name in foreign_keys:
+                test_holder.extend(
+                    params.foreign_key_test(foreign_keys[column_name], column_name)
+                )
+            if len(test_holder) > 0:
+                column["tests"] = test_holder
+            column_holder.append(column)
+
+        return {
+            "name": catalog_model.name,
+            "description": "",
+            "columns": column_holder,
+        }
@@ -0,0 +1,100 @@
+from typing import Any, Dict, List
+
+from dbtvault_generator.constants import types
+
+"""
+DEVNOTE:
+
+Merging a generated `schema.yml` into the one on disk. Models and columns are matched
+by name through a dict, rather than by position or by scanning the list, so a file
+with hundreds of models merges in a single pass. Anything already in the file wins:
+hand-written descriptions, tags and tests are never overwritten, generated tests are
+only added alongside them, and models and columns missing from the generated payload
+are left where they are.
+
+Nothing is copied. The result shares every untouched value with its inputs, so it is
+only fit for writing out, and the merge returns the existing document itself when
+there's nothing to add, so callers can skip the write.
+"""
+
+# Lists of mappings matched up by these keys, rather than by equality
+KEYED_LISTS = {"models": "name", "columns": "name", "sources": "name", "tables": "name"}
+
+
+def _union(existing: List[Any], generated: List[Any]) -> List[Any]:
+    """Existing items in order, then any generated items not already there"""
+    hashable = [item for item in existing if not isinstance(item, (dict, list))]
+    seen = set(hashable)
+    unhashable = [item for item in existing if isinstance(item, (dict, list))]
+    merged = list(existing)
+    for item in generated:
+        if isinstance(item, (dict, list)):
+            if item in unhashable:
+                continue
+            unhashable.append(item)
+        elif item in seen:
+            continue
+        else:
+            seen.add(item)
+        merged.append(item)
+    return merged if len(merged) > len(existing) else existing
+
+
+def _merge_keyed(existing: List[Any], generated: List[Any], key: str) -> List[Any]:
+    positions: Dict[Any, int] = {
+        item[key]: position
+        for position, item in enumerate(existing)
+        if isinstance(item, dict) and key in item
+    }
+    merged = list(existing)
+    changed = False
+    for item in generated:
+        position = positions.get(item.get(key)) if isinstance(item, dict) else None
+        if position is None:
+            positions[item.get(key)] = len(merged)
+            merged.append(item)
+            changed = True
+            continue
+        entry = merge_entry(merged[position], item)
+        if entry is not merged[position]:
+            merged[position] = entry
+            changed = True
+    return merged if changed else existing
+
+
+def merge_entry(existing: types.Mapping, generated: types.Mapping) -> types.Mapping:
+    """
+    Adds what's missing from `existing` out of `generated`, returning `existing`
+    itself when nothing is
+    """
+    merged: types.Mapping = existing
+    for key, value in generated.items():
+        if key not in existing:
+            new_value = value
+        elif isinstance(existing[key], dict) and isinstance(value, dict):
+            new_value = merge_entry(existing[key], value)
+        elif isinstance(existing[key], list) and isinstance(value, list):
+            if key in KEYED_LISTS:
+                new_value = _merge_keyed(existing[key], value, KEYED_LISTS[key])
+            else:
+                new_value = _union(existing[key], value)
+        else:
+            # Values already in the file are the user's to change
+            continue
+        if key in existing and new_value is existing[key]:
+            continue
+        if merged is existing:
+            merged = dict(existing)
+        merged[key] = new_value
+    return merged
+
+
+def merge_schema(generated: types.Mapping, existing: Any) -> types.Mapping:
+    """
+    Merges a generated `schema.yml` payload into the existing file's contents,
+    returning `existing` itself if the file needs no change
+    """
+    if not isinstance(existing, dict):
+        # An empty file has nothing to keep
+        return generated
+    return merge_entry(existing, generated)
@@ -0,0 +1,116 @@
+import shutil
+import tempfile
+import unittest
+from copy import deepcopy
+from pathlib import Path
+from typing import Dict
+
+from dbtvault_generator import api
+from dbtvault_generator.constants import exceptions, literals
+from dbtvault_generator.files import file_io
+from dbtvault_generator.generator import readers, runners, subprocess
+from dbtvault_generator.parsers import params
+
+TEST_ROOT = Path(__file__).parent
+project_source = TEST_ROOT / "data/projects/vault_project"
+artifact_path = TEST_ROOT / "data/artifacts"
+
+
+def _virtual_tree(project_dir: Path) -> Dict[str, str]:
+    return {
+        item.relative_to(project_dir).as_posix(): item.read_text()
+        for item in project_dir.rglob("*.yml")
+        if item.name != "dbt_project.yml"
+    }
+
+
+class TestApi(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.project_dir = Path(self.tmp_dir.name) / "project"
+        shutil.copytree(project_source, self.project_dir)
+        self.files = _virtual_tree(self.project_dir)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_configs_from_files(self):
+        configs = api.configs_from_files(self.files)
+        self.assertEqual(
+            sorted(configs), [".", "./models/raw_vault", "./models/staging"]
+        )
+        # Fragments are pulled in from the tree, not the disk
+        sat = configs["./models/raw_vault"]["models"][1]
+        self.assertEqual(sat["dbtvault_arguments"]["src_pk"], "CUSTOMER_HK")
+
+    def test_configs_from_files_paths(self):
+        files = {f"./{path}": text for path, text in self.files.items()}
+        self.assertEqual(
+            api.configs_from_files(files), api.configs_from_files(self.files)
+        )
+        with self.assertRaises(exceptions.DBTVaultConfigInvalidError):
+            file_io.read_virtual_yml(self.files, "models/missing/dbtvault.yml")
+
+    def test_virtual_include_errors(self):
+        files = {
+            literals.DBTVG_YAML_NAME: "dbtvault: !include a.yml",
+            "a.yml": "models: !include dbtvault.yml",
+        }
+        with self.assertRaises(exceptions.IncludeCycleError):
+            api.configs_from_files(files)
+        with self.assertRaises(exceptions.DBTVaultConfigInvalidError):
+            api.configs_from_files({literals.DBTVG_YAML_NAME: "a: !include b.yml"})
+
+    def test_generate_sql_matches_disk(self):
+        config_file_reader = readers.ConfigReader(file_io.read_yml_file)
+        runners.SqlGenerator(
+            params.get_dbt_project_config,
+            config_file_reader.readin_dbtvg_configs,
+            file_io.write_text,
+        ).run(self.project_dir)
+
+        configs = api.configs_from_files(self.files)
+        original = deepcopy(configs)
+        rendered = api.generate_sql(configs)
+        self.assertEqual(
+            sorted(rendered),
+            ["hub_customer", "sat_customer_details", "stg_customer_crm"],
+        )
+        for name, sql in rendered.items():
+            on_disk = next(self.project_dir.rglob(f"{name}.sql")).read_text()
+            self.assertEqual(sql, on_disk)
+        # The same configs can be generated from again
+        self.assertEqual(configs, original)
+        self.assertEqual(dict(api.iter_sql(configs)), rendered)
+
+    def test_generate_docs_matches_disk(self):
+        config_file_reader = readers.ConfigReader(file_io.read_yml_file)
+        schema_merge_file = readers.SchemaMerger(
+            file_io.read_yml_file, file_io.write_yaml_file
+        )
+        with self.assertWarns(UserWarning):
+            runners.DocsGenerator(
+                params.get_dbt_project_config,
+                config_file_reader.readin_dbtvg_configs,
+                subprocess.run_shell_operation,
+                schema_merge_file.merge_schemas,
+                file_io.stream_catalog,
+            ).run(self.project_dir, overwrite=True)
+
+        schemas = api.generate_docs(api.configs_from_files(self.files))
+        self.assertEqual(
+            sorted(schemas),
+            ["models/raw_vault/schema.yml", "models/staging/schema.yml"],
+        )
+        for path, payload in schemas.items():
+            on_disk = file_io.read_yml_file(self.project_dir / path, TypeError, "")
+            self.assertEqual(payload, on_disk)
+
+    def test_generate_docs_with_catalog(self):
+        catalog = file_io.stream_catalog(artifact_path)
+        configs = api.configs_from_files(self.files)
+        schemas = api.generate_docs(configs, catalog.models, {"customer"})
+        self.assertEqual(list(schemas), ["models/raw_vault/schema.yml"])
+        hub = schemas["models/raw_vault/schema.yml"]["models"][0]
+        self.assertEqual(hub["name"], "hub_customer")
+        self.assertIn("data_type", hub["columns"][0])
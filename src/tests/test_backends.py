@@ -0,0 +1,121 @@
+import sys
+import importlib.machinery
+import time
+import types as pytypes
+import unittest
+from typing import Any, List
+from unittest import mock
+
+import yaml
+
+from dbtvault_generator.constants import exceptions
+from dbtvault_generator.generator import backends, subprocess
+
+STUB_MODULE = "stub_dbt_runner"
+
+
+class StubResult:
+    def __init__(self, success: bool, result: Any = None, exception: Any = None):
+        self.success = success
+        self.result = result
+        self.exception = exception
+
+
+class StubEvent:
+    def __init__(self, msg: str):
+        self.info = pytypes.SimpleNamespace(msg=msg)
+
+
+class StubRunner:
+    """Stands in for dbt's `dbtRunner`, recording what it's asked to do"""
+
+    invocations: List[List[str]] = []
+
+    def __init__(self, manifest: Any = None, callbacks: Any = None):
+        self.manifest = manifest
+        self.callbacks = callbacks or []
+
+    def invoke(self, args: List[str]) -> StubResult:
+        self.invocations.append(args)
+        if args[0] == "parse":
+            return StubResult(True, "manifest")
+        assert self.manifest == "manifest", "Operations should reuse the manifest"
+        if args[0] == "fail":
+            return StubResult(False, exception=RuntimeError("macro failed"))
+        if args[0] == "sleep":
+            time.sleep(1)
+        names = yaml.safe_load(args[args.index("--args") + 1])["model_names"]
+        models = "".join(f"\n  - name: {name}" for name in names)
+        for callback in self.callbacks:
+            callback(StubEvent("Running with dbt=1.5.0"))
+            callback(StubEvent(f"version: 2\n\nmodels:{models}"))
+        return StubResult(True)
+
+
+class TestBackends(unittest.TestCase):
+    def setUp(self):
+        module = pytypes.ModuleType(STUB_MODULE)
+        module.__spec__ = importlib.machinery.ModuleSpec(STUB_MODULE, None)
+        setattr(module, "dbtRunner", StubRunner)
+        sys.modules[STUB_MODULE] = module
+        StubRunner.invocations = []
+
+    def tearDown(self):
+        del sys.modules[STUB_MODULE]
+
+    def test_load_backend(self):
+        backend = backends.load_backend(["--target", "dev"], STUB_MODULE)
+        self.assertIsInstance(backend, backends.InProcessBackend)
+        missing = backends.load_backend(None, "not_a_module.cli.main")
+        self.assertIsInstance(missing, backends.SubprocessBackend)
+
+    def test_docgen_catalog_loader(self):
+        with mock.patch.object(importlib.util, "find_spec") as find_spec:
+            loader = backends.DocgenCatalogLoader(["--target", "dev"], STUB_MODULE)
+            find_spec.assert_not_called()
+        self.assertIsNone(loader.backend)
+
+        catalog = loader(["a", "b"])
+        self.assertEqual(sorted(catalog.models), ["a", "b"])
+        self.assertIsInstance(loader.backend, backends.InProcessBackend)
+        loader(["c"])
+        commands = [args[0] for args in StubRunner.invocations]
+        self.assertEqual(commands, ["parse"] + ["run-operation"] * 2)
+
+    def test_docgen_catalog_loader_limit(self):
+        project_args = ["--project-dir", "/a/long/path/to/the/project"]
+        limit = 110
+        loader = backends.DocgenCatalogLoader(project_args, STUB_MODULE, limit=limit)
+        catalog = loader(["a", "b", "c"])
+        self.assertEqual(sorted(catalog.models), ["a", "b", "c"])
+        operations = StubRunner.invocations[1:]
+        self.assertGreater(len(operations), 1)
+        for args in operations:
+            self.assertEqual(args[-2:], project_args)
+            command = ["dbt", *args]
+            self.assertLessEqual(sum(len(item) + 1 for item in command), limit)
+
+    def test_parses_once(self):
+        backend = backends.InProcessBackend(["--target", "dev"], STUB_MODULE)
+        entries = list(
+            subprocess.run_docgen_operations(
+                [], ["a", "b", "c"], limit=70, stream_fn=backend.stream
+            )
+        )
+        self.assertEqual(sorted(item["name"] for item in entries), ["a", "b", "c"])
+        commands = [args[0] for args in StubRunner.invocations]
+        self.assertEqual(commands, ["parse"] + ["run-operation"] * 3)
+        self.assertTrue(
+            all(args[-2:] == ["--target", "dev"] for args in StubRunner.invocations)
+        )
+
+        output = backend.run(["dbt", "run-operation", "--args", "{model_names: [d]}"])
+        self.assertIn("  version: 2", output)
+        self.assertEqual(len(StubRunner.invocations), 5)
+
+    def test_failures(self):
+        backend = backends.InProcessBackend(None, STUB_MODULE)
+        with self.assertRaisesRegex(exceptions.SubprocessFailed, "macro failed"):
+            backend.run(["dbt", "fail"])
+        with self.assertRaisesRegex(exceptions.SubprocessFailed, "timed out"):
+            list(backend.stream(["dbt", "sleep"], timeout=0.1))
@@ -0,0 +1,109 @@
+import sys
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Dict, List
+from unittest import mock
+
+from typer.testing import CliRunner
+
+from dbtvault_generator.cli import commands
+from dbtvault_generator.generator import workspace
+
+TEST_ROOT = Path(__file__).parent
+project_source = TEST_ROOT / "data/projects/vault_project"
+
+# Generous, as CI machines vary; eagerly loading the dbt artifact classes alone
+# takes several seconds
+CLI_IMPORT_BUDGET_US = 1_000_000
+
+
+def _import_times(arguments: List[str]) -> Dict[str, int]:
+    """Cumulative import time, in microseconds, of every module a run loads"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *arguments],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line.split("|")
+        if cumulative.strip().isdigit():
+            times[module.strip()] = int(cumulative)
+    return times
+
+
+class TestCliImports(unittest.TestCase):
+    def test_help_imports(self):
+        times = _import_times(["-m", "dbtvault_generator.main", "--help"])
+        self.assertIn("dbtvault_generator.cli.commands", times)
+        self.assertNotIn("dbt_artifacts_parser", times)
+        self.assertNotIn("dbtvault_generator.constants.types", times)
+        self.assertNotIn("dbtvault_generator.parsers.templaters", times)
+        self.assertLess(times["dbtvault_generator.cli"], CLI_IMPORT_BUDGET_US)
+
+    def test_sql_imports(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            project_dir = Path(tmp_dir) / "project"
+            shutil.copytree(project_source, project_dir)
+            times = _import_times(
+                [
+                    "-m",
+                    "dbtvault_generator.main",
+                    "sql",
+                    "--project-path",
+                    str(project_dir),
+                    "--no-cache",
+                ]
+            )
+            self.assertTrue(
+                (project_dir / "models/raw_vault/hub_customer.sql").is_file()
+            )
+        self.assertIn("dbtvault_generator.parsers.templaters", times)
+        self.assertNotIn("dbt_artifacts_parser", times)
+
+    def test_docs_imports(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            project_dir = Path(tmp_dir) / "project"
+            shutil.copytree(project_source, project_dir)
+            times = _import_times(
+                [
+                    "-m",
+                    "dbtvault_generator.main",
+                    "docs",
+                    "--project-path",
+                    str(project_dir),
+                    "--no-catalog",
+                ]
+            )
+            self.assertTrue((project_dir / "models/raw_vault/schema.yml").is_file())
+        # Nothing asked for dbt, so it isn't even looked for
+        self.assertNotIn("dbt", times)
+        self.assertNotIn("dbt_artifacts_parser", times)
+
+
+class TestWatchCommand(unittest.TestCase):
+    def test_watch_rewrites_edited_models(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            project_dir = Path(tmp_dir) / "project"
+            shutil.copytree(project_source, project_dir)
+            model_file = project_dir / "models/raw_vault/hub_customer.sql"
+            model_file.write_text("stale")
+
+            def watch_once(project, watcher, on_change, on_error):
+                self.assertEqual(model_file.read_text(), "stale")
+                edited = [m for m in project.all_models if m.model_type == "hub"]
+                on_change(edited)
+                raise KeyboardInterrupt
+
+            with mock.patch.object(workspace, "watch", watch_once):
+                result = CliRunner().invoke(
+                    commands.dbtvgen, ["watch", "--project-path", str(project_dir)]
+                )
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertIn("dbtvault.hub", model_file.read_text())
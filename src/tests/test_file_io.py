@@ -0,0 +1,341 @@
+import os
+import sys
+import importlib
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import yaml
+
+from dbtvault_generator.constants import exceptions, literals, types
+from dbtvault_generator.files import cache, file_io, search
+from dbtvault_generator.generator import readers
+
+TEST_ROOT = Path(__file__).parent
+artifact_path = TEST_ROOT / "data/artifacts"
+project_source = TEST_ROOT / "data/projects/vault_project"
+
+
+class TestCatalogLoaders(unittest.TestCase):
+    def test_stream_catalog_matches_load_catalog(self):
+        want = file_io.load_catalog(artifact_path)
+        self.assertEqual(want, file_io.stream_catalog(artifact_path))
+        self.assertEqual(
+            set(want.models),
+            {"stg_customer_crm", "hub_customer", "sat_customer_details"},
+        )
+        self.assertEqual(
+            want.models["hub_customer"].columns["CUSTOMER_HK"].dtype, "BINARY"
+        )
+
+    def test_stream_catalog_selection(self):
+        selected = {"hub_customer", "not_in_catalog"}
+        catalog = file_io.stream_catalog(artifact_path, selected)
+        self.assertEqual(list(catalog.models), ["hub_customer"])
+        self.assertEqual(catalog, file_io.load_catalog(artifact_path, selected))
+
+    def test_stream_catalog_without_ijson(self):
+        with mock.patch.dict(sys.modules, {"ijson": None}):
+            catalog = file_io.stream_catalog(artifact_path, {"hub_customer"})
+        self.assertEqual(catalog, file_io.load_catalog(artifact_path, {"hub_customer"}))
+
+    def test_stream_catalog_errors(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(exceptions.DbtArtifactError):
+                file_io.stream_catalog(Path(tmp_dir))
+
+            catalog = json.loads(
+                (artifact_path / literals.DEFAULT_NAME_CATALOG).read_text()
+            )
+            broken = json.dumps(catalog)[:-100]
+            (Path(tmp_dir) / literals.DEFAULT_NAME_CATALOG).write_text(broken)
+            with self.assertRaises(exceptions.DbtArtifactError):
+                file_io.stream_catalog(Path(tmp_dir))
+
+
+class TestManifestLoader(unittest.TestCase):
+    def test_load_manifest(self):
+        manifest = file_io.load_manifest(artifact_path)
+        self.assertEqual(
+            set(manifest.models),
+            {"stg_customer_crm", "hub_customer", "sat_customer_details"},
+        )
+        self.assertEqual(manifest.models["hub_customer"].config["materialized"], "view")
+        with mock.patch.dict(sys.modules, {"ijson": None}):
+            self.assertEqual(manifest, file_io.load_manifest(artifact_path))
+
+    def test_load_manifest_missing(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(exceptions.DbtArtifactError):
+                file_io.load_manifest(Path(tmp_dir))
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.project_dir = Path(self.tmp_dir.name) / "project"
+        shutil.copytree(project_source, self.project_dir)
+        self.config = self.project_dir / "models/raw_vault" / literals.DBTVG_YAML_NAME
+        self.fragment = (
+            self.project_dir / "models/raw_vault/fragments/customer_details.yml"
+        )
+        self.parse_cache = cache.ParseCache(self.project_dir / "target/.dbtvg_cache")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _read(self) -> types.Mapping:
+        return self.parse_cache.read_yml_file(self.config, TypeError, "unreadable")
+
+    def test_read_yml_file_with_dependencies(self):
+        data, dependencies = file_io.read_yml_file_with_dependencies(
+            self.config, TypeError, "unreadable"
+        )
+        self.assertEqual(dependencies, [self.fragment.resolve()])
+        self.assertEqual(data, file_io.read_yml_file(self.config, TypeError, ""))
+
+    def test_read_yml_file_without_libyaml(self):
+        want = file_io.read_yml_file(self.config, TypeError, "unreadable")
+        try:
+            with mock.patch.dict(yaml.__dict__):
+                yaml.__dict__.pop("CSafeLoader", None)
+                yaml.__dict__.pop("CSafeDumper", None)
+                importlib.reload(file_io)
+                self.assertIs(file_io.YamlLoader, yaml.SafeLoader)
+                self.assertEqual(
+                    file_io.read_yml_file(self.config, TypeError, "unreadable"), want
+                )
+        finally:
+            importlib.reload(file_io)
+
+    def test_parse_cache_hits(self):
+        want = file_io.read_yml_file(self.config, TypeError, "unreadable")
+        self.assertEqual(self._read(), want)
+        with mock.patch.object(file_io, "read_yml_file_with_dependencies") as reader:
+            self.assertEqual(self._read(), want)
+            # Touching a file without changing it should still hit the cache
+            os.utime(self.config)
+            self.assertEqual(self._read(), want)
+            reader.assert_not_called()
+
+    def test_parse_cache_touched_file_hashed_once(self):
+        self._read()
+        os.utime(self.fragment, ns=(0, 0))
+        with mock.patch.object(cache, "_digest", wraps=cache._digest) as digest:
+            self._read()
+            self.assertEqual(digest.call_count, 1)
+            # The new mtime was written back, so the next read skips the hash
+            self._read()
+            self.assertEqual(digest.call_count, 1)
+
+    def test_parse_cache_include_invalidation(self):
+        self._read()
+        self.fragment.write_text(self.fragment.read_text().replace("LOAD", "LOADED"))
+        models = self._read()[literals.DBTVG_CONFIG_KEY][literals.DBTVG_MODELS_KEY]
+        self.assertEqual(models[1]["dbtvault_arguments"]["src_ldts"], "LOADED_DATETIME")
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self.tmp_dir.name) / "renders"
+        self.render_cache = cache.RenderCache(self.cache_dir, max_bytes=80)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _entries(self):
+        return sorted(item.stem for item in self.cache_dir.rglob("*.sql"))
+
+    def test_render_cache_round_trip(self):
+        self.assertIsNone(self.render_cache.get("ab" * 32))
+        self.render_cache.put("ab" * 32, "select 1")
+        self.assertEqual(self.render_cache.get("ab" * 32), "select 1")
+        # Written whole, so nothing is left behind by the write
+        self.assertEqual(list(self.cache_dir.rglob("*.tmp")), [])
+
+    def test_render_fingerprint(self):
+        # Keys follow the rendering code, not just the version it was installed as
+        first = cache.render_fingerprint()
+        try:
+            cache.render_fingerprint.cache_clear()
+            with mock.patch.object(cache, "RENDER_MODULES", cache.RENDER_MODULES[:1]):
+                self.assertNotEqual(cache.render_fingerprint(), first)
+        finally:
+            cache.render_fingerprint.cache_clear()
+        self.assertEqual(cache.render_fingerprint(), first)
+
+    def test_render_cache_prune(self):
+        for index, key in enumerate(["aa", "bb", "cc"]):
+            self.render_cache.put(key * 32, "x" * 40)
+            entry = self.cache_dir / key / f"{key * 32}.sql"
+            os.utime(entry, (1000 + index, 1000 + index))
+        # A hit on the oldest entry refreshes it, so it's kept over the next oldest
+        self.assertEqual(self.render_cache.get("aa" * 32), "x" * 40)
+        self.assertEqual(self.render_cache.prune(), 2)
+        self.assertEqual(self._entries(), ["aa" * 32])
+
+        # Under the limit, the store isn't walked at all
+        with mock.patch.object(os, "scandir") as scandir:
+            self.assertEqual(self.render_cache.prune(), 0)
+            scandir.assert_not_called()
+
+
+class TestIncludes(unittest.TestCase):
+    def setUp(self):
+        file_io.clear_include_cache()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        (self.root / "shared.yml").write_text("version: 2\npayload:\n  - A\n  - B\n")
+
+    def tearDown(self):
+        file_io.clear_include_cache()
+        self.tmp_dir.cleanup()
+
+    def test_include_memoised_copies(self):
+        (self.root / "main.yml").write_text(
+            "first: !include shared.yml\nsecond: !include shared.yml\n"
+        )
+        data = file_io.read_yml_file(self.root / "main.yml", TypeError, "unreadable")
+        self.assertEqual(data["first"], {"payload": ["A", "B"]})
+        self.assertIn((self.root / "shared.yml").resolve(), file_io._include_cache)
+
+        # Mutating one copy must not leak into the other, or into later reads
+        data["first"]["payload"].append("C")
+        self.assertEqual(data["second"], {"payload": ["A", "B"]})
+        again = file_io.read_yml_file(self.root / "main.yml", TypeError, "unreadable")
+        self.assertEqual(again["first"], {"payload": ["A", "B"]})
+
+    def test_include_nested_edit(self):
+        (self.root / "outer.yml").write_text("version: 2\ninner: !include shared.yml\n")
+        (self.root / "main.yml").write_text("start: !include outer.yml\n")
+        file_io.read_yml_file(self.root / "main.yml", TypeError, "unreadable")
+
+        # Editing the innermost file must invalidate the memo of the file including it
+        (self.root / "shared.yml").write_text("version: 2\npayload:\n  - C\n")
+        data = file_io.read_yml_file(self.root / "main.yml", TypeError, "unreadable")
+        self.assertEqual(data["start"], {"inner": {"payload": ["C"]}})
+
+    def test_include_cycle(self):
+        (self.root / "a.yml").write_text("version: 2\nnext: !include b.yml\n")
+        (self.root / "b.yml").write_text("version: 2\nnext: !include a.yml\n")
+        (self.root / "main.yml").write_text("start: !include a.yml\n")
+        with self.assertRaises(exceptions.IncludeCycleError) as ctx:
+            file_io.read_yml_file(self.root / "main.yml", TypeError, "unreadable")
+        chain = str(ctx.exception).split(": ", 1)[1].split(" -> ")
+        self.assertEqual(
+            [Path(item).name for item in chain],
+            ["main.yml", "a.yml", "b.yml", "a.yml"],
+        )
+
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        for folder in [
+            "models",
+            "models/vault",
+            "models/vault/hubs",
+            "models/scratch",
+            "models/vault/logs",
+            "models/target",
+            "dbt_packages/dbtvault/models",
+            "target/compiled",
+            ".venv/lib/site-packages/dbtvault",
+            "venv/lib",
+            ".tox/py39",
+            "models/node_modules/pkg",
+        ]:
+            (self.root / folder).mkdir(parents=True)
+            (self.root / folder / literals.DBTVG_YAML_NAME).touch()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_walk_files(self):
+        found = search.walk_files(
+            [self.root / "models", self.root / "models/vault", self.root / "missing"],
+            literals.DBTVG_YAML_NAME,
+            literals.DEFAULT_IGNORE_DIRS + ["scr*"],
+        )
+        # Results are streamed rather than collected up front
+        self.assertFalse(isinstance(found, list))
+        folders = [item.parent.relative_to(self.root).as_posix() for item in found]
+        self.assertEqual(
+            folders,
+            [
+                "models",
+                "models/target",
+                "models/vault",
+                "models/vault/hubs",
+                "models/vault/logs",
+            ],
+        )
+
+    def test_walk_files_prunes_project_dirs(self):
+        config_reader = readers.ConfigReader(file_io.read_yml_file)
+        found = config_reader.find_dbtvg_configs(self.root, ["."], ["target"])
+        folders = {item.parent.relative_to(self.root).as_posix() for item in found}
+        # Only dbt's own folders at the root are pruned, not model folders named alike
+        self.assertEqual(
+            folders,
+            {
+                "models",
+                "models/vault",
+                "models/vault/hubs",
+                "models/vault/logs",
+                "models/scratch",
+                "models/target",
+            },
+        )
+
+    def test_walk_files_prunes_environments(self):
+        config_reader = readers.ConfigReader(file_io.read_yml_file)
+        found = list(config_reader.find_dbtvg_configs(self.root, ["."], ["target"]))
+        pruned = {".venv", "venv", ".tox", "node_modules"}
+        self.assertTrue(len(found) > 0)
+        for item in found:
+            self.assertFalse(pruned & set(item.relative_to(self.root).parts))
+
+
+class TestWriters(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filepath = Path(self.tmp_dir.name) / "model.sql"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_write_text_if_changed(self):
+        self.assertTrue(file_io.write_text(self.filepath, "select 1"))
+        os.utime(self.filepath, ns=(0, 0))
+        os.chmod(self.filepath, 0o640)
+
+        # Same content leaves the file, and so its mtime, alone
+        self.assertFalse(file_io.write_text(self.filepath, "select 1"))
+        self.assertEqual(self.filepath.stat().st_mtime_ns, 0)
+
+        # Same size but different bytes still gets written, keeping the mode
+        self.assertTrue(file_io.write_text(self.filepath, "select 2"))
+        self.assertEqual(self.filepath.read_text(), "select 2")
+        self.assertNotEqual(self.filepath.stat().st_mtime_ns, 0)
+        self.assertEqual(self.filepath.stat().st_mode & 0o777, 0o640)
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["model.sql"])
+
+    def test_write_text_new_file_mode(self):
+        # A new file gets what a plain open() gives it, umask and all
+        plain = Path(self.tmp_dir.name) / "plain.sql"
+        plain.write_text("select 1")
+        self.assertTrue(file_io.write_text(self.filepath, "select 1"))
+        self.assertEqual(self.filepath.stat().st_mode, plain.stat().st_mode)
+
+    def test_write_yaml_file_if_changed(self):
+        filepath = self.filepath.with_suffix(".yml")
+        data = {"version": 2, "models": [{"name": "hub_customer"}]}
+        self.assertTrue(file_io.write_yaml_file(filepath, data))
+        self.assertFalse(file_io.write_yaml_file(filepath, data))
+        self.assertEqual(file_io.read_yml_file(filepath, TypeError, ""), data)
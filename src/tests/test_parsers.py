@@ -2,7 +2,7 @@ import unittest
 from pathlib import Path
 
 from dbtvault_generator.constants import exceptions, types
-from dbtvault_generator.parsers import params
+from dbtvault_generator.parsers import columns, params, relationships, schemas
 
 TEST_ROOT = Path(__file__).parent
 
@@ -28,3 +28,230 @@ class TestParser(unittest.TestCase):
         )
         with self.assertRaises(exceptions.ProjectNotConfiguredError):
             params.get_dbt_project_config(data_path / "broken_project", None)
+
+
+def _model(name: str, model_type: types.DBTVaultModel, **arguments):
+    return (
+        name,
+        params.model_param_factory(
+            model_type,
+            {
+                "name": name,
+                "model_type": model_type,
+                "location": ".",
+                "dbtvault_arguments": {
+                    "src_extra_columns": None,
+                    "src_ldts": "LOAD_DATETIME",
+                    "src_source": "RECORD_SOURCE",
+                    "source_model": "stg_source",
+                    **arguments,
+                },
+            },
+        ),
+    )
+
+
+class TestRelationshipIndex(unittest.TestCase):
+    def setUp(self):
+        self.models = [
+            _model("hub_customer", "hub", src_pk="CUSTOMER_HK", src_nk="CUSTOMER_ID"),
+            _model("hub_order", "hub", src_pk="ORDER_HK", src_nk="ORDER_ID"),
+            _model(
+                "hub_product",
+                "hub",
+                src_pk=["PRODUCT_ID", "VARIANT_ID"],
+                src_nk="PRODUCT_CODE",
+            ),
+            _model(
+                "lnk_customer_order",
+                "link",
+                src_pk="CUSTOMER_ORDER_HK",
+                src_fk=["CUSTOMER_HK", "ORDER_HK"],
+            ),
+            _model(
+                "lnk_order_product",
+                "link",
+                src_pk="ORDER_PRODUCT_HK",
+                src_fk=["ORDER_HK", "PRODUCT_ID", "VARIANT_ID"],
+            ),
+            _model(
+                "lnk_order_variant",
+                "link",
+                src_pk="ORDER_VARIANT_HK",
+                src_fk=["ORDER_HK", "VARIANT_ID"],
+            ),
+        ]
+        self.index = relationships.RelationshipIndex(self.models)
+
+    def test_every_foreign_key_is_kept(self):
+        self.assertDictEqual(
+            self.index.foreign_keys["lnk_customer_order"],
+            {"CUSTOMER_HK": "hub_customer", "ORDER_HK": "hub_order"},
+        )
+
+    def test_composite_keys(self):
+        self.assertDictEqual(
+            self.index.foreign_keys["lnk_order_product"],
+            {
+                "ORDER_HK": "hub_order",
+                "PRODUCT_ID": "hub_product",
+                "VARIANT_ID": "hub_product",
+            },
+        )
+        # Part of a composite key isn't enough to point at its owner
+        self.assertDictEqual(
+            self.index.foreign_keys["lnk_order_variant"], {"ORDER_HK": "hub_order"}
+        )
+
+    def test_build_schema_entry(self):
+        catalog_model = types.CatalogModel(
+            name="hub_product",
+            columns={
+                name: types.CatalogModelColumn(name=name, dtype="VARCHAR")
+                for name in ["PRODUCT_ID", "VARIANT_ID", "PRODUCT_CODE"]
+            },
+        )
+        entry = self.index.build_schema_entry("hub_product", catalog_model)
+        tests = [item.get("tests") for item in entry["columns"]]
+        self.assertEqual(tests, [["not_null"], ["not_null"], None])
+
+
+class TestColumnInference(unittest.TestCase):
+    def setUp(self):
+        self.models = [
+            (
+                "stg_customer",
+                params.model_param_factory(
+                    "stage",
+                    {
+                        "name": "customer",
+                        "model_type": "stage",
+                        "location": ".",
+                        "dbtvault_arguments": {
+                            "source_model": "stg_customer_raw",
+                            "derived_columns": {"RECORD_SOURCE": "!CRM"},
+                            "null_columns": {"required": "CUSTOMER_ID"},
+                            "hashed_columns": {"CUSTOMER_HK": "CUSTOMER_ID"},
+                        },
+                    },
+                ),
+            ),
+            (
+                "stg_customer_raw",
+                params.model_param_factory(
+                    "stage",
+                    {
+                        "name": "customer_raw",
+                        "model_type": "stage",
+                        "location": ".",
+                        "dbtvault_arguments": {
+                            "source_model": {"raw": "customer"},
+                            "derived_columns": {"CUSTOMER_ID": "ID"},
+                        },
+                    },
+                ),
+            ),
+            _model("hub_customer", "hub", src_pk="CUSTOMER_HK", src_nk="CUSTOMER_ID"),
+        ]
+        self.inference = columns.ColumnInference(self.models)
+
+    def test_stage_chain(self):
+        self.assertEqual(
+            self.inference.columns("stg_customer"),
+            ["CUSTOMER_ID", "RECORD_SOURCE", "CUSTOMER_ID_ORIGINAL", "CUSTOMER_HK"],
+        )
+
+    def test_catalog_enrichment(self):
+        catalog_model = types.CatalogModel(
+            name="hub_customer",
+            columns={
+                name: types.CatalogModelColumn(name=name, dtype="TEXT")
+                for name in ["customer_id", "customer_hk", "extra"]
+            },
+        )
+        model = self.inference.build_catalog_model("hub_customer", catalog_model)
+        self.assertEqual(
+            [(item.name, item.dtype) for item in model.columns.values()],
+            [
+                ("customer_hk", "TEXT"),
+                ("customer_id", "TEXT"),
+                ("LOAD_DATETIME", None),
+                ("RECORD_SOURCE", None),
+                ("extra", "TEXT"),
+            ],
+        )
+
+
+class TestSchemaMerge(unittest.TestCase):
+    def setUp(self):
+        self.existing: types.Mapping = {
+            "version": 2,
+            "models": [
+                {
+                    "name": "hub_customer",
+                    "description": "Every customer we know of",
+                    "columns": [
+                        {
+                            "name": "CUSTOMER_HK",
+                            "description": "Hashed id",
+                            "tests": ["not_null", {"accepted_values": {"values": []}}],
+                        },
+                        {"name": "NOTES", "description": "Added by hand"},
+                    ],
+                },
+                {"name": "hand_written", "description": "Not generated"},
+            ],
+        }
+
+    def test_merge_keeps_existing(self):
+        generated = {
+            "version": 2,
+            "models": [
+                {
+                    "name": "hub_customer",
+                    "description": "",
+                    "columns": [
+                        {
+                            "name": "CUSTOMER_HK",
+                            "description": "",
+                            "tests": ["not_null", "unique"],
+                        },
+                        {"name": "LOAD_DATETIME", "description": ""},
+                    ],
+                },
+                {"name": "sat_customer", "description": ""},
+            ],
+        }
+        merged = schemas.merge_schema(generated, self.existing)
+        self.assertEqual(
+            [item["name"] for item in merged["models"]],
+            ["hub_customer", "hand_written", "sat_customer"],
+        )
+        hub = merged["models"][0]
+        self.assertEqual(hub["description"], "Every customer we know of")
+        self.assertEqual(
+            [item["name"] for item in hub["columns"]],
+            ["CUSTOMER_HK", "NOTES", "LOAD_DATETIME"],
+        )
+        self.assertEqual(hub["columns"][0]["description"], "Hashed id")
+        # Tests are added to, never replaced
+        self.assertEqual(
+            hub["columns"][0]["tests"],
+            ["not_null", {"accepted_values": {"values": []}}, "unique"],
+        )
+        # The existing document itself is left alone
+        self.assertEqual(len(self.existing["models"][0]["columns"]), 2)
+
+    def test_merge_unchanged(self):
+        generated = {
+            "version": 2,
+            "models": [
+                {
+                    "name": "hub_customer",
+                    "description": "",
+                    "columns": [{"name": "CUSTOMER_HK", "tests": ["not_null"]}],
+                }
+            ],
+        }
+        self.assertIs(schemas.merge_schema(generated, self.existing), self.existing)
+        self.assertIs(schemas.merge_schema(generated, None), generated)
@@ -1,5 +1,378 @@
+import json
+import shutil
+import tempfile
 import unittest
+import warnings
+from pathlib import Path
+from typing import Dict, List, Optional
+from unittest import mock
+
+from dbtvault_generator.constants import exceptions, literals, types
+from dbtvault_generator.files import cache, file_io
+from dbtvault_generator.generator import (
+    profiling,
+    readers,
+    runners,
+    state,
+    subprocess,
+)
+from dbtvault_generator.parsers import params
+
+TEST_ROOT = Path(__file__).parent
+project_source = TEST_ROOT / "data/projects/vault_project"
+artifact_path = TEST_ROOT / "data/artifacts"
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.written: List[Path] = []
+
+    def __call__(self, filepath: Path, payload: str):
+        self.written.append(filepath)
+        return file_io.write_text(filepath, payload)
+
+
+class FailingWriter(RecordingWriter):
+    def __call__(self, filepath: Path, payload: str):
+        if filepath.name.startswith("hub_"):
+            raise PermissionError("read only")
+        super().__call__(filepath, payload)
+
+
+class RecordingHook(profiling.ProfileHook):
+    def __init__(self):
+        self.events: List[str] = []
+
+    def span_started(self, span: profiling.Span):
+        self.events.append(f"start {span.path}")
+
+    def span_finished(self, span: profiling.Span):
+        self.events.append(f"finish {span.path}")
+
+
+def _read_outputs(project_dir: Path) -> Dict[str, bytes]:
+    return {
+        str(item.relative_to(project_dir)): item.read_bytes()
+        for item in project_dir.rglob(f"*.{literals.SQL_FILE_EXT}")
+    }
 
 
 class TestRunners(unittest.TestCase):
-    pass
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.project_dir = Path(self.tmp_dir.name) / "project"
+        shutil.copytree(project_source, self.project_dir)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _sql_generator(
+        self, writer: types.StringWriterFunction, incremental: bool = False
+    ):
+        config_file_reader = readers.ConfigReader(file_io.read_yml_file)
+        return runners.SqlGenerator(
+            params.get_dbt_project_config,
+            config_file_reader.readin_dbtvg_configs,
+            writer,
+            state.BuildState() if incremental else None,
+        )
+
+    def test_sql_generator(self):
+        writer = RecordingWriter()
+        self._sql_generator(writer).run(self.project_dir)
+        names = sorted(item.name for item in writer.written)
+        self.assertEqual(
+            names,
+            ["hub_customer.sql", "sat_customer_details.sql", "stg_customer_crm.sql"],
+        )
+
+    def test_sql_generator_incremental(self):
+        writer = RecordingWriter()
+        self._sql_generator(writer, True).run(self.project_dir, True)
+        self.assertEqual(len(writer.written), 3)
+        state_file = self.project_dir / "target" / literals.DBTVG_STATE_NAME
+        self.assertTrue(state_file.is_file())
+
+        # Nothing changed, so nothing should be rendered
+        writer = RecordingWriter()
+        self._sql_generator(writer, True).run(self.project_dir, True)
+        self.assertEqual(writer.written, [])
+
+        # Editing an included fragment only rebuilds the file that includes it
+        fragment = self.project_dir / "models/raw_vault/fragments/customer_details.yml"
+        fragment.write_text(fragment.read_text().replace("LOAD_DATETIME", "LDTS"))
+        writer = RecordingWriter()
+        self._sql_generator(writer, True).run(self.project_dir, True)
+        names = sorted(item.name for item in writer.written)
+        self.assertEqual(names, ["hub_customer.sql", "sat_customer_details.sql"])
+
+        # Removing generated output forces it to be rebuilt
+        (self.project_dir / "models/staging/stg_customer_crm.sql").unlink()
+        writer = RecordingWriter()
+        self._sql_generator(writer, True).run(self.project_dir, True)
+        self.assertEqual(
+            [item.name for item in writer.written], ["stg_customer_crm.sql"]
+        )
+
+        # Changing the root config rebuilds everything
+        root_config = self.project_dir / literals.DBTVG_YAML_NAME
+        root_config.write_text(root_config.read_text() + "    target_path: ''\n")
+        writer = RecordingWriter()
+        self._sql_generator(writer, True).run(self.project_dir, True)
+        self.assertEqual(len(writer.written), 3)
+
+    def test_sql_generator_incremental_inherits(self):
+        self._sql_generator(RecordingWriter(), True).run(self.project_dir, True)
+
+        # A new file above both model folders changes the defaults of each
+        parent_config = self.project_dir / "models" / literals.DBTVG_YAML_NAME
+        file_io.write_yaml_file(
+            parent_config,
+            {"dbtvault": {"defaults": {"custom_macros": {"hub": "custom_hub"}}}},
+        )
+        writer = RecordingWriter()
+        self._sql_generator(writer, True).run(self.project_dir, True)
+        self.assertEqual(len(writer.written), 3)
+        hub_sql = self.project_dir / "models/raw_vault/hub_customer.sql"
+        self.assertIn("custom_hub(", hub_sql.read_text())
+
+        writer = RecordingWriter()
+        self._sql_generator(writer, True).run(self.project_dir, True)
+        self.assertEqual(writer.written, [])
+
+    def test_sql_generator_parallel(self):
+        serial_dir = Path(self.tmp_dir.name) / "serial"
+        shutil.copytree(project_source, serial_dir)
+        writer = RecordingWriter()
+        self._sql_generator(writer).run(serial_dir)
+        self._sql_generator(file_io.write_text).run(self.project_dir, jobs=2)
+
+        serial, parallel = _read_outputs(serial_dir), _read_outputs(self.project_dir)
+        self.assertEqual(len(parallel), 3)
+        self.assertDictEqual(serial, parallel)
+
+    def test_sql_generator_render_cache(self):
+        render_cache = cache.RenderCache(Path(self.tmp_dir.name) / "renders")
+
+        def run(project_dir: Path, jobs: int = 1) -> None:
+            config_file_reader = readers.ConfigReader(file_io.read_yml_file)
+            runners.SqlGenerator(
+                params.get_dbt_project_config,
+                config_file_reader.readin_dbtvg_configs,
+                file_io.write_text,
+                None,
+                None,
+                None,
+                render_cache,
+            ).run(project_dir, overwrite=True, jobs=jobs)
+
+        run(self.project_dir, jobs=2)
+        entries = list(render_cache.cache_dir.rglob("*.sql"))
+        self.assertEqual(len(entries), 3)
+
+        # Another checkout of the same project renders nothing itself
+        other_dir = Path(self.tmp_dir.name) / "other"
+        shutil.copytree(project_source, other_dir)
+        with mock.patch.object(runners, "render_sql") as render_sql:
+            run(other_dir)
+            render_sql.assert_not_called()
+        self.assertDictEqual(_read_outputs(self.project_dir), _read_outputs(other_dir))
+
+        # A changed model is a new entry, rather than a stale hit
+        fragment = other_dir / "models/raw_vault/fragments/customer_details.yml"
+        fragment.write_text(fragment.read_text().replace("LOAD_DATETIME", "LDTS"))
+        run(other_dir)
+        self.assertEqual(len(list(render_cache.cache_dir.rglob("*.sql"))), 4)
+        sat_sql = other_dir / "models/raw_vault/sat_customer_details.sql"
+        self.assertIn("LDTS", sat_sql.read_text())
+
+    def test_sql_generator_reports_all_failures(self):
+        writer = FailingWriter()
+        with self.assertRaises(exceptions.ModelGenerationError) as ctx:
+            self._sql_generator(writer).run(self.project_dir)
+        self.assertIn("customer (./models/raw_vault)", str(ctx.exception))
+        # The failure should not stop the other models from generating
+        self.assertEqual(len(writer.written), 2)
+
+    def test_load_hooks(self):
+        # Runs against the real entry points, whichever shape this Python returns
+        self.assertIsInstance(profiling.load_hooks(), list)
+
+        entry_point = mock.Mock()
+        entry_point.load.return_value = RecordingHook
+        group = literals.PROFILE_HOOK_ENTRY_POINT
+        # Python 3.9 returns a dict of groups rather than something to select from
+        with mock.patch.object(
+            profiling.metadata, "entry_points", return_value={group: [entry_point]}
+        ):
+            hooks = profiling.load_hooks()
+        self.assertEqual([type(item) for item in hooks], [RecordingHook])
+
+    def test_sql_generator_profile(self):
+        hook = RecordingHook()
+        profiler = profiling.Profiler([hook])
+        config_file_reader = readers.ConfigReader(file_io.read_yml_file, None, profiler)
+        runners.SqlGenerator(
+            params.get_dbt_project_config,
+            config_file_reader.readin_dbtvg_configs,
+            file_io.write_text,
+            None,
+            profiler,
+        ).run(self.project_dir)
+
+        summary = profiler.summary()
+        paths = [item["path"] for item in summary["spans"]]
+        self.assertEqual(
+            paths[:3], ["sql", "sql/read_configs", "sql/read_configs/parse"]
+        )
+        self.assertIn("sql/process_configs/validate", paths)
+        self.assertEqual(summary["counters"]["files_scanned"], 3)
+        self.assertEqual(summary["counters"]["models_validated"], 3)
+        self.assertEqual(summary["counters"]["files_written"], 3)
+        self.assertEqual(hook.events[0], "start sql")
+        self.assertEqual(hook.events[-1], "finish sql")
+
+        # Regenerating unchanged models leaves every file alone
+        profiler = profiling.Profiler()
+        runners.SqlGenerator(
+            params.get_dbt_project_config,
+            config_file_reader.readin_dbtvg_configs,
+            file_io.write_text,
+            None,
+            profiler,
+        ).run(self.project_dir, overwrite=True)
+        self.assertEqual(profiler.counters["files_skipped"], 3)
+        self.assertNotIn("files_written", profiler.counters)
+
+    def _docs_generator(
+        self, catalog: bool = True, docs_state: Optional[state.DocsState] = None
+    ):
+        config_file_reader = readers.ConfigReader(file_io.read_yml_file)
+        schema_merge_file = readers.SchemaMerger(
+            file_io.read_yml_file, file_io.write_yaml_file
+        )
+        if catalog:
+            target_dir = self.project_dir / "target"
+            target_dir.mkdir(exist_ok=True)
+            shutil.copy(artifact_path / literals.DEFAULT_NAME_CATALOG, target_dir)
+        return runners.DocsGenerator(
+            params.get_dbt_project_config,
+            config_file_reader.readin_dbtvg_configs,
+            subprocess.run_shell_operation,
+            schema_merge_file.merge_schemas,
+            file_io.stream_catalog,
+            docs_state,
+        )
+
+    def test_docs_generator(self):
+        self._docs_generator().run(self.project_dir, args="{model_names: [customer]}")
+        schema_file = self.project_dir / "models/raw_vault/schema.yml"
+        schema = file_io.read_yml_file(schema_file, TypeError, "missing schema")
+        self.assertEqual([item["name"] for item in schema["models"]], ["hub_customer"])
+        self.assertFalse((self.project_dir / "models/staging/schema.yml").is_file())
+
+    def test_docs_generator_merges(self):
+        generator = self._docs_generator()
+        generator.run(self.project_dir)
+        schema_file = self.project_dir / "models/raw_vault/schema.yml"
+        schema = file_io.read_yml_file(schema_file, TypeError, "missing schema")
+        schema["models"][0]["description"] = "Written by hand"
+        schema["models"][0]["columns"][0]["tests"].append("custom_test")
+        file_io.write_yaml_file(schema_file, schema)
+        edited = schema_file.read_text()
+
+        # Generated models are already there, so the file is left as it is
+        profiler = profiling.Profiler()
+        generator.profiler = profiler
+        generator.run(self.project_dir)
+        self.assertEqual(schema_file.read_text(), edited)
+        self.assertEqual(profiler.counters["files_skipped"], 2)
+
+    def test_docs_generator_without_catalog(self):
+        with self.assertWarns(UserWarning):
+            self._docs_generator(catalog=False).run(self.project_dir)
+        schema_file = self.project_dir / "models/raw_vault/schema.yml"
+        schema = file_io.read_yml_file(schema_file, TypeError, "missing schema")
+        sat = next(
+            item for item in schema["models"] if item["name"] == "sat_customer_details"
+        )
+        self.assertEqual(
+            [item["name"] for item in sat["columns"]],
+            [
+                "CUSTOMER_HK",
+                "CUSTOMER_HASHDIFF",
+                "CUSTOMER_NAME",
+                "CUSTOMER_EMAIL",
+                "LOAD_DATETIME",
+                "RECORD_SOURCE",
+            ],
+        )
+        self.assertNotIn("data_type", sat["columns"][0])
+        # The foreign key back to the hub doesn't need the warehouse either
+        self.assertIn("tests", sat["columns"][0])
+
+    def test_docs_generator_from_dbt(self):
+        requested: List[List[str]] = []
+
+        def docgen_catalog(names: List[str]) -> types.DbtCatalog:
+            requested.append(names)
+            column = types.CatalogModelColumn(name="CUSTOMER_NAME", dtype="VARCHAR")
+            model = types.CatalogModel(
+                name="sat_customer_details", columns={"CUSTOMER_NAME": column}
+            )
+            return types.DbtCatalog(models={model.name: model})
+
+        generator = self._docs_generator(catalog=False)
+        generator.docgen_catalog_fn = docgen_catalog
+        with warnings.catch_warnings():
+            # dbt stands in for the missing catalog, so there's nothing to warn about
+            warnings.simplefilter("error", UserWarning)
+            generator.run(self.project_dir)
+        self.assertEqual(
+            sorted(requested[0]),
+            ["hub_customer", "sat_customer_details", "stg_customer_crm"],
+        )
+        schema_file = self.project_dir / "models/raw_vault/schema.yml"
+        schema = file_io.read_yml_file(schema_file, TypeError, "missing schema")
+        sat = next(
+            item for item in schema["models"] if item["name"] == "sat_customer_details"
+        )
+        column = next(
+            item for item in sat["columns"] if item["name"] == "CUSTOMER_NAME"
+        )
+        self.assertEqual(column["data_type"], "VARCHAR")
+
+    def test_docs_generator_state(self):
+        state_dir = Path(self.tmp_dir.name) / "state"
+        state_dir.mkdir()
+        for name in [literals.DEFAULT_NAME_MANIFEST, literals.DEFAULT_NAME_CATALOG]:
+            shutil.copy(artifact_path / name, state_dir)
+        docs_state = state.DocsState(
+            state_dir, file_io.load_manifest, file_io.stream_catalog
+        )
+        generator = self._docs_generator(docs_state=docs_state)
+        target_dir = self.project_dir / "target"
+        shutil.copy(artifact_path / literals.DEFAULT_NAME_MANIFEST, target_dir)
+
+        # Nothing changed since the state run, so there's nothing to document
+        generator.run(self.project_dir)
+        self.assertEqual(list(self.project_dir.rglob("schema.yml")), [])
+
+        # Rebuilding one model only documents that model
+        manifest_path = target_dir / literals.DEFAULT_NAME_MANIFEST
+        manifest = json.loads(manifest_path.read_text())
+        manifest["nodes"]["model.vault_project.hub_customer"]["checksum"][
+            "checksum"
+        ] = "1"
+        manifest_path.write_text(json.dumps(manifest))
+        generator.run(self.project_dir)
+        schema_file = self.project_dir / "models/raw_vault/schema.yml"
+        schema = file_io.read_yml_file(schema_file, TypeError, "missing schema")
+        self.assertEqual([item["name"] for item in schema["models"]], ["hub_customer"])
+        self.assertFalse((self.project_dir / "models/staging/schema.yml").is_file())
+
+        # Without a current manifest there's nothing to compare, so document it all
+        manifest_path.unlink()
+        with self.assertWarns(UserWarning):
+            generator.run(self.project_dir)
+        self.assertTrue((self.project_dir / "models/staging/schema.yml").is_file())
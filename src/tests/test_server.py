@@ -0,0 +1,157 @@
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+from dbtvault_generator.constants import exceptions
+from dbtvault_generator.files import file_io
+from dbtvault_generator.generator import readers, server, workspace
+from dbtvault_generator.parsers import params
+
+TEST_ROOT = Path(__file__).parent
+project_source = TEST_ROOT / "data/projects/vault_project"
+
+NEW_HUB = """
+name: order
+model_type: hub
+dbtvault_arguments:
+  src_pk: ORDER_HK
+  src_nk: ORDER_ID
+  src_extra_columns: null
+  src_ldts: LOAD_DATETIME
+  src_source: RECORD_SOURCE
+  source_model: stg_order
+"""
+
+
+class TestProjectService(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.project_dir = Path(self.tmp_dir.name).resolve() / "project"
+        shutil.copytree(project_source, self.project_dir)
+        self.service = server.ProjectService(
+            workspace.Workspace(
+                params.get_dbt_project_config,
+                readers.ConfigReader(file_io.read_yml_file),
+                file_io.read_yml_file_with_dependencies,
+            ),
+            file_io.write_text,
+        )
+        self.service.load(self.project_dir)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_render(self):
+        sql = self.service.dispatch("render", {"name": "hub_customer"})
+        self.assertIn("dbtvault.hub", sql)
+        # Unprefixed names find the same model
+        self.assertEqual(self.service.dispatch("render", {"name": "customer"}), sql)
+        with self.assertRaises(server.RpcError):
+            self.service.dispatch("render", {"name": "missing"})
+
+    def test_validate(self):
+        result = self.service.dispatch(
+            "validate", {"text": NEW_HUB, "location": "./models/raw_vault"}
+        )
+        self.assertEqual(result, {"valid": True, "errors": [], "models": ["hub_order"]})
+
+        broken = NEW_HUB.replace("model_type: hub", "model_type: hob")
+        result = self.service.dispatch("validate", {"text": broken})
+        self.assertFalse(result["valid"])
+
+        # Names taken elsewhere in the project are caught too
+        duplicate = NEW_HUB.replace("name: order", "name: customer_crm")
+        result = self.service.dispatch("validate", {"text": duplicate})
+        self.assertIn("Duplicate model name customer_crm", result["errors"][0])
+
+    def test_relationships(self):
+        result = self.service.dispatch("relationships", {"name": "customer"})
+        self.assertEqual(result["key_columns"], ["CUSTOMER_HK"])
+        self.assertEqual(result["referenced_by"], ["sat_customer_details"])
+        result = self.service.dispatch("relationships", {"name": "customer_details"})
+        self.assertEqual(result["foreign_keys"], {"CUSTOMER_HK": "hub_customer"})
+
+    def test_regenerate_changed(self):
+        written = self.service.dispatch("regenerate", {})
+        self.assertEqual(len(written), 3)
+        self.assertEqual(self.service.dispatch("regenerate", {}), [])
+
+        # Only the satellite changes, so only it is rendered again
+        fragment = self.project_dir / "models/raw_vault/fragments/customer_details.yml"
+        before = self.service.dispatch("render", {"name": "sat_customer_details"})
+        fragment.write_text(fragment.read_text().replace("LOAD_DATETIME", "LDTS"))
+        self.service.apply_changes({fragment})
+        after = self.service.dispatch("render", {"name": "sat_customer_details"})
+        self.assertNotEqual(before, after)
+        # Skipped as its file exists, so it's still waiting to be written
+        self.service.dispatch("regenerate", {})
+        sat_sql = self.project_dir / "models/raw_vault/sat_customer_details.sql"
+        self.assertNotIn("LDTS", sat_sql.read_text())
+        written = self.service.dispatch("regenerate", {"overwrite": True})
+        self.assertEqual(
+            sorted(Path(item).name for item in written),
+            ["hub_customer.sql", "sat_customer_details.sql"],
+        )
+        self.assertIn("LDTS", sat_sql.read_text())
+        self.assertEqual(self.service.dispatch("regenerate", {}), [])
+
+    def test_socket(self):
+        address = str(Path(self.tmp_dir.name) / "dbtvg.sock")
+        with server.create_server(self.service, address) as listener:
+            thread = threading.Thread(target=listener.serve_forever, daemon=True)
+            thread.start()
+            try:
+                models = server.call(address, "models")
+                self.assertEqual(len(models), 3)
+                start = time.perf_counter()
+                for _ in range(20):
+                    server.call(address, "render", name="hub_customer")
+                # Warm requests shouldn't need anything close to a fresh parse
+                self.assertLess((time.perf_counter() - start) / 20, 0.01)
+                with self.assertRaises(server.RpcError) as ctx:
+                    server.call(address, "explode")
+                self.assertEqual(ctx.exception.code, server.METHOD_NOT_FOUND)
+            finally:
+                listener.shutdown()
+
+    def test_socket_in_use(self):
+        address = str(Path(self.tmp_dir.name) / "dbtvg.sock")
+        regular = Path(self.tmp_dir.name) / "notes.txt"
+        regular.write_text("keep me")
+        with self.assertRaises(exceptions.SocketInUseError):
+            server.create_server(self.service, str(regular))
+        self.assertEqual(regular.read_text(), "keep me")
+
+        with server.create_server(self.service, address):
+            # A second server mustn't take the socket from under a live one
+            with self.assertRaises(exceptions.SocketInUseError):
+                server.create_server(self.service, address)
+        # Once nothing listens, the leftover socket is cleared for the next server
+        with server.create_server(self.service, address):
+            pass
+
+    def test_handle_request_errors(self):
+        response: Any = server.handle_request(self.service, b"{not json")
+        self.assertEqual(response["error"]["code"], server.PARSE_ERROR)
+        request = b'{"jsonrpc": "2.0", "id": 3, "method": "render", "params": {}}'
+        response = server.handle_request(self.service, request)
+        self.assertEqual(response["id"], 3)
+        self.assertEqual(response["error"]["code"], server.INVALID_PARAMS)
+        # Notifications are answered with silence
+        request = b'{"jsonrpc": "2.0", "method": "models"}'
+        self.assertIsNone(server.handle_request(self.service, request))
+
+    def test_handle_request_internal_error(self):
+        request = b'{"jsonrpc": "2.0", "id": 4, "method": "regenerate"}'
+        with mock.patch.object(
+            server.runners, "render_models", side_effect=OSError("disk full")
+        ):
+            response: Any = server.handle_request(self.service, request)
+        self.assertEqual(response["id"], 4)
+        self.assertEqual(response["error"]["code"], server.INTERNAL_ERROR)
+        self.assertIn("disk full", response["error"]["message"])
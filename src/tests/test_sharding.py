@@ -0,0 +1,152 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List, Optional, Type
+
+import yaml
+
+from dbtvault_generator.constants import exceptions, literals, types
+from dbtvault_generator.files import file_io
+from dbtvault_generator.generator import readers, runners, sharding, subprocess
+from dbtvault_generator.parsers import params
+
+TEST_ROOT = Path(__file__).parent
+project_source = TEST_ROOT / "data/projects/vault_project"
+
+
+class RecordingReader:
+    def __init__(self):
+        self.paths: List[Path] = []
+
+    def __call__(
+        self, filepath: Path, exception: Type[Exception], message: str
+    ) -> types.Mapping:
+        self.paths.append(filepath)
+        return file_io.read_yml_file(filepath, exception, message)
+
+
+class TestSharding(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.project_dir = Path(self.tmp_dir.name) / "project"
+        shutil.copytree(project_source, self.project_dir)
+        self.shards_dir = self.project_dir / "target" / literals.DBTVG_SHARDS_NAME
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _sql(
+        self, plan: Optional[sharding.ShardPlan], reader: RecordingReader
+    ) -> List[str]:
+        before = set(self.project_dir.rglob("*.sql"))
+        runners.SqlGenerator(
+            params.get_dbt_project_config,
+            readers.ConfigReader(reader).readin_dbtvg_configs,
+            file_io.write_text,
+            None,
+            None,
+            plan,
+        ).run(self.project_dir, overwrite=True)
+        return sorted(
+            item.name for item in set(self.project_dir.rglob("*.sql")) - before
+        )
+
+    def _docs(self, plan: Optional[sharding.ShardPlan]) -> None:
+        runners.DocsGenerator(
+            params.get_dbt_project_config,
+            readers.ConfigReader(file_io.read_yml_file).readin_dbtvg_configs,
+            subprocess.run_shell_operation,
+            readers.SchemaMerger(
+                file_io.read_yml_file, file_io.write_yaml_file
+            ).merge_schemas,
+            None,
+            None,
+            None,
+            plan,
+        ).run(self.project_dir, overwrite=True)
+
+    def test_assignment(self):
+        self.assertEqual(sharding.parse_shard("2/3"), (2, 3))
+        for text in ["0/3", "4/3", "1-3"]:
+            with self.assertRaises(exceptions.ArgParseError):
+                sharding.parse_shard(text)
+        names = [f"model_{i}" for i in range(300)]
+        shards = [sharding.hash_shard(name, 3) for name in names]
+        self.assertEqual(shards, [sharding.hash_shard(name, 3) for name in names])
+        self.assertEqual(set(shards), {1, 2, 3})
+        balanced = sharding.balance_shards({"a": 5.0, "b": 3.0, "c": 2.0}, 2)
+        self.assertEqual(balanced, {"a": 1, "b": 2, "c": 2})
+
+    def test_sql_shards(self):
+        full = self._sql(None, RecordingReader())
+        for item in self.project_dir.rglob("*.sql"):
+            item.unlink()
+
+        # Together the shards write every model, each exactly once
+        sharded = [
+            self._sql(sharding.ShardPlan(i, 2), RecordingReader()) for i in [1, 2]
+        ]
+        self.assertEqual(sorted(sharded[0] + sharded[1]), full)
+        self.assertEqual(len(set(sharded[0]) & set(sharded[1])), 0)
+
+        sharding.merge_shards(self.shards_dir, self.project_dir, lambda *_: True, False)
+        timings_path = self.shards_dir / literals.DBTVG_SHARD_TIMINGS_NAME
+        timings = sharding.read_timings(timings_path)
+        assert timings is not None
+        self.assertEqual(len(timings["models"]), 3)
+
+        # Balanced by the timings, a shard skips the files it has no models in
+        for item in self.project_dir.rglob("*.sql"):
+            item.unlink()
+        balanced = []
+        for index in [1, 2]:
+            reader = RecordingReader()
+            balanced.append(self._sql(sharding.ShardPlan(index, 2, timings), reader))
+            owned = [
+                name
+                for name, shard in sharding.balance_shards(timings["models"], 2).items()
+                if shard == index
+            ]
+            owned_files = {
+                key
+                for key, entry in timings["files"].items()
+                if any(name in owned for name in entry["models"])
+            }
+            self.assertEqual(len(reader.paths), len(owned_files))
+        self.assertEqual(sorted(balanced[0] + balanced[1]), full)
+
+    def test_docs_shards(self):
+        self._docs(None)
+        schemas = {
+            item: item.read_text() for item in self.project_dir.rglob("schema.yml")
+        }
+        for item in schemas:
+            item.unlink()
+
+        for index in [1, 2]:
+            self._docs(sharding.ShardPlan(index, 2))
+        # Shards leave the writing to the merge
+        self.assertEqual(list(self.project_dir.rglob("schema.yml")), [])
+        schema_merger = readers.SchemaMerger(
+            file_io.read_yml_file, file_io.write_yaml_file
+        )
+        with self.assertRaises(exceptions.ShardMergeError):
+            (self.shards_dir / "docs-2-of-2.json").rename(self.shards_dir / "x.json")
+            sharding.merge_shards(
+                self.shards_dir, self.project_dir, schema_merger.merge_schemas, True
+            )
+        (self.shards_dir / "x.json").rename(self.shards_dir / "docs-2-of-2.json")
+
+        written, skipped = sharding.merge_shards(
+            self.shards_dir, self.project_dir, schema_merger.merge_schemas, True
+        )
+        self.assertEqual((written, skipped), (len(schemas), 0))
+        for item, content in schemas.items():
+            merged = file_io.read_yml_file(item, TypeError, "missing schema")
+            expected = yaml.safe_load(content)
+            # Only the order of the models can differ from an unsharded run
+            self.assertEqual(
+                {model["name"]: model for model in merged["models"]},
+                {model["name"]: model for model in expected["models"]},
+            )
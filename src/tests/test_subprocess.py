@@ -0,0 +1,123 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from dbtvault_generator.constants import exceptions
+from dbtvault_generator.generator import subprocess
+from dbtvault_generator.parsers import fmt_string, params
+
+# Prints what dbt-codegen's generate_model_yaml would, logging included. Each call is
+# recorded, and the environment can make it hang or fail
+FAKE_DBT = """#!{python}
+import os
+import sys
+import time
+
+import yaml
+
+with open(os.environ["FAKE_DBT_CALLS"], "a") as calls:
+    calls.write(" ".join(sys.argv[1:]) + "\\n")
+if os.environ.get("FAKE_DBT_FAIL"):
+    print("12:00:00  Encountered an error")
+    sys.exit(2)
+time.sleep(float(os.environ.get("FAKE_DBT_SLEEP", "0")))
+names = yaml.safe_load(sys.argv[sys.argv.index("--args") + 1])["model_names"]
+print("12:00:00  Running with dbt=1.5.0")
+print("12:00:01  version: 2")
+print()
+print("models:")
+for name in names:
+    print(f"  - name: {{name}}")
+    print('    description: ""')
+    print("    columns:")
+    print("      - name: id")
+    print('        description: ""')
+    print()
+print("12:00:02  Done")
+"""
+
+
+@unittest.skipIf(os.name != "posix", "The fake dbt is a script with a shebang")
+class TestSubprocess(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        bin_dir = Path(self.tmp_dir.name)
+        fake_dbt = bin_dir / "dbt"
+        fake_dbt.write_text(FAKE_DBT.format(python=sys.executable))
+        fake_dbt.chmod(0o755)
+        self.calls = bin_dir / "calls.txt"
+        self.calls.touch()
+        environment = {
+            "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+            "FAKE_DBT_CALLS": str(self.calls),
+        }
+        patcher = mock.patch.dict(os.environ, environment)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_run_shell_operation(self):
+        output = subprocess.run_shell_operation(
+            params.build_exec_docgen_command([], ["customer"])
+        )
+        self.assertIn("- name: customer", output)
+        with mock.patch.dict(os.environ, {"FAKE_DBT_FAIL": "1"}):
+            with self.assertRaises(exceptions.SubprocessFailed):
+                subprocess.run_shell_operation(["dbt", "run-operation"])
+
+    def test_chunk_model_names(self):
+        names = [f"model_{i}" for i in range(100)]
+        chunks = params.chunk_model_names(["--target", "dev"], names, 300)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual([name for chunk in chunks for name in chunk], names)
+        for chunk in chunks:
+            command = params.build_exec_docgen_command(["--target", "dev"], chunk)
+            self.assertLessEqual(sum(len(item) + 1 for item in command), 300)
+        self.assertEqual(len(params.chunk_model_names([], names, 32_000)), 1)
+        with self.assertRaises(exceptions.SubprocessFailed):
+            params.chunk_model_names([], ["x" * 300], 300)
+
+    def test_run_docgen_operations(self):
+        names = [f"model_{i}" for i in range(60)]
+        entries = list(
+            subprocess.run_docgen_operations(["--target", "dev"], names, 3, limit=300)
+        )
+        self.assertEqual(sorted(item["name"] for item in entries), sorted(names))
+        self.assertEqual(entries[0]["columns"], [{"name": "id", "description": ""}])
+        # One dbt call per chunk, no more
+        calls = self.calls.read_text().splitlines()
+        self.assertEqual(
+            len(calls), len(params.chunk_model_names(["--target", "dev"], names, 300))
+        )
+        self.assertTrue(all("--target dev" in call for call in calls))
+
+    def test_load_docgen_catalog(self):
+        catalog = subprocess.load_docgen_catalog(["--target", "dev"], ["a", "b"])
+        self.assertEqual(sorted(catalog.models), ["a", "b"])
+        self.assertEqual(list(catalog.models["a"].columns), ["id"])
+        self.assertIsNone(catalog.models["a"].columns["id"].dtype)
+
+    def test_run_docgen_operations_failures(self):
+        with mock.patch.dict(os.environ, {"FAKE_DBT_SLEEP": "10"}):
+            start = time.perf_counter()
+            with self.assertRaisesRegex(exceptions.SubprocessFailed, "timed out"):
+                list(subprocess.run_docgen_operations([], ["customer"], timeout=0.5))
+            self.assertLess(time.perf_counter() - start, 5)
+        with mock.patch.dict(os.environ, {"FAKE_DBT_FAIL": "1"}):
+            with self.assertRaisesRegex(exceptions.SubprocessFailed, "Encountered"):
+                list(subprocess.run_docgen_operations([], ["customer"]))
+
+    def test_iter_generate_model_yaml(self):
+        lines = ["12:00:00  Running\n", "12:00:01  version: 2\n", "models:\n"]
+        lines += ["  - name: a\n", "    columns: []\n", "  - name: b\n"]
+        entries = fmt_string.iter_generate_model_yaml(iter(lines))
+        self.assertEqual(next(entries), {"name": "a", "columns": []})
+        self.assertEqual(list(entries), [{"name": "b"}])
+        with self.assertRaises(exceptions.SubprocessFailed):
+            list(fmt_string.iter_generate_model_yaml(["12:00:00  Oops\n"]))
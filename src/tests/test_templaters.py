@@ -1,9 +1,10 @@
 import unittest
 from pathlib import Path
-from typing import List
+from typing import Any, List
 
 from dbtvault_generator.constants import literals, types
 from dbtvault_generator.files import file_io
+from dbtvault_generator.parsers import params as model_params
 from dbtvault_generator.parsers import templaters
 
 TEST_ROOT = Path(__file__).parent
@@ -109,3 +110,45 @@ class TestDbtvaultTemplaters(unittest.TestCase):
         templater = templaters.templater_factory(model.model_type)
         self.assertFalse("none" in templater(model))
         self.assertTrue("dbtvault.bridge" in templater(model))
+
+    def test_compiled_template_arguments(self):
+        params = _search(test_models, "hub")
+        params["dbtvault_arguments"] = {
+            **params["dbtvault_arguments"],
+            "src_extra_columns": None,
+        }
+        model = types.ModelHubParams(**params)
+        template = templaters.ModelHubTemplater.template
+        expected = """{{
+dbtvault.hub(
+        src_pk=metadata_dict['src_pk'],
+        src_nk=metadata_dict['src_nk'],
+        src_extra_columns=none,
+        src_ldts=metadata_dict['src_ldts'],
+        src_source=metadata_dict['src_source'],
+        source_model=metadata_dict['source_model']
+)
+}}"""
+        self.assertEqual(
+            template.render(model.dbtvault_arguments, "dbtvault.hub"), expected
+        )
+        self.assertIn(
+            "custom_hub(",
+            template.render(model.dbtvault_arguments, "custom_hub"),
+        )
+
+    def test_render_templates(self):
+        model_types = {item["model_type"] for item in test_models}
+        models = [
+            model_params.model_param_factory(
+                model_type, _search(test_models, model_type)
+            )
+            for model_type in sorted(model_types)
+        ]
+        rendered = templaters.render_templates(models)
+        for model, output in zip(models, rendered):
+            arguments: Any = getattr(model, "dbtvault_arguments")
+            metadata = templaters.inject_yaml_metadata(arguments.dict())
+            self.assertTrue(output.startswith(f"{metadata}\n\n{{{{"))
+            self.assertIn(f"dbtvault.{model.model_type}(", output)
+        self.assertEqual(len(rendered), 10)
@@ -1,7 +1,8 @@
 import unittest
 from pathlib import Path
+from typing import Dict
 
-from dbtvault_generator.constants import exceptions, literals
+from dbtvault_generator.constants import exceptions, literals, types
 from dbtvault_generator.files import file_io
 from dbtvault_generator.parsers import params
 
@@ -42,6 +43,34 @@ class TestValidate(unittest.TestCase):
         self.assertEqual(len(output), 12)
         self.assertTrue(output[-1].options.prefixes)
 
+    def test_process_config_collection_nested_defaults(self):
+        hub = {
+            "name": "customer",
+            "model_type": "hub",
+            "dbtvault_arguments": {
+                "src_pk": "CUSTOMER_HK",
+                "src_nk": "CUSTOMER_ID",
+                "src_extra_columns": None,
+                "src_ldts": "LOAD_DATETIME",
+                "src_source": "RECORD_SOURCE",
+                "source_model": "stg_customer",
+            },
+        }
+        parent_defaults = {"custom_macros": {"hub": "parent_hub"}}
+        configs: Dict[str, types.Mapping] = {
+            ".": {literals.DBTVG_DEFAULTS_KEY: {"use_prefix": True}},
+            "./models": {literals.DBTVG_DEFAULTS_KEY: parent_defaults},
+            "./models/vault/nested": {literals.DBTVG_MODELS_KEY: [hub]},
+        }
+        output = params.process_config_collection(configs)
+        self.assertEqual(len(output), 1)
+        # Inherited from the nearest ancestor, which itself builds on the root
+        self.assertEqual(output[0].options.custom_macros, {"hub": "parent_hub"})
+        self.assertTrue(output[0].options.use_prefix)
+        self.assertEqual(output[0].options.target_path, "./models/vault/nested")
+        # Shared defaults must come out untouched
+        self.assertEqual(parent_defaults, {"custom_macros": {"hub": "parent_hub"}})
+
     def test_process_config_collection_failures(self):
         good_yml, bad_yml = (
             file_io.read_yml_file(
@@ -71,3 +100,47 @@ class TestValidate(unittest.TestCase):
                     ".": bad_yml,
                 }
             )
+
+    def test_validate_model_definitions(self):
+        hub = {
+            "name": "customer",
+            "model_type": "hub",
+            "dbtvault_arguments": {
+                "src_pk": "CUSTOMER_HK",
+                "src_nk": "CUSTOMER_ID",
+                "src_extra_columns": None,
+                "src_ldts": "LOAD_DATETIME",
+                "src_source": "RECORD_SOURCE",
+                "source_model": "stg_customer",
+            },
+        }
+        defaults = types.DBTVGConfig().dict()
+        order = {**hub, "name": "order"}
+        params.clear_validation_cache()
+        output = params.validate_model_definitions(
+            [(hub, defaults, "./a"), (order, defaults, "./b")]
+        )
+        self.assertEqual([item.name for item in output], ["customer", "order"])
+        self.assertEqual(output[1].location, "./b")
+
+        # Unchanged models come straight from the cache
+        again = params.validate_model_definitions([(order, defaults, "./b")])
+        self.assertIs(again[0], output[1])
+        moved = params.validate_model_definitions([(order, defaults, "./c")])
+        self.assertIsNot(moved[0], output[1])
+
+        # Every broken model is reported, not just the first
+        bad_type = {**hub, "name": "bad_type", "model_type": "hob"}
+        bad_args = {**hub, "name": "bad_args", "dbtvault_arguments": {}}
+        with self.assertRaises(exceptions.DBTVaultConfigInvalidError) as ctx:
+            params.validate_model_definitions(
+                [
+                    (bad_type, defaults, "."),
+                    (hub, defaults, "."),
+                    (bad_args, defaults, "."),
+                ]
+            )
+        message = str(ctx.exception)
+        self.assertIn("2 model(s) failed validation", message)
+        self.assertIn("bad_type", message)
+        self.assertIn("bad_args", message)
@@ -0,0 +1,82 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from dbtvault_generator.constants import exceptions, literals
+from dbtvault_generator.files import file_io, watch
+from dbtvault_generator.generator import readers, workspace
+from dbtvault_generator.parsers import params
+
+TEST_ROOT = Path(__file__).parent
+project_source = TEST_ROOT / "data/projects/vault_project"
+
+
+class TestWorkspace(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.project_dir = Path(self.tmp_dir.name).resolve() / "project"
+        shutil.copytree(project_source, self.project_dir)
+        self.workspace = workspace.Workspace(
+            params.get_dbt_project_config,
+            readers.ConfigReader(file_io.read_yml_file),
+            file_io.read_yml_file_with_dependencies,
+        )
+        self.models = self.workspace.load(self.project_dir)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_load(self):
+        self.assertEqual(len(self.models), 3)
+        self.assertIn(self.project_dir / "models", self.workspace.dirs)
+        fragment = self.project_dir / "models/raw_vault/fragments/customer_details.yml"
+        self.assertIn(fragment, self.workspace.watched_files)
+
+    def test_refresh_targets_changed_files(self):
+        staging = self.project_dir / "models/staging" / literals.DBTVG_YAML_NAME
+        staging.write_text(staging.read_text().replace("!CRM", "!ERP"))
+        models = self.workspace.refresh({staging})
+        self.assertEqual([item.name for item in models], ["customer_crm"])
+        # Unchanged files still pick up the root defaults
+        self.assertEqual(len(self.workspace.all_models), 3)
+
+        fragment = self.project_dir / "models/raw_vault/fragments/customer_details.yml"
+        fragment.write_text(fragment.read_text().replace("LOAD_DATETIME", "LDTS"))
+        models = self.workspace.refresh({fragment})
+        self.assertEqual(
+            sorted(item.name for item in models), ["customer", "customer_details"]
+        )
+
+    def test_refresh_new_and_removed_files(self):
+        new_dir = self.project_dir / "models/extra"
+        new_dir.mkdir()
+        new_config = new_dir / literals.DBTVG_YAML_NAME
+        shutil.copy(self.project_dir / "models/staging/dbtvault.yml", new_config)
+        new_config.write_text(new_config.read_text().replace("_crm", "_erp"))
+        models = self.workspace.refresh({self.project_dir / "models"})
+        self.assertEqual([item.name for item in models], ["customer_erp"])
+
+        shutil.rmtree(new_dir)
+        models = self.workspace.refresh({self.project_dir / "models"})
+        self.assertEqual(models, [])
+        self.assertEqual(len(self.workspace.all_models), 3)
+
+    def test_refresh_failure_keeps_state(self):
+        staging = self.project_dir / "models/staging" / literals.DBTVG_YAML_NAME
+        staging.write_text(staging.read_text().replace("customer_crm", "customer"))
+        with self.assertRaises(exceptions.DBTVaultConfigInvalidError):
+            self.workspace.refresh({staging})
+        names = sorted(item.name for item in self.workspace.all_models)
+        self.assertEqual(names, ["customer", "customer_crm", "customer_details"])
+
+
+class TestWatchers(unittest.TestCase):
+    def test_polling_watcher(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = Path(tmp_dir) / "file.yml"
+            filepath.write_text("a: 1")
+            watcher = watch.PollingWatcher(0.01)
+            self.assertEqual(watcher.wait([filepath], [], timeout=0.05), set())
+            filepath.write_text("a: 12")
+            self.assertEqual(watcher.wait([filepath], [], timeout=1), {filepath})